@@ -0,0 +1,44 @@
+"""
+Сравнение расчета данных по картам и топа транзакций: цикл по группам против векторных операций.
+
+Запуск: python -m benchmarks.bench_cards [rows] [cards]
+"""
+import sys
+import timeit
+
+from benchmarks.synthetic import make_statement
+from src.utils import calculate_card_data, calculate_cashback, to_kopecks, top_five_transact
+
+
+def card_data_loop(df):
+    # Прежняя реализация: цикл Python по группам карт
+    df_filtered = df[df['Номер карты'].notnull() & (df['Статус'] == 'OK')]
+    card_data = []
+    for card, group in df_filtered.groupby('Номер карты'):
+        spent_kopecks = abs(int(to_kopecks(group[group['Сумма операции'] < 0]['Сумма операции']).sum()))
+        card_data.append({'last_digits': card[-4:], 'total_spent': round(spent_kopecks / 100, 2),
+                          'cashback': calculate_cashback(spent_kopecks)})
+    return card_data
+
+
+def top_sort(df, k=5):
+    # Прежняя реализация: полная сортировка и iterrows
+    rows = df[['Дата операции', 'Сумма операции', 'Категория', 'Описание']]
+    rows = rows.sort_values(by='Сумма операции', key=abs, ascending=False).head(k)
+    return [{"date": row['Дата операции'].strftime("%d.%m.%Y"), "amount": round(row['Сумма операции'], 2),
+             "category": row['Категория'], "description": row['Описание']} for _, row in rows.iterrows()]
+
+
+def main(rows=1_000_000, cards=5_000, repeat=5):
+    df = make_statement(rows, cards=cards)
+    assert card_data_loop(df) == calculate_card_data(df)
+    assert top_sort(df) == top_five_transact(df)
+
+    for name, func in (('карты, цикл', card_data_loop), ('карты, groupby', calculate_card_data),
+                       ('топ, сортировка', top_sort), ('топ, partition', top_five_transact)):
+        seconds = min(timeit.repeat(lambda: func(df), number=1, repeat=repeat))
+        print(f"{name:>16}: {seconds * 1000:.1f} ms ({rows} строк, {cards} карт)")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
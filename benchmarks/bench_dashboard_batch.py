@@ -0,0 +1,45 @@
+"""
+Разделы дашборда для каждого дня года: отдельный расчет на каждую дату против одного прохода по датам.
+
+Запуск: python -m benchmarks.bench_dashboard_batch [rows] [cards]
+"""
+import sys
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import make_statement
+from src.utils import (DateOrder, calculate_card_data, dashboard_sections_batch, filter_data_by_date,
+                       top_five_transact)
+
+
+def per_date(df, target_dates, order):
+    # Прежний способ: фильтрация и расчет заново для каждой даты
+    sections = []
+    for target_date in target_dates:
+        filtered = filter_data_by_date(df, target_date, order)
+        sections.append({"cards": calculate_card_data(filtered), "top_transactions": top_five_transact(filtered)})
+    return sections
+
+
+def main(rows=1_000_000, cards=4):
+    df = make_statement(rows, cards=cards)
+    order = DateOrder(df)
+    days = pd.date_range('2021-01-01', '2021-12-31', freq='D') + pd.Timedelta(hours=23, minutes=59, seconds=59)
+    target_dates = [day.to_pydatetime() for day in days]
+
+    start = time.perf_counter()
+    expected = per_date(df, target_dates, order)
+    loop = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = dashboard_sections_batch(df, target_dates, order=order)
+    sweep = time.perf_counter() - start
+
+    assert batch == expected
+    print(f"{len(target_dates)} дат, {rows} строк, {cards} карт: по датам {loop * 1000:.0f} ms, "
+          f"одним проходом {sweep * 1000:.0f} ms (ускорение {loop / sweep:.1f}x)")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
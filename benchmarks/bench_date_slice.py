@@ -0,0 +1,31 @@
+"""
+Сравнение выборки по диапазону дат: булева маска против бинарного поиска по порядку дат (DateOrder).
+
+Запуск: python -m benchmarks.bench_date_slice [rows]
+"""
+import sys
+import time
+import timeit
+
+import pandas as pd
+
+from benchmarks.synthetic import make_statement
+from src.utils import DateOrder, filter_data_by_date
+
+
+def main(rows=2_000_000, repeat=20):
+    df = make_statement(rows)
+    target_date = pd.Timestamp('2021-06-15 12:00:00')
+
+    start = time.perf_counter()
+    order = DateOrder(df)
+    print(f"{'DateOrder':>12}: {(time.perf_counter() - start) * 1000:.3f} ms на построение")
+
+    for name, date_order in (('mask', None), ('searchsorted', order)):
+        seconds = min(timeit.repeat(lambda: filter_data_by_date(df, target_date, date_order), number=1,
+                                    repeat=repeat))
+        print(f"{name:>12}: {seconds * 1000:.3f} ms на запрос ({rows} строк)")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000)
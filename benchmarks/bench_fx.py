@@ -0,0 +1,51 @@
+"""
+Перевод сумм в рубли: поиск курса для каждой строки против одного поиска по таблице курсов (RateTable).
+
+Запуск: python -m benchmarks.bench_fx [rows]
+"""
+import sys
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import FOREIGN_RATES, make_statement
+from src.fx import RateTable
+from src.reports import calculate_spending
+from src.utils import calculate_card_data, compact_transactions
+
+
+def make_rate_table(df):
+    # Дневные курсы всех валют выписки за весь ее период
+    days = pd.date_range(df['Дата операции'].min().normalize(), df['Дата операции'].max().normalize())
+    return RateTable([(day, currency, rate) for currency, rate in FOREIGN_RATES.items() for day in days])
+
+
+def per_row(df, rates):
+    # Поиск курса по словарю для каждой строки
+    lookup = {(row.date, row.currency): row.rate for row in rates.rates.itertuples()}
+    return [amount * (1.0 if currency == 'RUB' else lookup[(date.normalize(), currency)])
+            for date, currency, amount in zip(df['Дата операции'], df['Валюта операции'], df['Сумма операции'])]
+
+
+def timed(label, func, rows):
+    start = time.perf_counter()
+    func()
+    print(f"{label:<40} {(time.perf_counter() - start) * 1000:10.1f} ms ({rows} строк)")
+
+
+def main(rows=1_000_000):
+    df = make_statement(rows)
+    compact = compact_transactions(df)
+    rates = make_rate_table(df)
+
+    timed('поиск курса для каждой строки', lambda: per_row(df, rates), rows)
+    timed('RateTable.to_rub', lambda: rates.to_rub(df), rows)
+    timed('RateTable.to_rub (компактные данные)', lambda: rates.to_rub(compact), rows)
+    timed('calculate_card_data', lambda: calculate_card_data(df), rows)
+    timed('calculate_card_data(rates=...)', lambda: calculate_card_data(df, rates=rates), rows)
+    timed('calculate_spending', lambda: calculate_spending(df, dates=['2021-12-31']), rows)
+    timed('calculate_spending(rates=...)', lambda: calculate_spending(df, dates=['2021-12-31'], rates=rates), rows)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
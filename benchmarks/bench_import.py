@@ -0,0 +1,41 @@
+"""
+Время импорта модулей в новом интерпретаторе и тяжелые зависимости, которые при этом загружаются.
+
+Запуск: python -m benchmarks.bench_import [repeat]
+"""
+import json
+import os
+import subprocess
+import sys
+
+MODULES = ['src.config', 'src.views', 'src.utils', 'src.services', 'src.reports', 'src.server']
+HEAVY = ['pandas', 'numpy', 'openpyxl', 'requests', 'dotenv']
+
+SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+print(json.dumps([time.perf_counter() - start, [name for name in {heavy!r} if name in sys.modules]]))
+"""
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_time(module, repeat):
+    times, heavy = [], []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', SCRIPT.format(module=module, heavy=HEAVY)], cwd=PROJECT_DIR,
+                                capture_output=True, text=True, check=True).stdout
+        seconds, heavy = json.loads(output)
+        times.append(seconds)
+    return min(times), heavy
+
+
+def main(repeat=5):
+    for module in MODULES:
+        seconds, heavy = import_time(module, repeat)
+        print(f"{module:>13}: {seconds * 1000:7.1f} ms, загружены: {', '.join(heavy) or '-'}")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,56 @@
+"""
+Сравнение пикового потребления памяти при загрузке Excel: pd.read_excel целиком против потокового чтения блоками.
+
+Запуск: python -m benchmarks.bench_ingest [rows] [chunk_size]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import openpyxl
+
+from benchmarks.synthetic import make_statement
+from src.utils import load_operations_data
+
+
+def write_statement(file_path, rows, seed=0):
+    # Пишем выгрузку в режиме write_only, как ее отдает банк: даты строками
+    df = make_statement(rows, seed=seed)
+    for column in ('Дата операции', 'Дата платежа'):
+        df[column] = df[column].dt.strftime('%d.%m.%Y %H:%M:%S')
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(list(df.columns))
+    for row in df.itertuples(index=False):
+        sheet.append(list(row))
+    workbook.save(file_path)
+
+
+def measure(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def main(rows=200_000, chunk_size=20_000):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, 'operations.xlsx')
+        write_statement(file_path, rows)
+        cases = (
+            ('read_excel', lambda: load_operations_data(file_path, use_cache=False)),
+            # В кэш без загрузки в память: так работает первичный разбор большой выгрузки
+            ('блоками в кэш', lambda: load_operations_data(file_path, cache_dir=tmp_dir, chunk_size=chunk_size)),
+        )
+        for name, func in cases:
+            seconds, peak = measure(func)
+            print(f"{name:>14}: {seconds:.1f} s, пик памяти {peak / 2 ** 20:.1f} MiB ({rows} строк)")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,33 @@
+"""
+Загрузка нескольких выгрузок: последовательно против пула процессов (load_operations_many).
+
+Запуск: python -m benchmarks.bench_load_many [files] [rows_per_file]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import make_statement
+from src.utils import load_operations_many
+
+
+def main(files=8, rows=20_000):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_paths = []
+        for i in range(files):
+            df = make_statement(rows, seed=i)
+            for column in ('Дата операции', 'Дата платежа'):
+                df[column] = df[column].dt.strftime('%d.%m.%Y %H:%M:%S')
+            file_paths.append(os.path.join(tmp_dir, f"account_{i}.xlsx"))
+            df.to_excel(file_paths[-1], index=False)
+
+        cores = os.cpu_count() or 1
+        for workers in sorted({1, 2, 4, cores}):
+            start = time.perf_counter()
+            load_operations_many(file_paths, workers=workers, use_cache=False)
+            print(f"{workers:>3} процессов: {time.perf_counter() - start:.1f} s ({files} файлов по {rows} строк)")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,30 @@
+"""
+Накладные расходы instrument: вызов без декоратора, с выключенным и с включенным сбором метрик.
+
+Запуск: python -m benchmarks.bench_metrics [calls]
+"""
+import sys
+import timeit
+
+from src import metrics
+
+
+def plain(x):
+    return x
+
+
+instrumented = metrics.instrument('bench')(plain)
+
+
+def main(calls=1_000_000):
+    for name, func, enabled in (('без декоратора', plain, False), ('метрики выключены', instrumented, False),
+                                ('метрики включены', instrumented, True)):
+        metrics.enable() if enabled else metrics.disable()
+        seconds = min(timeit.repeat(lambda: func(1), number=calls, repeat=3))
+        print(f"{name:>18}: {seconds / calls * 1e9:.0f} нс на вызов")
+    metrics.disable()
+    metrics.reset()
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
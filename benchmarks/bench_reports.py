@@ -0,0 +1,54 @@
+"""
+Задержка вызова отчета: синхронная запись файла в декораторе против фоновой записи через ReportSink.
+
+Запуск: python -m benchmarks.bench_reports [calls]
+"""
+import json
+import statistics
+import sys
+import tempfile
+import time
+
+from src.reports import ReportSink, report_decorator
+
+
+def make_report(i):
+    return {'period_days': 90, 'reports': [{'category': f'Категория {j}', 'date': '2021-12-31',
+                                            'total_spending': i * j} for j in range(50)]}
+
+
+def sync_report(directory):
+    # Прежняя реализация: форматирование и запись файла внутри вызова
+    def wrapper(i):
+        result = make_report(i)
+        with open(f"{directory}/report_{i}.json", 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=4, ensure_ascii=False)
+        return result
+    return wrapper
+
+
+def measure(func, calls):
+    latencies = []
+    for i in range(calls):
+        start = time.perf_counter()
+        func(i)
+        latencies.append(time.perf_counter() - start)
+    return statistics.mean(latencies) * 1e6, statistics.quantiles(latencies, n=100)[98] * 1e6
+
+
+def main(calls=2_000):
+    with tempfile.TemporaryDirectory() as directory:
+        print("синхронно:        среднее %.0f мкс, p99 %.0f мкс" % measure(sync_report(directory), calls))
+        for name, sink in (('файлы', ReportSink(directory=directory)),
+                           ('JSON Lines', ReportSink(jsonl_path=f"{directory}/reports.jsonl", batch_size=100)),
+                           ('пакеты по 100', ReportSink(directory=directory, batch_size=100))):
+            func = report_decorator(sink=sink)(make_report)
+            start = time.perf_counter()
+            mean, p99 = measure(func, calls)
+            sink.flush()
+            print(f"{name + ':':<17} среднее {mean:.0f} мкс, p99 {p99:.0f} мкс, "
+                  f"всего с записью {time.perf_counter() - start:.2f} с")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
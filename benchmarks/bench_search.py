@@ -0,0 +1,37 @@
+"""
+Сравнение поиска транзакций: построчный фильтр по словарям, TransactionSearch и индекс n-грамм.
+
+Запуск: python -m benchmarks.bench_search [rows]
+"""
+import sys
+import timeit
+
+from benchmarks.synthetic import make_statement
+from src.services import TransactionSearch
+
+
+def scan_records(df, query):
+    # Прежний способ: словарь на каждую строку и lambda на каждую проверку
+    return list(filter(
+        lambda row: query in str(row['Описание']).lower() or query in str(row['Категория']).lower(),
+        df.to_dict(orient="records")
+    ))
+
+
+def main(rows=1_000_000, query='ситидрайв'):
+    df = make_statement(rows)
+    engine = TransactionSearch(df)
+
+    scan = min(timeit.repeat(lambda: scan_records(df, query), number=1, repeat=3))
+    vectorized = min(timeit.repeat(lambda: engine.find(query), number=1, repeat=10))
+    print(f"построчно: {scan * 1000:.1f} ms, TransactionSearch.find: {vectorized * 1000:.1f} ms "
+          f"({rows} строк, ускорение {scan / vectorized:.0f}x)")
+
+    engine.index = engine.build_index()
+    for indexed_query in (query, 'между сч', 'нет такого'):
+        indexed = min(timeit.repeat(lambda: engine.find(indexed_query), number=1, repeat=10))
+        print(f"индекс n-грамм, запрос '{indexed_query}': {indexed * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,42 @@
+"""
+Пиковая память при выдаче результата широкого запроса: JSON-строка целиком против потоковой записи.
+
+Запуск: python -m benchmarks.bench_search_output [rows] [query]
+"""
+import json
+import os
+import sys
+import tracemalloc
+
+from benchmarks.synthetic import make_statement
+from src.services import SearchResult, get_search_engine
+
+
+def peak(func):
+    tracemalloc.start()
+    func()
+    result = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result / 2 ** 20
+
+
+def main(rows=200_000, query='перевод'):
+    df = make_statement(rows)
+    engine = get_search_engine(df)
+    total = len(engine.find(query))
+
+    def whole_string():
+        # Прежний способ: все записи списком и одна JSON-строка с отступами
+        json.dumps(engine.records(engine.find(query)), ensure_ascii=False, indent=4)
+
+    def streaming():
+        with open(os.devnull, 'w', encoding='utf-8') as devnull:
+            SearchResult(engine, query, engine.find(query)).write_json(devnull)
+
+    print(f"найдено {total} из {rows} строк")
+    print(f"JSON-строка целиком: пик {peak(whole_string):.1f} MiB")
+    print(f"потоковая запись:    пик {peak(streaming):.1f} MiB")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000, *sys.argv[2:3])
@@ -0,0 +1,58 @@
+"""
+Нагрузочный тест сервера дашборда: много одновременных клиентов с keep-alive соединениями.
+
+Курсы и цены подменяются заглушками, чтобы измерять только обработку данных.
+Запуск: python -m benchmarks.bench_server [clients] [requests_per_client]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import src.views as views
+from src.server import DashboardServer
+from src.store import TransactionStore
+
+TARGETS = ["/dashboard?date=2021-12-20+17:00:00", "/search?q=%D0%BA%D0%B0%D1%84%D0%B5",
+           "/dashboard?date=2020-06-15+12:00:00"]
+
+
+async def client(port, requests, latencies):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    for i in range(requests):
+        start = time.perf_counter()
+        writer.write(f"GET {TARGETS[i % len(TARGETS)]} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        await writer.drain()
+        await reader.readline()
+        length = 0
+        while (line := await reader.readline()) != b"\r\n":
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":")[1])
+        await reader.readexactly(length)
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+
+
+async def run(clients, requests):
+    views.get_currency_rates = lambda: {"currency_rates": []}
+    views.get_stock_prices = lambda: {"stock_prices": []}
+    store = TransactionStore(os.path.join(os.path.dirname(__file__), '../operations.xlsx'))
+    store.df
+
+    server = DashboardServer(store=store, port=0)
+    await server.start()
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(server.port, requests, latencies) for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    await server.close()
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99)]
+    print(f"{clients} клиентов, {len(latencies)} запросов: {len(latencies) / elapsed:.0f} запросов/с, "
+          f"p50 {statistics.median(latencies) * 1000:.1f} ms, p99 {p99 * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    asyncio.run(run(*(int(arg) for arg in sys.argv[1:3]) if len(sys.argv) > 2 else (100, 20)))
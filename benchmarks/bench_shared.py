@@ -0,0 +1,105 @@
+"""
+Память рабочих процессов: собственная копия данных в каждом процессе против общего набора данных (src.shared).
+
+В режиме copy каждый процесс загружает выписку из колоночного кэша (load_operations_data),
+в режиме shared — подключает набор, опубликованный загрузчиком (SharedTransactionStore).
+Процессы работают одновременно; печатается время подготовки данных и прирост памяти всех процессов
+после подготовки данных по /proc/self/smaps_rollup: Rss, Pss (общие страницы делятся между
+процессами) и собственная память процессов (Private).
+
+Запуск: python -m benchmarks.bench_shared [workers] [rows]
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_statement
+from src.cache import save_cached
+from src.shared import SharedTransactionStore, publish_dataset
+from src.utils import load_operations_data
+
+
+def memory_usage():
+    # Память процесса в MiB по /proc/self/smaps_rollup (только Linux)
+    usage = {'Rss': 0, 'Pss': 0, 'Private': 0}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            name, _, value = line.partition(':')
+            kib = value.split()[0] if value.split() else '0'
+            if name in ('Rss', 'Pss'):
+                usage[name] += int(kib) / 1024
+            elif name in ('Private_Clean', 'Private_Dirty'):
+                usage['Private'] += int(kib) / 1024
+    return usage
+
+
+def touch(df):
+    # Читаем все колонки, чтобы страницы отображенных файлов попали в память процесса
+    for column in df.columns:
+        values = df[column].array
+        values = np.asarray(values.codes if isinstance(values, pd.Categorical) else values.to_numpy())
+        if values.dtype != object:
+            values.view(np.uint8).sum()
+
+
+def worker(mode, file_path, cache_dir, root, barrier, results):
+    before = memory_usage()
+    start = time.perf_counter()
+    if mode == 'copy':
+        df = load_operations_data(file_path, cache_dir=cache_dir)
+    else:
+        df = SharedTransactionStore(root).df
+    touch(df)
+    elapsed = time.perf_counter() - start
+    # Память измеряется, когда все процессы держат данные одновременно
+    barrier.wait()
+    after = memory_usage()
+    results.put((elapsed, {name: after[name] - before[name] for name in after}))
+    barrier.wait()
+
+
+def run(mode, workers, file_path, cache_dir, root):
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(mode, file_path, cache_dir, root, barrier, results))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    measured = [results.get(timeout=600) for _ in processes]
+    for process in processes:
+        process.join()
+
+    elapsed = max(seconds for seconds, _ in measured)
+    total = {name: sum(usage[name] for _, usage in measured) for name in ('Rss', 'Pss', 'Private')}
+    print(f"{mode:<6} {workers} процессов: подготовка данных {elapsed * 1000:8.1f} ms, "
+          f"Rss {total['Rss']:7.1f} MiB, Pss {total['Pss']:7.1f} MiB, Private {total['Private']:7.1f} MiB "
+          f"(на процесс Pss {total['Pss'] / workers:.1f} MiB)", flush=True)
+
+
+def main(workers=4, rows=1_000_000):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        df = make_statement(rows)
+        # Выписка представлена колоночным кэшем, привязанным к файлу-заглушке
+        file_path = os.path.join(tmp_dir, 'operations.xlsx')
+        cache_dir = os.path.join(tmp_dir, 'cache')
+        open(file_path, 'wb').close()
+        save_cached(df, file_path, cache_dir)
+
+        root = os.path.join(tmp_dir, 'shared')
+        start = time.perf_counter()
+        publish_dataset(df, root)
+        print(f"Публикация {rows} строк: {(time.perf_counter() - start) * 1000:.1f} ms", flush=True)
+        del df
+
+        for mode in ('copy', 'shared'):
+            run(mode, workers, file_path, cache_dir, root)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
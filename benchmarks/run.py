@@ -0,0 +1,267 @@
+"""
+Набор бенчмарков публичных функций на синтетических выписках разного размера.
+
+Для каждого размера выписки измеряется время (минимум и медиана по повторам) и пиковое
+потребление памяти (tracemalloc, отдельным вызовом) функций загрузки, поиска, отчетов,
+расчета данных по картам и формирования дашборда (для одной даты и для года по дням). Результаты записываются в JSON,
+который можно сравнить с результатами другой версии (--compare).
+
+Запуск:
+python -m benchmarks.run --sizes 10000 100000 1000000 --output results.json
+python -m benchmarks.run --output new.json --compare results.json
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_ingest import write_statement
+from benchmarks.synthetic import make_statement
+from src.cache import save_cached
+from src.reports import ReportSink, set_report_sink, spending_by_category
+from src.services import search_transactions
+from src.store import TransactionStore
+from src.utils import DateOrder, calculate_card_data, filter_data_by_date, load_operations_data, top_five_transact
+from src.views import get_dashboard_batch, get_dashboard_data
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+# Разбор Excel медленный, поэтому для больших выписок измеряется только загрузка из кэша
+DEFAULT_XLSX_MAX_ROWS = 50_000
+
+# Допустимое замедление относительно базовых результатов при сравнении
+DEFAULT_THRESHOLD = 1.25
+
+
+def measure(func, repeat, memory):
+    """
+    Измеряет время и пиковую память вызова функции.
+
+    Первый вызов (прогрев) измеряется отдельно: в нем строятся производные структуры хранилища.
+
+    Аргументы:
+    func (callable): Функция без аргументов.
+    repeat (int): Число повторов.
+    memory (bool): Измерять пиковую память.
+
+    Возвращает:
+    dict: Время первого вызова, минимальное и медианное время, пиковая память (в MiB).
+    """
+    start = time.perf_counter()
+    func()
+    first = time.perf_counter() - start
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    result = {'first_seconds': first, 'min_seconds': min(times), 'median_seconds': statistics.median(times)}
+    if memory:
+        tracemalloc.start()
+        func()
+        result['peak_mib'] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+    return result
+
+
+def month_ends(df, count):
+    # Последние дни нескольких последних месяцев выписки: у каждого вызова дашборда своя дата
+    last = df['Дата операции'].max().normalize()
+    return [last - pd.DateOffset(months=i) for i in range(count)]
+
+
+def cases(file_path, cache_dir, df, rows, xlsx_max_rows, repeat):
+    """
+    Возвращает измеряемые функции для выписки.
+
+    Аргументы:
+    file_path (str): Путь к файлу выписки.
+    cache_dir (str): Каталог кэша.
+    df (pandas.DataFrame): Данные выписки.
+    rows (int): Размер выписки.
+    xlsx_max_rows (int): Максимальный размер выписки, для которого измеряется разбор Excel.
+    repeat (int): Число повторов (для выбора дат дашборда).
+
+    Возвращает:
+    list: Пары (имя, функция без аргументов).
+    """
+    store = TransactionStore(file_path, cache_dir=cache_dir, check_interval=float('inf'))
+    target = df['Дата операции'].max()
+    order = DateOrder(df)
+    month = filter_data_by_date(df, target, order)
+
+    # Каждый вызов дашборда берет новую дату, чтобы измерять расчет, а не попадание в кэш
+    dashboard_dates = iter(month_ends(df, repeat + 2))
+    # Дашборды за каждый день последнего года выписки
+    year_dates = [target - pd.Timedelta(days=i) for i in range(365)]
+
+    result = []
+    if rows <= xlsx_max_rows:
+        result.append(('load_operations_data[xlsx]', lambda: load_operations_data(file_path, use_cache=False)))
+    result += [
+        ('load_operations_data[cache]', lambda: load_operations_data(file_path, cache_dir=cache_dir)),
+        ('filter_data_by_date', lambda: filter_data_by_date(df, target, order)),
+        ('calculate_card_data[month]', lambda: calculate_card_data(month)),
+        ('calculate_card_data[all]', lambda: calculate_card_data(df)),
+        ('top_five_transact[all]', lambda: top_five_transact(df)),
+        ('search_transactions[store]', lambda: search_transactions(store, 'ситидрайв', limit=100)),
+        ('search_transactions[broad]', lambda: search_transactions(store, 'перевод', limit=100)),
+        ('spending_by_category', lambda: spending_by_category(store, 'Супермаркеты', target.strftime('%Y-%m-%d'))),
+        ('get_dashboard_data', lambda: get_dashboard_data(next(dashboard_dates), store=store)),
+        ('get_dashboard_batch[365]', lambda: get_dashboard_batch(year_dates, store=store)),
+    ]
+    return result
+
+
+def prepare(workdir, rows, seed, xlsx_max_rows):
+    """
+    Создает выписку и колоночный кэш для нее.
+
+    Для выписок больше xlsx_max_rows Excel-файл не пишется: создается пустой файл-заглушка,
+    а данные сразу записываются в кэш, привязанный к нему, как после первой загрузки.
+
+    Возвращает:
+    tuple: Путь к файлу, каталог кэша и данные (pandas.DataFrame).
+    """
+    file_path = os.path.join(workdir, f'statement_{rows}.xlsx')
+    cache_dir = os.path.join(workdir, 'cache')
+    df = make_statement(rows, seed=seed)
+    if rows <= xlsx_max_rows:
+        write_statement(file_path, rows, seed=seed)
+    else:
+        open(file_path, 'wb').close()
+    save_cached(df, file_path, cache_dir)
+    return file_path, cache_dir, df
+
+
+def run(sizes, repeat=3, seed=0, xlsx_max_rows=DEFAULT_XLSX_MAX_ROWS, memory=True, only=None):
+    """
+    Запускает бенчмарки для всех размеров выписки.
+
+    Аргументы:
+    sizes (list): Размеры выписок (число строк).
+    repeat (int): Число повторов каждого измерения.
+    seed (int): Зерно генератора выписок.
+    xlsx_max_rows (int): Максимальный размер выписки, для которого измеряется разбор Excel.
+    memory (bool): Измерять пиковую память.
+    only (list): Имена измеряемых функций (по умолчанию все).
+
+    Возвращает:
+    dict: Описание окружения и список результатов.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as workdir, \
+            patch('src.views.get_currency_rates', return_value={'currency_rates': []}), \
+            patch('src.views.get_stock_prices', return_value={'stock_prices': []}):
+        # Курсы и цены подменяются заглушками, отчеты пишутся во временный каталог
+        previous_sink = set_report_sink(ReportSink(directory=workdir))
+        try:
+            for rows in sizes:
+                file_path, cache_dir, df = prepare(workdir, rows, seed, xlsx_max_rows)
+                for name, func in cases(file_path, cache_dir, df, rows, xlsx_max_rows, repeat):
+                    if only and name.split('[')[0] not in only and name not in only:
+                        continue
+                    result = dict(name=name, rows=rows, repeat=repeat, **measure(func, repeat, memory))
+                    results.append(result)
+                    print(format_result(result), flush=True)
+        finally:
+            # Возвращаем прежний приемник; временный при этом дописывает отчеты
+            set_report_sink(previous_sink)
+    return {'environment': environment(seed), 'results': results}
+
+
+def environment(seed):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'seed': seed,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def format_result(result):
+    memory = f", пик {result['peak_mib']:.1f} MiB" if 'peak_mib' in result else ''
+    return (f"{result['name']:<30} {result['rows']:>10} строк: {result['min_seconds'] * 1000:10.2f} ms "
+            f"(медиана {result['median_seconds'] * 1000:.2f} ms, первый вызов {result['first_seconds'] * 1000:.2f} ms"
+            f"{memory})")
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Сравнивает результаты с базовыми и печатает отношение времени.
+
+    Аргументы:
+    results (dict): Текущие результаты.
+    baseline (dict): Базовые результаты.
+    threshold (float): Допустимое отношение времени к базовому.
+
+    Возвращает:
+    list: Замедлившиеся измерения (имя, размер, отношение).
+    """
+    base = {(item['name'], item['rows']): item for item in baseline['results']}
+    regressions = []
+    for item in results['results']:
+        previous = base.get((item['name'], item['rows']))
+        if previous is None:
+            continue
+        ratio = item['min_seconds'] / previous['min_seconds']
+        marker = ' <- замедление' if ratio > threshold else ''
+        print(f"{item['name']:<30} {item['rows']:>10} строк: {ratio:6.2f}x{marker}")
+        if ratio > threshold:
+            regressions.append((item['name'], item['rows'], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Бенчмарки публичных функций на синтетических выписках')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='размеры выписок (строк)')
+    parser.add_argument('--repeat', type=int, default=3, help='число повторов')
+    parser.add_argument('--seed', type=int, default=0, help='зерно генератора выписок')
+    parser.add_argument('--xlsx-max-rows', type=int, default=DEFAULT_XLSX_MAX_ROWS,
+                        help='максимальный размер выписки для измерения разбора Excel')
+    parser.add_argument('--no-memory', action='store_true', help='не измерять пиковую память')
+    parser.add_argument('--only', nargs='+', help='измерять только указанные функции')
+    parser.add_argument('--output', help='файл для результатов в JSON')
+    parser.add_argument('--compare', help='файл с базовыми результатами для сравнения')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='допустимое отношение времени к базовому')
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.INFO)
+    results = run(args.sizes, args.repeat, args.seed, args.xlsx_max_rows, not args.no_memory, args.only)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=4)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
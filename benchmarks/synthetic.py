@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+
+# Категории: доля операций, описания, MCC и средняя сумма операции (в рублях)
+CATEGORY_PROFILES = {
+    'Супермаркеты': (0.30, ['Колхоз', 'Магнит', 'Пятерочка', 'Перекресток'], 5411.0, 900.0),
+    'Фастфуд': (0.12, ['Вкусно и точка', 'Teremok', 'Шаурма'], 5814.0, 350.0),
+    'Рестораны': (0.06, ['Кофейня', 'Ресторан Пхали-Хинкали'], 5812.0, 1800.0),
+    'Каршеринг': (0.06, ['Ситидрайв', 'Яндекс Драйв'], 7512.0, 450.0),
+    'Транспорт': (0.10, ['Метро Санкт-Петербург', 'Яндекс Такси'], 4111.0, 250.0),
+    'Аптеки': (0.05, ['Аптека', 'Аптека Вита'], 5912.0, 700.0),
+    'Переводы': (0.15, ['Перевод между счетами', 'Перевод с карты на карту'], np.nan, 5000.0),
+    'Пополнения': (0.06, ['Пополнение через Газпромбанк', 'Внесение наличных'], np.nan, 15000.0),
+    'Различные товары': (0.10, ['Ozon.ru', 'Wildberries'], 5399.0, 1500.0),
+}
+CATEGORIES = list(CATEGORY_PROFILES)
+DESCRIPTIONS = [description for profile in CATEGORY_PROFILES.values() for description in profile[1]]
+
+# Категории поступлений (суммы положительные, операции без карты)
+INCOME_CATEGORIES = {'Пополнения'}
+
+# Доля операций в иностранной валюте и курсы к рублю
+FOREIGN_SHARE = 0.03
+FOREIGN_RATES = {'USD': 75.0, 'EUR': 85.0}
+
+
+def make_statement(rows, seed=0, start='2018-01-01', end='2021-12-31', cards=4):
+    """
+    Генерирует синтетическую выписку с колонками operations.xlsx.
+
+    Категории, описания, MCC и суммы согласованы между собой, операций в последние годы больше,
+    чем в первые, а время операций сосредоточено в дневные часы. Поступления идут без карты,
+    небольшая доля операций выполнена в иностранной валюте. Результат определяется зерном seed.
+
+    Аргументы:
+    rows (int): Количество строк.
+    seed (int): Зерно генератора случайных чисел.
+    start (str): Начало периода.
+    end (str): Конец периода.
+    cards (int): Количество карт.
+
+    Возвращает:
+    pandas.DataFrame: Типизированные данные о транзакциях.
+    """
+    rng = np.random.default_rng(seed)
+    profiles = list(CATEGORY_PROFILES.values())
+    shares = np.array([profile[0] for profile in profiles])
+    category_codes = rng.choice(len(profiles), rows, p=shares / shares.sum())
+
+    # Описание выбирается среди описаний своей категории
+    first_description = np.cumsum([0] + [len(profile[1]) for profile in profiles[:-1]])
+    description_counts = np.array([len(profile[1]) for profile in profiles])
+    description_codes = first_description[category_codes] + (rng.random(rows) * description_counts[category_codes])
+    description_codes = description_codes.astype(np.int64)
+
+    # Дни: плотность операций растет к концу периода; время: около 14 часов с разбросом
+    start_day = pd.Timestamp(start).normalize()
+    days = (pd.Timestamp(end).normalize() - start_day).days + 1
+    day_offsets = (days * rng.random(rows) ** 0.7).astype(np.int64)
+    seconds = np.clip(rng.normal(14 * 3600, 4 * 3600, rows), 0, 24 * 3600 - 1).astype(np.int64)
+    dates = start_day + pd.to_timedelta(day_offsets * 86400 + seconds, unit='s')
+
+    mean_amounts = np.array([profile[3] for profile in profiles])[category_codes]
+    amounts = np.round(rng.gamma(2.0, mean_amounts / 2.0), 2)
+    is_income = np.isin(category_codes, [CATEGORIES.index(category) for category in INCOME_CATEGORIES])
+    amounts = np.where(is_income, amounts, -amounts)
+
+    # Операции в иностранной валюте: сумма операции в валюте, сумма платежа в рублях
+    currencies = np.array(['RUB'] + list(FOREIGN_RATES))
+    rates = np.array([1.0] + list(FOREIGN_RATES.values()))
+    currency_codes = np.where(rng.random(rows) < FOREIGN_SHARE, rng.integers(1, len(currencies), rows), 0)
+    payments = amounts
+    amounts = np.round(amounts / rates[currency_codes], 2)
+
+    statuses = np.where(rng.random(rows) < 0.99, 'OK', 'FAILED')
+    spent = (amounts < 0) & (statuses == 'OK')
+    bonuses = np.where(spent, np.abs(payments) // 100, 0).astype(np.int64)
+
+    card_numbers = np.array([f'*{number:04d}' for number in range(cards)], dtype=object)
+    card_column = card_numbers[rng.integers(0, cards, rows)]
+    card_column[is_income] = None
+
+    return pd.DataFrame({
+        'Дата операции': dates,
+        'Дата платежа': dates.normalize(),
+        'Номер карты': pd.Series(card_column, dtype='str'),
+        'Статус': statuses,
+        'Сумма операции': amounts,
+        'Валюта операции': currencies[currency_codes],
+        'Сумма платежа': payments,
+        'Валюта платежа': 'RUB',
+        'Кэшбэк': np.where(spent & (rng.random(rows) < 0.1), np.round(np.abs(payments) * 0.05, 2), np.nan),
+        'Категория': np.array(CATEGORIES)[category_codes],
+        'MCC': np.array([profile[2] for profile in profiles])[category_codes],
+        'Описание': np.array(DESCRIPTIONS)[description_codes],
+        'Бонусы (включая кэшбэк)': bonuses,
+        'Округление на инвесткопилку': 0,
+        'Сумма операции с округлением': np.abs(payments),
+    })
@@ -1,14 +1,16 @@
-import pandas as pd
-
+from src.config import init
 from src.reports import spending_by_category
 from src.services import search_transactions
-from src.views import load_operations_data
+from src.store import TransactionStore
+
+# Загружаем настройки и настраиваем журналы
+init()
 
 file_path = 'operations.xlsx'
-df = load_operations_data(file_path)
+store = TransactionStore(file_path)
 
 query = "супермаркеты"
-result = search_transactions(df, query)
+result = search_transactions(store, query)
 
 print(result)
 
@@ -16,7 +18,7 @@ print(result)
 query_date = '2021-12-31'  # Пример даты
 
 # Запрос суммы всех трат по категории 'Фастфуд'
-category_spending = spending_by_category(df, 'Каршеринг', query_date)
+category_spending = spending_by_category(store, 'Каршеринг', query_date)
 
 # Выводим результат
 print(category_spending)
\ No newline at end of file
@@ -0,0 +1,176 @@
+import pandas as pd
+
+from src.utils import DATE_COLUMN, amount_kopecks, slice_by_date
+
+# Измерения куба: день, операция ровно в полночь, категория (только те, что читают отчеты по категориям)
+KEY_COLUMNS = ['day', 'midnight', 'category']
+
+
+def aggregate_rows(df):
+    """
+    Группирует транзакции по измерениям куба: сумма (в копейках) и количество операций.
+
+    Аргументы:
+    df (pandas.DataFrame): Данные о транзакциях.
+
+    Возвращает:
+    pandas.DataFrame: Агрегаты, упорядоченные по дню.
+    """
+    df = df[df[DATE_COLUMN].notna()]
+    dates = df[DATE_COLUMN]
+    days = dates.dt.normalize()
+    amounts = amount_kopecks(df)
+    frame = pd.DataFrame({
+        'day': days.to_numpy(),
+        # Операции ровно в полночь нужны, чтобы точно отвечать на запросы "по дату включительно"
+        'midnight': (dates == days).to_numpy(),
+        'category': df['Категория'].to_numpy(),
+        'amount': amounts.to_numpy(),
+        'count': 1,
+    })
+    return (frame.groupby(KEY_COLUMNS, dropna=False, sort=True)
+            .agg(amount=('amount', 'sum'), count=('count', 'sum'))
+            .reset_index())
+
+
+class AggregateCube:
+    """
+    Предварительно агрегированные по дням суммы и количества операций.
+
+    Запрос за период суммирует несколько дневных агрегатов вместо просмотра всех транзакций.
+    Суммы хранятся в копейках (int64), поэтому результат не зависит от порядка суммирования.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets.sort_values('day', kind='stable').reset_index(drop=True)
+
+    @classmethod
+    def build(cls, df):
+        """
+        Строит куб по данным о транзакциях.
+
+        Аргументы:
+        df (pandas.DataFrame): Данные о транзакциях.
+
+        Возвращает:
+        AggregateCube: Построенный куб.
+        """
+        return cls(aggregate_rows(df))
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        """
+        Строит куб по потоку блоков транзакций (см. iter_operations_chunks), не держа все транзакции в памяти.
+
+        Аргументы:
+        chunks (iterable): Блоки данных о транзакциях.
+
+        Возвращает:
+        AggregateCube: Построенный куб.
+        """
+        cube = None
+        for chunk in chunks:
+            if cube is None:
+                cube = cls.build(chunk)
+            else:
+                cube.update(chunk)
+        return cube
+
+    def update(self, new_rows):
+        """
+        Добавляет в куб новые транзакции: их агрегаты складываются с уже имеющимися.
+
+        Аргументы:
+        new_rows (pandas.DataFrame): Новые транзакции.
+        """
+        combined = pd.concat([self.buckets, aggregate_rows(new_rows)], ignore_index=True)
+        self.buckets = (combined.groupby(KEY_COLUMNS, dropna=False, sort=True)
+                        .agg(amount=('amount', 'sum'), count=('count', 'sum'))
+                        .reset_index())
+
+    def extend(self, new_rows, df):
+        """
+        Обновляет куб после добавления транзакций в хранилище (см. TransactionStore.append_file).
+
+        Агрегаты не зависят от порядка строк, поэтому куб обновляется всегда.
+
+        Аргументы:
+        new_rows (pandas.DataFrame): Добавленные транзакции.
+        df (pandas.DataFrame): Все данные о транзакциях после добавления.
+
+        Возвращает:
+        bool: Всегда True.
+        """
+        self.update(new_rows)
+        return True
+
+    def window(self, start_date, end_date, df=None, order=None):
+        """
+        Возвращает агрегаты операций с датой в диапазоне [start_date, end_date].
+
+        Полные дни берутся из куба. Если границы диапазона не приходятся на полночь,
+        операции неполных первого и последнего дня агрегируются из df.
+
+        Аргументы:
+        start_date (datetime): Начало диапазона (включительно).
+        end_date (datetime): Конец диапазона (включительно).
+        df (pandas.DataFrame): Данные о транзакциях для неполных дней.
+        order (DateOrder): Порядок по дате, построенный для df (см. slice_by_date).
+
+        Возвращает:
+        pandas.DataFrame: Агрегаты за период.
+        """
+        start = pd.Timestamp(start_date)
+        end = pd.Timestamp(end_date)
+        start_day = start.normalize()
+        end_day = end.normalize()
+        if end < start:
+            return self.buckets.iloc[0:0]
+        if start_day == end_day and (start != start_day or end != end_day):
+            return self._aggregate_raw(df, order, start, end)
+
+        parts = []
+        first_full_day = start_day
+        if start != start_day:
+            first_full_day = start_day + pd.Timedelta(days=1)
+            parts.append(self._aggregate_raw(df, order, start, first_full_day, include_end=False))
+
+        days = self.buckets['day']
+        lo = days.searchsorted(first_full_day, side='left')
+        hi = days.searchsorted(end_day, side='left')
+        parts.append(self.buckets.iloc[lo:hi])
+
+        if end == end_day:
+            # Из последнего дня берем только операции ровно в полночь
+            last_day = self.buckets.iloc[hi:days.searchsorted(end_day, side='right')]
+            parts.append(last_day[last_day['midnight']])
+        else:
+            parts.append(self._aggregate_raw(df, order, end_day, end))
+        return pd.concat(parts, ignore_index=True)
+
+    @staticmethod
+    def _aggregate_raw(df, order, start, end, include_end=True):
+        if df is None:
+            raise ValueError("Для периода с границами не в полночь нужны данные о транзакциях.")
+        rows = slice_by_date(df, start, end, order)
+        if not include_end:
+            rows = rows[rows[DATE_COLUMN] < end]
+        return aggregate_rows(rows)
+
+    def category_spending(self, category, start_date, end_date, df=None, order=None):
+        """
+        Возвращает сумму операций по категории за период (как spending_by_category).
+
+        Аргументы:
+        category (str): Категория.
+        start_date (datetime): Начало периода (включительно).
+        end_date (datetime): Конец периода (включительно).
+        df (pandas.DataFrame): Данные о транзакциях для неполных дней.
+        order (DateOrder): Порядок по дате, построенный для df.
+
+        Возвращает:
+        int: Сумма операций в рублях, целая часть.
+        """
+        buckets = self.window(start_date, end_date, df, order)
+        kopecks = int(buckets.loc[buckets['category'] == category, 'amount'].sum())
+        return int(kopecks / 100)
@@ -0,0 +1,373 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# Имя каталога с кэшем рядом с исходным файлом
+CACHE_DIR_NAME = '.operations_cache'
+
+# Версия формата кэша: при изменении формата старые кэши игнорируются
+CACHE_FORMAT_VERSION = 3
+
+logger = logging.getLogger('financial_dashboard')
+
+
+def get_cache_key(file_path):
+    """
+    Формирует ключ кэша по пути, времени изменения и размеру исходного файла.
+
+    Аргументы:
+    file_path (str): Путь к исходному файлу.
+
+    Возвращает:
+    dict: Ключ кэша.
+    """
+    stat = os.stat(file_path)
+    return {
+        'path': os.path.abspath(file_path),
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'format': CACHE_FORMAT_VERSION,
+    }
+
+
+def get_cache_path(file_path, cache_dir=None):
+    """
+    Возвращает путь к каталогу кэша для исходного файла.
+
+    Аргументы:
+    file_path (str): Путь к исходному файлу.
+    cache_dir (str): Каталог для кэшей (по умолчанию рядом с исходным файлом).
+
+    Возвращает:
+    str: Путь к каталогу кэша.
+    """
+    abs_path = os.path.abspath(file_path)
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(abs_path), CACHE_DIR_NAME)
+    digest = hashlib.sha1(abs_path.encode('utf-8')).hexdigest()[:12]
+    return os.path.join(cache_dir, f"{os.path.basename(abs_path)}-{digest}")
+
+
+def save_bundle(df, bundle_path, key=None):
+    """
+    Сохраняет DataFrame в каталог: по одному .npy-файлу на колонку и meta.json с описанием.
+
+    Числа и даты сохраняются как есть. Строковые колонки хранятся словарем: коды строк (int32,
+    -1 для пропусков) в .npy-файле и список различных строк в meta.json, поэтому размер кэша
+    не зависит от длины самой длинной строки.
+
+    Аргументы:
+    df (pandas.DataFrame): Данные для сохранения.
+    bundle_path (str): Каталог для сохранения.
+    key (dict): Ключ кэша, записывается в meta.json.
+    """
+    # Сначала пишем во временный каталог, затем атомарно подменяем
+    tmp_path = f"{bundle_path}.tmp{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    columns = []
+    for i, column in enumerate(df.columns):
+        series = df[column]
+        file_name = f"col_{i:03d}.npy"
+        entry = {'name': column, 'file': file_name, 'dtype': str(series.dtype)}
+        if pd.api.types.is_datetime64_any_dtype(series) or pd.api.types.is_numeric_dtype(series):
+            entry['kind'] = 'array'
+            np.save(os.path.join(tmp_path, file_name), series.to_numpy())
+        else:
+            lookup = {}
+            np.save(os.path.join(tmp_path, file_name), _string_codes(series, lookup))
+            entry.update(kind='string', categories=list(lookup))
+        columns.append(entry)
+
+    meta = {'key': key, 'rows': len(df), 'columns': columns}
+    with open(os.path.join(tmp_path, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+    shutil.rmtree(bundle_path, ignore_errors=True)
+    os.replace(tmp_path, bundle_path)
+
+
+def save_bundle_chunks(chunks, bundle_path, key=None):
+    """
+    Сохраняет поток блоков DataFrame в каталог в формате save_bundle, не собирая данные целиком в памяти.
+
+    Каждый блок сразу записывается на диск по колонкам, затем части колонок копируются
+    в итоговые .npy-файлы через memory-map. Тип колонки определяется по блокам, в которых
+    есть значения: блоки из одних пропусков дополняются NaN/NaT или пропусками строк.
+    Коды строк общие для всех блоков: в памяти держится только словарь различных строк.
+    Если в разных блоках колонка содержит числа и строки, выбрасывается ValueError,
+    а временный каталог удаляется.
+
+    Аргументы:
+    chunks (iterable): Блоки данных (pandas.DataFrame) с одинаковыми колонками.
+    bundle_path (str): Каталог для сохранения.
+    key (dict): Ключ кэша, записывается в meta.json.
+
+    Возвращает:
+    int: Количество сохраненных строк.
+    """
+    tmp_path = f"{bundle_path}.tmp{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    names = None
+    parts = []
+    lookups = []
+    rows = 0
+    columns = []
+    try:
+        for chunk in chunks:
+            if names is None:
+                names = list(chunk.columns)
+                parts = [[] for _ in names]
+                lookups = [{} for _ in names]
+            for i, column in enumerate(names):
+                parts[i].append(_save_part(tmp_path, f"col_{i:03d}.part{len(parts[i]):05d}", chunk[column],
+                                           lookups[i]))
+            rows += len(chunk)
+
+        for i, column in enumerate(names or []):
+            file_name = f"col_{i:03d}.npy"
+            kind, dtype = _merge_parts(tmp_path, file_name, parts[i], rows, column)
+            entry = {'name': column, 'file': file_name, 'dtype': dtype, 'kind': kind}
+            if kind == 'string':
+                entry['categories'] = list(lookups[i])
+            columns.append(entry)
+
+        meta = {'key': key, 'rows': rows, 'columns': columns}
+        with open(os.path.join(tmp_path, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+    except BaseException:
+        # Недописанные части не должны оставаться на диске
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+    shutil.rmtree(bundle_path, ignore_errors=True)
+    os.replace(tmp_path, bundle_path)
+    return rows
+
+
+def _string_codes(series, lookup):
+    # Коды строк колонки по словарю lookup (строка -> код), который дополняется новыми строками; пропуски — -1
+    mask = series.isna().to_numpy()
+    values = np.where(mask, None, series.astype(object).astype(str).to_numpy(dtype=object))
+    local_codes, uniques = pd.factorize(values)
+    mapping = np.fromiter((lookup.setdefault(value, len(lookup)) for value in uniques.tolist()),
+                          dtype=np.int32, count=len(uniques))
+    codes = np.full(len(series), -1, dtype=np.int32)
+    present = local_codes >= 0
+    codes[present] = mapping[local_codes[present]]
+    return codes
+
+
+def _save_part(tmp_path, name, series, lookup):
+    part = {'rows': len(series)}
+    if series.isna().all():
+        # Блок из одних пропусков не определяет тип колонки
+        return part
+    if pd.api.types.is_datetime64_any_dtype(series) or pd.api.types.is_numeric_dtype(series):
+        values = series.to_numpy()
+        part.update(kind='array', dtype=values.dtype.str, file=f"{name}.npy")
+    else:
+        values = _string_codes(series, lookup)
+        part.update(kind='string', dtype=values.dtype.str, file=f"{name}.npy", pandas_dtype=str(series.dtype))
+    np.save(os.path.join(tmp_path, part['file']), values)
+    return part
+
+
+def _merge_parts(tmp_path, file_name, parts, rows, column):
+    filled = [part for part in parts if 'kind' in part]
+    kinds = {part['kind'] for part in filled}
+    if len(kinds) > 1:
+        raise ValueError(f"Колонка {column} содержит в разных блоках значения разных типов.")
+    kind = kinds.pop() if kinds else 'array'
+
+    dtype = np.result_type(*[np.dtype(part['dtype']) for part in filled]) if filled else np.dtype('float64')
+    if kind == 'array' and len(filled) < len(parts) and dtype.kind in 'iub':
+        # Пропуски в целочисленной колонке, как и в pandas, переводят ее во float64
+        dtype = np.result_type(dtype, np.float64)
+    missing = -1 if kind == 'string' else np.array(None, dtype=dtype) if dtype.kind == 'M' else np.nan
+
+    output = np.lib.format.open_memmap(os.path.join(tmp_path, file_name), mode='w+', dtype=dtype, shape=(rows,))
+    position = 0
+    for part in parts:
+        end = position + part['rows']
+        if 'file' in part:
+            part_path = os.path.join(tmp_path, part['file'])
+            output[position:end] = np.load(part_path, mmap_mode='r')
+            os.remove(part_path)
+        else:
+            output[position:end] = missing
+        position = end
+    output.flush()
+
+    if kind == 'string':
+        return kind, filled[0]['pandas_dtype']
+    return kind, str(dtype)
+
+
+def load_bundle(bundle_path, key=None, mmap=True):
+    """
+    Загружает DataFrame, сохраненный функцией save_bundle.
+
+    При mmap=True колонки чисел и дат не копируются: они ссылаются на отображенные в память
+    .npy-файлы (в режиме копирования при записи, поэтому изменения данных файлы не меняют).
+    Строковые колонки собираются из кодов и списка строк и занимают память процесса.
+
+    Аргументы:
+    bundle_path (str): Каталог с сохраненными данными.
+    key (dict): Ожидаемый ключ кэша. Если не совпадает, кэш считается устаревшим.
+    mmap (bool): Открывать .npy-файлы через memory-map.
+
+    Возвращает:
+    pandas.DataFrame или None: Данные или None, если кэш отсутствует или устарел.
+    """
+    meta_path = os.path.join(bundle_path, 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+
+    with open(meta_path, encoding='utf-8') as f:
+        meta = json.load(f)
+    if key is not None and meta.get('key') != key:
+        return None
+
+    # Пустой файл нельзя отобразить в память, поэтому пустые данные читаются обычным образом
+    mmap_mode = 'c' if mmap and meta['rows'] else None
+    data = {}
+    for column in meta['columns']:
+        values = np.load(os.path.join(bundle_path, column['file']), mmap_mode=mmap_mode)
+        if column['kind'] == 'string':
+            # Код -1 берет последний элемент — пропуск
+            strings = np.array(column['categories'] + [np.nan], dtype=object)
+            data[column['name']] = pd.Series(strings.take(values), dtype=column['dtype'])
+        else:
+            # copy=False: колонка ссылается на отображенный файл, а не на копию в памяти процесса
+            data[column['name']] = pd.Series(values.view(np.ndarray), copy=False)
+
+    return pd.DataFrame(data, columns=[column['name'] for column in meta['columns']], copy=False)
+
+
+def is_cached(file_path, cache_dir=None):
+    """
+    Проверяет, есть ли кэш, соответствующий текущей версии исходного файла (без загрузки данных).
+
+    Аргументы:
+    file_path (str): Путь к исходному файлу.
+    cache_dir (str): Каталог для кэшей.
+
+    Возвращает:
+    bool: True, если актуальный кэш есть.
+    """
+    meta_path = os.path.join(get_cache_path(file_path, cache_dir), 'meta.json')
+    try:
+        with open(meta_path, encoding='utf-8') as f:
+            return json.load(f).get('key') == get_cache_key(file_path)
+    except (OSError, ValueError):
+        return False
+
+
+def load_cached(file_path, cache_dir=None):
+    """
+    Загружает данные из кэша, если он соответствует текущей версии исходного файла.
+
+    Аргументы:
+    file_path (str): Путь к исходному файлу.
+    cache_dir (str): Каталог для кэшей.
+
+    Возвращает:
+    pandas.DataFrame или None: Данные из кэша или None.
+    """
+    try:
+        return load_bundle(get_cache_path(file_path, cache_dir), get_cache_key(file_path))
+    except (OSError, ValueError, KeyError) as err:
+        logger.warning(f"Не удалось прочитать кэш для {file_path}: {err}")
+        return None
+
+
+def save_cached(df, file_path, cache_dir=None):
+    """
+    Сохраняет уже типизированные данные в кэш для исходного файла.
+
+    Аргументы:
+    df (pandas.DataFrame): Данные о транзакциях.
+    file_path (str): Путь к исходному файлу.
+    cache_dir (str): Каталог для кэшей.
+    """
+    try:
+        save_bundle(df, get_cache_path(file_path, cache_dir), get_cache_key(file_path))
+    except OSError as err:
+        # Кэш необязателен: при ошибке записи просто работаем без него
+        logger.warning(f"Не удалось записать кэш для {file_path}: {err}")
+
+
+def save_cached_chunks(chunks, file_path, cache_dir=None):
+    """
+    Сохраняет поток блоков уже типизированных данных в кэш для исходного файла.
+
+    Аргументы:
+    chunks (iterable): Блоки данных о транзакциях.
+    file_path (str): Путь к исходному файлу.
+    cache_dir (str): Каталог для кэшей.
+
+    Возвращает:
+    bool: True, если кэш записан. False — при ошибке записи или если типы колонки различаются между блоками.
+    """
+    try:
+        save_bundle_chunks(chunks, get_cache_path(file_path, cache_dir), get_cache_key(file_path))
+        return True
+    except (OSError, ValueError) as err:
+        logger.warning(f"Не удалось записать кэш для {file_path}: {err}")
+        return False
+
+
+def save_arrays(bundle_path, arrays, key=None):
+    """
+    Сохраняет набор именованных numpy-массивов в каталог (по одному .npy-файлу на массив).
+
+    Аргументы:
+    bundle_path (str): Каталог для сохранения.
+    arrays (dict): Массивы по именам.
+    key (dict): Ключ кэша, записывается в meta.json.
+    """
+    tmp_path = f"{bundle_path}.tmp{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    for name, values in arrays.items():
+        np.save(os.path.join(tmp_path, f"{name}.npy"), values)
+    with open(os.path.join(tmp_path, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump({'key': key, 'arrays': list(arrays)}, f, ensure_ascii=False)
+
+    shutil.rmtree(bundle_path, ignore_errors=True)
+    os.replace(tmp_path, bundle_path)
+
+
+def load_arrays(bundle_path, key=None, mmap=True):
+    """
+    Загружает набор массивов, сохраненный функцией save_arrays.
+
+    Аргументы:
+    bundle_path (str): Каталог с сохраненными массивами.
+    key (dict): Ожидаемый ключ кэша.
+    mmap (bool): Открывать .npy-файлы через memory-map.
+
+    Возвращает:
+    dict или None: Массивы по именам или None, если кэш отсутствует или устарел.
+    """
+    meta_path = os.path.join(bundle_path, 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+
+    with open(meta_path, encoding='utf-8') as f:
+        meta = json.load(f)
+    if key is not None and meta.get('key') != key:
+        return None
+
+    mmap_mode = 'r' if mmap else None
+    return {name: np.load(os.path.join(bundle_path, f"{name}.npy"), mmap_mode=mmap_mode) for name in meta['arrays']}
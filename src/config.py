@@ -0,0 +1,184 @@
+import json
+import logging
+import os
+import threading
+
+# Корень проекта: рядом лежат operations.xlsx и user_settings.json
+PROJECT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Путь к файлу с операциями по умолчанию
+DEFAULT_OPERATIONS_FILE = os.path.join(PROJECT_DIR, 'operations.xlsx')
+
+# Имя файла с настройками пользователя
+USER_SETTINGS_FILE = 'user_settings.json'
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+_settings = None
+_settings_lock = threading.Lock()
+_env_loaded = False
+_logging_configured = False
+
+
+class Settings:
+    """
+    Настройки приложения.
+
+    Файл настроек пользователя читается при первом обращении к списку валют или акций,
+    а API-ключи и пути берутся из переменных окружения в момент обращения.
+    Файл настроек ищется по пути settings_path, затем в переменной окружения USER_SETTINGS,
+    затем в текущей папке и в корне проекта.
+    """
+
+    def __init__(self, settings_path=None):
+        self.settings_path = settings_path
+        self._user_settings = None
+        self._lock = threading.Lock()
+
+    def resolve_settings_path(self):
+        """
+        Возвращает путь к файлу настроек пользователя.
+
+        Возвращает:
+        str: Путь к файлу настроек.
+        """
+        path = self.settings_path or os.getenv('USER_SETTINGS')
+        if path:
+            return path
+        if os.path.exists(USER_SETTINGS_FILE):
+            return os.path.abspath(USER_SETTINGS_FILE)
+        return os.path.join(PROJECT_DIR, USER_SETTINGS_FILE)
+
+    @property
+    def user_settings(self):
+        with self._lock:
+            if self._user_settings is None:
+                with open(self.resolve_settings_path(), encoding='utf-8') as f:
+                    self._user_settings = json.load(f)
+            return self._user_settings
+
+    @property
+    def user_currencies(self):
+        return self.user_settings.get('user_currencies', [])
+
+    @property
+    def user_stocks(self):
+        return self.user_settings.get('user_stocks', [])
+
+    @property
+    def api_key(self):
+        return os.getenv('API_KEY')
+
+    @property
+    def marketstack_api_key(self):
+        return os.getenv('MARKETSTACK_API_KEY')
+
+    @property
+    def market_data_cache(self):
+        return os.getenv('MARKET_DATA_CACHE')
+
+    @property
+    def operations_file(self):
+        return os.getenv('OPERATIONS_FILE') or DEFAULT_OPERATIONS_FILE
+
+    @property
+    def shared_dataset(self):
+        return os.getenv('SHARED_DATASET')
+
+
+def load_env():
+    """Загружает переменные окружения из файла .env (один раз)."""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        _env_loaded = True
+
+
+def get_settings():
+    """
+    Возвращает общие настройки приложения, создавая их при первом обращении.
+
+    При первом обращении загружаются переменные окружения из файла .env.
+
+    Возвращает:
+    Settings: Настройки приложения.
+    """
+    global _settings
+    with _settings_lock:
+        if _settings is None:
+            load_env()
+            _settings = Settings()
+        return _settings
+
+
+def set_settings(settings):
+    """
+    Заменяет общие настройки приложения.
+
+    Аргументы:
+    settings (Settings): Новые настройки (None — настройки будут созданы при следующем обращении).
+    """
+    global _settings
+    with _settings_lock:
+        _settings = settings
+
+
+def setup_logger():
+    """
+    Добавляет логгеру financial_dashboard запись в файл app.log.
+
+    Возвращает:
+    logging.Logger: Логгер приложения.
+    """
+    logger = logging.getLogger('financial_dashboard')
+    logger.setLevel(logging.INFO)
+
+    # Создаем обработчик для записи в файл
+    file_handler = logging.FileHandler('app.log', encoding='utf-8')
+    file_handler.setLevel(logging.INFO)
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    logger.addHandler(file_handler)
+
+    return logger
+
+
+def configure_logging():
+    """
+    Настраивает журналы приложения (один раз).
+
+    Сообщения логгера financial_dashboard записываются в app.log, сообщения поиска и отчетов
+    (корневой логгер) — в app.search.log и в консоль.
+    """
+    global _logging_configured
+    if _logging_configured:
+        return
+    setup_logger()
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT,
+                        handlers=[logging.FileHandler('app.search.log', encoding='utf-8'), logging.StreamHandler()])
+    _logging_configured = True
+
+
+def init(settings_path=None, configure_logs=True):
+    """
+    Инициализирует приложение: загружает .env и настройки пользователя, настраивает журналы.
+
+    Импорт модулей src не имеет побочных эффектов; эту функцию вызывают точки входа
+    (main.py, python -m src.server) перед началом работы.
+
+    Аргументы:
+    settings_path (str): Путь к файлу настроек пользователя.
+    configure_logs (bool): Настроить журналы.
+
+    Возвращает:
+    Settings: Настройки приложения.
+    """
+    load_env()
+    settings = Settings(settings_path)
+    # Читаем файл настроек сразу, чтобы ошибка в нем проявилась при запуске
+    settings.user_settings
+    set_settings(settings)
+    if configure_logs:
+        configure_logging()
+    return settings
@@ -0,0 +1,240 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.config import get_settings
+from src.market_data import TIMESERIES_MAX_DAYS
+from src.utils import DATE_COLUMN, amount_rubles, logger
+
+# Валюта, в которую переводятся суммы
+BASE_CURRENCY = 'RUB'
+
+# Колонки таблицы курсов: день, код валюты, сколько рублей стоит единица валюты
+RATE_COLUMNS = ['date', 'currency', 'rate']
+
+# Сколько дней действует последний известный курс, если на день курса нет (выходные и праздники)
+MAX_RATE_AGE_DAYS = 7
+
+# Шаг ключа (валюта, день): номер валюты умножается на него, номер дня прибавляется
+_KEY_STRIDE = 1 << 32
+
+
+def _rate_frame(rates):
+    # Приводит курсы (DataFrame или пары (дата, валюта, курс)) к колонкам RATE_COLUMNS с нужными типами
+    if not isinstance(rates, pd.DataFrame):
+        rates = pd.DataFrame(list(rates), columns=RATE_COLUMNS)
+    missing = [column for column in RATE_COLUMNS if column not in rates.columns]
+    if missing:
+        raise ValueError(f"В таблице курсов нет колонок: {', '.join(missing)}.")
+
+    frame = pd.DataFrame({
+        'date': pd.to_datetime(rates['date']).dt.normalize().astype('datetime64[us]'),
+        'currency': rates['currency'].astype('str'),
+        'rate': pd.to_numeric(rates['rate']).astype('float64'),
+    })
+    return frame.dropna().reset_index(drop=True)
+
+
+class RateTable:
+    """
+    Таблица дневных курсов валют к рублю: сколько рублей стоит единица валюты в каждый день.
+
+    Курсы хранятся массивами, упорядоченными по валюте и дню, поэтому курсы для целой колонки
+    операций находятся одним бинарным поиском по ключу (валюта, день), без запросов к API.
+    Если на день курса нет, берется последний известный курс не старше max_age_days дней.
+    Курс рубля всегда равен 1.
+    """
+
+    def __init__(self, rates=None, max_age_days=MAX_RATE_AGE_DAYS):
+        self.max_age_days = max_age_days
+        self._set(_rate_frame(rates if rates is not None else []))
+
+    def _set(self, frame):
+        # Для одинаковых (дата, валюта) остается последний курс
+        frame = frame.drop_duplicates(['currency', 'date'], keep='last')
+        self.rates = frame.sort_values(['currency', 'date'], kind='stable').reset_index(drop=True)
+        self.currencies = pd.Index(self.rates['currency'].unique())
+        self._codes = self.currencies.get_indexer(self.rates['currency']).astype(np.int64)
+        self._days = self.rates['date'].to_numpy().astype('datetime64[D]').astype(np.int64)
+        self._keys = self._codes * _KEY_STRIDE + self._days
+        self._values = self.rates['rate'].to_numpy()
+
+    def __len__(self):
+        return len(self.rates)
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        """
+        Загружает таблицу курсов из CSV-файла с колонками date, currency, rate.
+
+        Аргументы:
+        path (str): Путь к файлу.
+
+        Возвращает:
+        RateTable: Таблица курсов.
+        """
+        return cls(pd.read_csv(path, dtype={'currency': 'str'}), **kwargs)
+
+    def save(self, path):
+        """
+        Сохраняет таблицу курсов в CSV-файл (атомарно: через временный файл).
+
+        Аргументы:
+        path (str): Путь к файлу.
+        """
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        self.rates.to_csv(tmp_path, index=False, date_format='%Y-%m-%d')
+        os.replace(tmp_path, path)
+
+    def update(self, rates):
+        """
+        Добавляет курсы в таблицу. Курсы на уже известные (дата, валюта) заменяются новыми.
+
+        Аргументы:
+        rates (pandas.DataFrame или iterable): Курсы с колонками date, currency, rate или тройки (дата, валюта, курс).
+        """
+        self._set(pd.concat([self.rates, _rate_frame(rates)], ignore_index=True))
+
+    def lookup(self, dates, currencies):
+        """
+        Возвращает курсы к рублю для пар (дата, валюта).
+
+        Аргументы:
+        dates (pandas.Series): Даты (время внутри дня не учитывается).
+        currencies (pandas.Series): Коды валют (строки или категории).
+
+        Возвращает:
+        numpy.ndarray: Курсы (NaN, если курса нет).
+        """
+        dates = pd.Series(pd.to_datetime(dates), copy=False)
+        currencies = pd.Series(currencies, copy=False)
+        days = dates.to_numpy().astype('datetime64[D]')
+        known = ~np.isnat(days)
+        days = np.where(known, days.astype(np.int64), 0)
+        codes = self._currency_codes(currencies)
+
+        rates = np.full(len(days), np.nan)
+        if len(self._keys):
+            # Последний курс валюты не позже дня операции
+            positions = np.searchsorted(self._keys, codes * _KEY_STRIDE + days, side='right') - 1
+            found = known & (codes >= 0) & (positions >= 0)
+            positions = np.where(found, positions, 0)
+            found &= (self._codes[positions] == codes) & (days - self._days[positions] <= self.max_age_days)
+            rates[found] = self._values[positions[found]]
+        rates[(currencies == BASE_CURRENCY).to_numpy()] = 1.0
+        return rates
+
+    def rate(self, date, currency):
+        """
+        Возвращает курс валюты к рублю на дату.
+
+        Аргументы:
+        date (str или datetime): Дата.
+        currency (str): Код валюты.
+
+        Возвращает:
+        float: Курс (NaN, если курса нет).
+        """
+        return float(self.lookup([date], [currency])[0])
+
+    def _currency_codes(self, currencies):
+        # Номера валют в таблице (-1 для неизвестных); для категорий сопоставляются только категории
+        if isinstance(currencies.dtype, pd.CategoricalDtype):
+            mapping = self.currencies.get_indexer(currencies.cat.categories)
+            codes = currencies.array.codes
+            if not len(mapping):
+                return np.full(len(codes), -1, dtype=np.int64)
+            return np.where(codes >= 0, mapping[codes], -1).astype(np.int64)
+        return self.currencies.get_indexer(currencies).astype(np.int64)
+
+    def missing(self, df, column='Сумма операции', currency_column='Валюта операции'):
+        """
+        Возвращает пары (дата, валюта) операций, для которых в таблице нет курса.
+
+        Аргументы:
+        df (pandas.DataFrame): Данные о транзакциях.
+        column (str): Колонка с суммами.
+        currency_column (str): Колонка с валютой сумм.
+
+        Возвращает:
+        pandas.DataFrame: Уникальные пары с колонками date и currency, упорядоченные по валюте и дате.
+        """
+        rates = self.lookup(df[DATE_COLUMN], df[currency_column])
+        unknown = (np.isnan(rates) & df[column].notna().to_numpy() & df[DATE_COLUMN].notna().to_numpy()
+                   & df[currency_column].notna().to_numpy())
+        pairs = pd.DataFrame({
+            'date': df[DATE_COLUMN][unknown].dt.normalize().to_numpy(),
+            'currency': df[currency_column][unknown].astype('str').to_numpy(),
+        })
+        return pairs.drop_duplicates().sort_values(['currency', 'date']).reset_index(drop=True)
+
+    def to_rub(self, df, column='Сумма операции', currency_column='Валюта операции', errors='raise'):
+        """
+        Переводит суммы колонки в рубли по курсу на день операции.
+
+        Аргументы:
+        df (pandas.DataFrame): Данные о транзакциях (обычные или компактные).
+        column (str): Колонка с суммами.
+        currency_column (str): Колонка с валютой сумм.
+        errors (str): 'raise' — ValueError, если для суммы нет курса; 'coerce' — такие суммы становятся NaN.
+
+        Возвращает:
+        pandas.Series: Суммы в рублях.
+        """
+        amounts = amount_rubles(df, column)
+        rates = self.lookup(df[DATE_COLUMN], df[currency_column])
+        if errors == 'raise' and (np.isnan(rates) & amounts.notna().to_numpy()).any():
+            pairs = self.missing(df, column, currency_column)
+            examples = ', '.join(f"{currency} {date:%Y-%m-%d}" for date, currency
+                                 in zip(pairs['date'][:5], pairs['currency'][:5]))
+            raise ValueError(f"Нет курсов к рублю для {len(pairs)} пар (валюта, дата), например: {examples}.")
+        return amounts * rates
+
+    def fill_from_api(self, df, api_key=None, client=None, currency_column='Валюта операции'):
+        """
+        Загружает из API исторические курсы, которых не хватает для операций df.
+
+        Недостающие дни группируются в периоды не длиннее TIMESERIES_MAX_DAYS дней, и на каждый
+        период выполняется один запрос сразу по всем валютам (MarketDataClient.fetch_currency_timeseries).
+        Курсы, загруженные до ошибки, остаются в таблице.
+
+        Аргументы:
+        df (pandas.DataFrame): Данные о транзакциях.
+        api_key (str): API-ключ apilayer (по умолчанию из настроек).
+        client (MarketDataClient): Клиент API (по умолчанию общий).
+        currency_column (str): Колонка с валютой сумм.
+
+        Возвращает:
+        dict: {"added": количество загруженных курсов} или {"error": ...}.
+        """
+        missing = self.missing(df, currency_column=currency_column).sort_values('date', kind='stable')
+        if missing.empty:
+            return {"added": 0}
+        api_key = api_key or get_settings().api_key
+        if not api_key:
+            return {"error": "API key is missing"}
+        if client is None:
+            from src.views import get_market_data_client
+
+            client = get_market_data_client()
+
+        added = 0
+        dates = missing['date'].to_numpy()
+        start = 0
+        while start < len(dates):
+            end = np.searchsorted(dates, dates[start] + np.timedelta64(TIMESERIES_MAX_DAYS - 1, 'D'), side='right')
+            period = missing.iloc[start:end]
+            result = client.fetch_currency_timeseries(sorted(period['currency'].unique()),
+                                                      pd.Timestamp(dates[start]).strftime('%Y-%m-%d'),
+                                                      pd.Timestamp(dates[end - 1]).strftime('%Y-%m-%d'), api_key)
+            if "error" in result:
+                logger.error(f"Не удалось загрузить курсы валют: {result['error']}")
+                return result
+            rows = [(date, currency, rate) for date, day_rates in result['rates'].items()
+                    for currency, rate in day_rates.items()]
+            self.update(rows)
+            added += len(rows)
+            start = end
+        logger.info(f"Загружено {added} курсов валют.")
+        return {"added": added}
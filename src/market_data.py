@@ -0,0 +1,408 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.metrics import instrument
+
+# Адреса API курсов валют и цен на акции
+CURRENCY_URL = "https://api.apilayer.com/exchangerates_data/latest"
+CURRENCY_TIMESERIES_URL = "https://api.apilayer.com/exchangerates_data/timeseries"
+STOCK_URL = "https://api.marketstack.com/v1/eod/latest"
+
+# Максимальное количество тикеров в одном запросе к marketstack
+STOCK_BATCH_SIZE = 100
+
+# Максимальная длина периода в одном запросе исторических курсов (в днях)
+TIMESERIES_MAX_DAYS = 365
+
+# Время жизни значений в кэше по источникам (в секундах)
+DEFAULT_TTL = {"currency": 300, "stock": 3600}
+
+logger = logging.getLogger('financial_dashboard')
+
+
+def is_cacheable(value):
+    # Ошибки и пустые ответы не кэшируем
+    return value is not None and "error" not in value
+
+
+class MarketDataCache:
+    """
+    Кэш ответов API курсов и цен с временем жизни (TTL) по источникам и вытеснением LRU.
+
+    Устаревшее значение отдается сразу, а обновляется в фоне (stale-while-revalidate).
+    Если задан path, кэш сохраняется в JSON-файл и загружается из него при создании,
+    чтобы после перезапуска не запрашивать все значения заново.
+    """
+
+    def __init__(self, ttl=None, maxsize=1024, path=None, executor=None, clock=time.time):
+        self.ttl = dict(DEFAULT_TTL, **(ttl or {}))
+        self.maxsize = maxsize
+        self.path = path
+        self.executor = executor
+        self.clock = clock
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        # Запись файла идет без self._lock, чтобы не задерживать чтение кэша; записи выполняются по очереди
+        self._save_lock = threading.Lock()
+        if path:
+            self._load()
+
+    def get(self, source, symbol, fetch):
+        """
+        Возвращает значение из кэша или запрашивает его функцией fetch.
+
+        Аргументы:
+        source (str): Источник данных ("currency" или "stock").
+        symbol (str): Код валюты или тикер.
+        fetch (callable): Функция без аргументов, запрашивающая значение.
+
+        Возвращает:
+        object: Значение из кэша или результат fetch.
+        """
+        return self.get_many(source, [symbol], lambda symbols: {symbol: fetch()})[symbol]
+
+    def get_many(self, source, symbols, fetch_many):
+        """
+        Возвращает значения для нескольких символов, недостающие запрашивает одним вызовом fetch_many.
+
+        Аргументы:
+        source (str): Источник данных ("currency" или "stock").
+        symbols (list): Коды валют или тикеры.
+        fetch_many (callable): Функция, принимающая список символов и возвращающая словарь значений по символам.
+
+        Возвращает:
+        dict: Значения по символам.
+        """
+        values = {}
+        stale = []
+        missing = []
+        with self._lock:
+            now = self.clock()
+            for symbol in symbols:
+                key = f"{source}:{symbol}"
+                entry = self._entries.get(key)
+                if entry is None:
+                    self.misses += 1
+                    missing.append(symbol)
+                    continue
+                self._entries.move_to_end(key)
+                value, stored_at = entry
+                values[symbol] = value
+                if now - stored_at < self.ttl.get(source, 0):
+                    self.hits += 1
+                    continue
+                # Значение устарело: отдаем его и обновляем в фоне
+                self.stale_hits += 1
+                if key not in self._refreshing:
+                    self._refreshing.add(key)
+                    stale.append(symbol)
+
+        if stale:
+            self._submit(source, stale, fetch_many)
+        if missing:
+            fetched = fetch_many(missing)
+            for symbol in missing:
+                values[symbol] = fetched.get(symbol)
+            self._put_many(source, {symbol: values[symbol] for symbol in missing})
+        return values
+
+    def stats(self):
+        """
+        Возвращает счетчики попаданий и промахов кэша.
+
+        Возвращает:
+        dict: Количество попаданий, устаревших попаданий, промахов и записей.
+        """
+        with self._lock:
+            return {"hits": self.hits, "stale_hits": self.stale_hits, "misses": self.misses,
+                    "size": len(self._entries)}
+
+    def clear(self):
+        """Очищает кэш и счетчики."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.stale_hits = self.misses = 0
+
+    def _submit(self, source, symbols, fetch_many):
+        if self.executor is not None:
+            self.executor.submit(self._refresh, source, symbols, fetch_many)
+        else:
+            threading.Thread(target=self._refresh, args=(source, symbols, fetch_many), daemon=True).start()
+
+    def _refresh(self, source, symbols, fetch_many):
+        try:
+            fetched = fetch_many(symbols)
+            self._put_many(source, {symbol: fetched.get(symbol) for symbol in symbols})
+        finally:
+            with self._lock:
+                for symbol in symbols:
+                    self._refreshing.discard(f"{source}:{symbol}")
+
+    def _put_many(self, source, values):
+        # Сохраняет значения одного запроса; файл кэша перезаписывается один раз на запрос
+        values = {symbol: value for symbol, value in values.items() if is_cacheable(value)}
+        if not values:
+            return
+        with self._lock:
+            stored_at = self.clock()
+            for symbol, value in values.items():
+                key = f"{source}:{symbol}"
+                self._entries[key] = (value, stored_at)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        if self.path:
+            self._save()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        for key, (value, stored_at) in entries.items():
+            self._entries[key] = (value, stored_at)
+
+    def _save(self):
+        with self._save_lock:
+            # Под блокировкой кэша только копируем записи; сериализация и запись идут без нее
+            with self._lock:
+                entries = dict(self._entries)
+            tmp_path = f"{self.path}.tmp{os.getpid()}"
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(entries, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            except OSError as err:
+                logger.warning(f"Не удалось сохранить кэш курсов в {self.path}: {err}")
+
+
+class MarketDataClient:
+    """
+    Клиент API курсов валют и цен на акции.
+
+    Символы объединяются в пакетные запросы: все валюты запрашиваются одним запросом,
+    тикеры — пакетами по stock_batch_size. Пакеты выполняются параллельно в пуле потоков
+    через одну requests.Session с пулом keep-alive соединений, у каждого запроса есть таймаут.
+    Если задан cache (MarketDataCache), ответы берутся из него.
+    """
+
+    def __init__(self, currency_url=CURRENCY_URL, stock_url=STOCK_URL, timeout=5.0, max_workers=8, cache=None,
+                 stock_batch_size=STOCK_BATCH_SIZE, timeseries_url=CURRENCY_TIMESERIES_URL):
+        self.currency_url = currency_url
+        self.timeseries_url = timeseries_url
+        self.stock_url = stock_url
+        self.timeout = timeout
+        self.stock_batch_size = stock_batch_size
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=max_workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='market-data')
+        self.cache = cache
+
+    def close(self):
+        """Закрывает пул потоков и соединения."""
+        self._executor.shutdown(wait=False)
+        self.session.close()
+
+    @instrument('market_data.currency_rates', rows=lambda result, self, currencies, api_key: len(currencies))
+    def fetch_currency_rates(self, currencies, api_key):
+        """
+        Запрашивает курсы рубля относительно нескольких валют одним запросом.
+
+        API отдает курсы только для одной базовой валюты, поэтому запрашиваются курсы валют
+        относительно рубля (base=RUB), а курс рубля к валюте вычисляется как обратная величина.
+
+        Аргументы:
+        currencies (list): Коды валют.
+        api_key (str): API-ключ apilayer.
+
+        Возвращает:
+        dict: Для каждой валюты {"currency": ..., "rate": ...}, None если курса нет в ответе, или {"error": ...}.
+        """
+        try:
+            # Делаем один запрос к API для всех валют
+            response = self.session.get(self.currency_url, params={"symbols": ",".join(currencies), "base": "RUB"},
+                                        headers={"apikey": api_key}, timeout=self.timeout)
+            response.raise_for_status()  # Поднимет исключение для HTTP ошибок
+
+            # Если запрос успешен
+            data = response.json()
+
+            if 'rates' not in data:
+                return dict.fromkeys(currencies, {"error": "Курсы не обнаружены в данных ответа"})
+
+            # Раскладываем ответ по валютам: курс рубля к валюте обратен курсу валюты к рублю
+            rates = {}
+            for currency in currencies:
+                rate = data['rates'].get(currency)
+                rates[currency] = {"currency": currency, "rate": 1 / rate} if rate else None
+            return rates
+        except requests.exceptions.HTTPError as http_err:
+            return dict.fromkeys(currencies, {"error": f"HTTP error occurred: {http_err}"})
+        except requests.exceptions.RequestException as req_err:
+            return dict.fromkeys(currencies, {"error": f"Request error occurred: {req_err}"})
+        except Exception as err:
+            return dict.fromkeys(currencies, {"error": f"An error occurred: {err}"})
+
+    @instrument('market_data.currency_timeseries', rows=lambda result, self, currencies, *args: len(currencies))
+    def fetch_currency_timeseries(self, currencies, start_date, end_date, api_key):
+        """
+        Запрашивает дневные курсы рубля к нескольким валютам за период одним запросом.
+
+        Период одного запроса не длиннее TIMESERIES_MAX_DAYS дней. Как и в fetch_currency_rates,
+        запрашиваются курсы валют относительно рубля, а курс рубля к валюте — обратная величина.
+
+        Аргументы:
+        currencies (list): Коды валют.
+        start_date (str): Начало периода в формате 'YYYY-MM-DD'.
+        end_date (str): Конец периода в формате 'YYYY-MM-DD' (включительно).
+        api_key (str): API-ключ apilayer.
+
+        Возвращает:
+        dict: {"rates": {дата: {валюта: курс, ...}, ...}} или {"error": ...}.
+        """
+        try:
+            response = self.session.get(self.timeseries_url,
+                                        params={"start_date": start_date, "end_date": end_date,
+                                                "symbols": ",".join(currencies), "base": "RUB"},
+                                        headers={"apikey": api_key}, timeout=self.timeout)
+            response.raise_for_status()
+            data = response.json()
+
+            if 'rates' not in data:
+                return {"error": "Курсы не обнаружены в данных ответа"}
+
+            rates = {}
+            for date, day_rates in data['rates'].items():
+                rates[date] = {currency: 1 / rate for currency, rate in day_rates.items()
+                               if currency in currencies and rate}
+            return {"rates": rates}
+        except requests.exceptions.HTTPError as http_err:
+            return {"error": f"HTTP error occurred: {http_err}"}
+        except requests.exceptions.RequestException as req_err:
+            return {"error": f"Request error occurred: {req_err}"}
+        except Exception as err:
+            return {"error": f"An error occurred: {err}"}
+
+    @instrument('market_data.stock_prices', rows=lambda result, self, stocks, api_key: len(stocks))
+    def fetch_stock_prices(self, stocks, api_key):
+        """
+        Запрашивает последние цены закрытия нескольких акций одним запросом.
+
+        Аргументы:
+        stocks (list): Тикеры акций.
+        api_key (str): API-ключ marketstack.
+
+        Возвращает:
+        dict: Для каждого тикера {"stock": ..., "price": ...} или None при ошибке.
+        """
+        try:
+            # Делаем один запрос к API для всех тикеров пакета
+            response = self.session.get(self.stock_url, params={"access_key": api_key, "symbols": ",".join(stocks)},
+                                        timeout=self.timeout)
+            response.raise_for_status()  # Проверяем ошибки HTTP
+
+            # Получаем JSON-ответ
+            data = response.json()
+        except requests.exceptions.HTTPError as http_err:
+            print(f"HTTP error for {', '.join(stocks)}: {http_err}")
+            return dict.fromkeys(stocks)
+        except requests.exceptions.RequestException as req_err:
+            print(f"Request error for {', '.join(stocks)}: {req_err}")
+            return dict.fromkeys(stocks)
+        except Exception as err:
+            print(f"An error occurred for {', '.join(stocks)}: {err}")
+            return dict.fromkeys(stocks)
+
+        # Берем первую (последнюю по дате) цену закрытия для каждого тикера
+        closes = {}
+        for item in data.get("data") or []:
+            closes.setdefault(item.get("symbol"), item.get("close"))
+
+        prices = {}
+        for stock in stocks:
+            if stock not in closes:
+                print(f"Ошибка: нет данных для {stock}")
+                prices[stock] = None
+            else:
+                prices[stock] = {"stock": stock, "price": closes[stock]}
+        return prices
+
+    def fetch_stock_prices_batched(self, stocks, api_key):
+        """
+        Разбивает тикеры на пакеты и запрашивает их параллельно.
+
+        Аргументы:
+        stocks (list): Тикеры акций.
+        api_key (str): API-ключ marketstack.
+
+        Возвращает:
+        dict: Для каждого тикера {"stock": ..., "price": ...} или None при ошибке.
+        """
+        batches = [stocks[i:i + self.stock_batch_size] for i in range(0, len(stocks), self.stock_batch_size)]
+        if len(batches) == 1:
+            return self.fetch_stock_prices(batches[0], api_key)
+
+        prices = {}
+        for batch_prices in self._executor.map(lambda batch: self.fetch_stock_prices(batch, api_key), batches):
+            prices.update(batch_prices)
+        return prices
+
+    def get_currency_rates(self, currencies, api_key):
+        """
+        Запрашивает курсы всех валют одним пакетным запросом.
+
+        Аргументы:
+        currencies (list): Коды валют.
+        api_key (str): API-ключ apilayer.
+
+        Возвращает:
+        dict: {"currency_rates": [...]} или {"error": ...} при первой (по порядку валют) ошибке.
+        """
+        values = self._cached("currency", currencies, lambda symbols: self.fetch_currency_rates(symbols, api_key))
+        rates = []
+        for currency in currencies:
+            result = values.get(currency)
+            if result is None:
+                continue
+            if "error" in result:
+                return result
+            rates.append(result)
+        return {"currency_rates": rates}
+
+    def get_stock_prices(self, stocks, api_key):
+        """
+        Запрашивает цены всех акций пакетными запросами.
+
+        Аргументы:
+        stocks (list): Тикеры акций.
+        api_key (str): API-ключ marketstack.
+
+        Возвращает:
+        dict: {"stock_prices": [...]} в порядке тикеров, акции с ошибками пропускаются.
+        """
+        values = self._cached("stock", stocks, lambda symbols: self.fetch_stock_prices_batched(symbols, api_key))
+        return {"stock_prices": [values[stock] for stock in stocks if values.get(stock) is not None]}
+
+    def _cached(self, source, symbols, fetch_many):
+        # Повторяющиеся символы запрашиваем один раз
+        symbols = list(dict.fromkeys(symbols))
+        if not symbols:
+            return {}
+        if self.cache is None:
+            return fetch_many(symbols)
+        return self.cache.get_many(source, symbols, fetch_many)
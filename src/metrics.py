@@ -0,0 +1,139 @@
+import functools
+import threading
+import time
+
+# Сбор метрик выключен по умолчанию: декорированная функция только проверяет флаг
+_enabled = False
+_lock = threading.Lock()
+_metrics = {}
+
+# Метрики в формате Prometheus: имя, тип, описание
+PROMETHEUS_METRICS = [
+    ('calls', 'counter', 'Число вызовов'),
+    ('errors', 'counter', 'Число вызовов, завершившихся исключением'),
+    ('rows', 'counter', 'Число обработанных строк'),
+    ('seconds', 'counter', 'Суммарное время выполнения в секундах'),
+    ('max_seconds', 'gauge', 'Максимальное время одного вызова в секундах'),
+]
+
+
+def enable():
+    """Включает сбор метрик."""
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    """Выключает сбор метрик. Собранные значения сохраняются."""
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    """Возвращает True, если сбор метрик включен."""
+    return _enabled
+
+
+def reset():
+    """Удаляет собранные метрики."""
+    with _lock:
+        _metrics.clear()
+
+
+def record(name, seconds, rows=None, error=False):
+    """
+    Добавляет к метрикам один вызов.
+
+    Аргументы:
+    name (str): Имя метрики.
+    seconds (float): Время выполнения в секундах.
+    rows (int): Число обработанных строк (None, если не считается).
+    error (bool): Вызов завершился исключением.
+    """
+    with _lock:
+        entry = _metrics.get(name)
+        if entry is None:
+            entry = _metrics[name] = {'calls': 0, 'errors': 0, 'rows': 0, 'seconds': 0.0, 'max_seconds': 0.0}
+        entry['calls'] += 1
+        entry['errors'] += error
+        entry['rows'] += rows or 0
+        entry['seconds'] += seconds
+        entry['max_seconds'] = max(entry['max_seconds'], seconds)
+
+
+def instrument(name=None, rows=None):
+    """
+    Декоратор, который записывает время, число вызовов и строк функции, когда сбор метрик включен.
+
+    Аргументы:
+    name (str): Имя метрики (по умолчанию имя функции).
+    rows (callable): Функция rows(result, *args, **kwargs), возвращающая число обработанных строк.
+
+    Возвращает:
+    callable: Декоратор.
+    """
+    def decorator(func):
+        metric = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                record(metric, time.perf_counter() - start, error=True)
+                raise
+            record(metric, time.perf_counter() - start, rows(result, *args, **kwargs) if rows else None)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def result_rows(result, *args, **kwargs):
+    """Число строк результата (для instrument)."""
+    return len(result)
+
+
+def input_rows(result, df, *args, **kwargs):
+    """Число строк входных данных (для instrument)."""
+    return len(df)
+
+
+def get_metrics():
+    """
+    Возвращает собранные метрики.
+
+    Возвращает:
+    dict: Для каждой метрики число вызовов, ошибок и строк, суммарное, среднее и максимальное время.
+    """
+    with _lock:
+        metrics = {name: dict(entry) for name, entry in _metrics.items()}
+    for entry in metrics.values():
+        entry['avg_seconds'] = entry['seconds'] / entry['calls']
+    return metrics
+
+
+def prometheus_text(prefix='finance'):
+    """
+    Возвращает собранные метрики в текстовом формате Prometheus.
+
+    Аргументы:
+    prefix (str): Префикс имен метрик.
+
+    Возвращает:
+    str: Метрики в формате Prometheus.
+    """
+    metrics = get_metrics()
+    lines = []
+    for field, kind, description in PROMETHEUS_METRICS:
+        metric = f"{prefix}_{field}" + ('_total' if kind == 'counter' else '')
+        lines.append(f"# HELP {metric} {description}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for name in sorted(metrics):
+            lines.append(f'{metric}{{function="{name}"}} {metrics[name][field]}')
+    return '\n'.join(lines) + '\n'
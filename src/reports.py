@@ -1,25 +1,204 @@
+import atexit
+import functools
+import itertools
 import json
 import logging
+import os
+import queue
+import threading
+import time
 from datetime import datetime, timedelta
 
+import numpy as np
 import pandas as pd
 
-# Конфигурируем logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+from src.aggregates import AggregateCube
+from src.metrics import instrument
+from src.store import TransactionStore, get_transactions
+from src.utils import amount_kopecks, to_kopecks
 
+# Длина периода отчета по категориям (в днях)
+REPORT_PERIOD_DAYS = 90
 
-# Декоратор для записи отчета в файл
-def report_decorator(file_name=None):
-    if file_name is None:
-        file_name = f"report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
 
+# Служебная метка в очереди записи: записать накопленный пакет, не дожидаясь его заполнения
+_FLUSH = object()
+
+
+class ReportSink:
+    """
+    Запись отчетов в фоновом потоке через очередь.
+
+    Вызов декорированной функции только сериализует результат и ставит его в очередь,
+    а открытие файлов и запись на диск выполняет фоновый поток. Поддерживаются режимы:
+    - отдельный файл с уникальным именем на каждый отчет (по умолчанию);
+    - файл с явно заданным именем (перезаписывается);
+    - журнал JSON Lines (jsonl_path): отчеты дописываются в один файл по строке на отчет;
+    - пакетная запись (batch_size > 1): отчеты, накопившиеся за max_delay секунд,
+      записываются одним файлом со списком отчетов.
+    """
+
+    def __init__(self, directory=None, jsonl_path=None, batch_size=1, max_delay=0.5):
+        self.directory = directory
+        self.jsonl_path = os.path.abspath(jsonl_path) if jsonl_path else None
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _unique_name(self, prefix):
+        # Время с микросекундами и счетчик: одновременные вызовы не перезаписывают файлы друг друга
+        return f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{next(self._counter)}.json"
+
+    def submit(self, name, result, file_name=None):
+        """
+        Ставит отчет в очередь записи.
+
+        Результат сериализуется сразу, поэтому ошибки сериализации возникают в вызывающем потоке,
+        а последующие изменения результата не попадают в отчет.
+
+        Аргументы:
+        name (str): Название отчета (для журнала JSON Lines).
+        result: Результат для записи.
+        file_name (str): Имя файла отчета (по умолчанию уникальное для каждого вызова).
+
+        Возвращает:
+        str: Путь к файлу, в который будет записан отчет.
+        """
+        # Относительные пути разрешаются в текущей папке на момент вызова
+        directory = os.path.abspath(self.directory or '.')
+        if self.jsonl_path is not None and file_name is None:
+            record = {'report': name, 'created': datetime.now().isoformat(), 'result': result}
+            item = ('append', self.jsonl_path, json.dumps(record, ensure_ascii=False))
+        elif file_name is not None:
+            item = ('write', os.path.join(directory, file_name), json.dumps(result, indent=4, ensure_ascii=False))
+        elif self.batch_size > 1:
+            item = ('batch', directory, json.dumps(result, indent=4, ensure_ascii=False))
+        else:
+            item = ('write', os.path.join(directory, self._unique_name('report')),
+                    json.dumps(result, indent=4, ensure_ascii=False))
+
+        self._ensure_started()
+        self._queue.put(item)
+        return item[1]
+
+    def flush(self):
+        """Дожидается записи всех отчетов, поставленных в очередь."""
+        if self._thread is None:
+            return
+        self._queue.put(_FLUSH)
+        self._queue.join()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='report-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            # Собираем пакет, пока он не заполнится, не истечет max_delay или не придет запрос flush
+            deadline = time.monotonic() + self.max_delay
+            while items[-1] is not _FLUSH and len(items) < self.batch_size:
+                try:
+                    items.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+            try:
+                self._write([item for item in items if item is not _FLUSH])
+            except Exception as err:
+                logging.exception(f"Ошибка при записи отчетов: {err}")
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+
+    def _write(self, items):
+        appends, batches = {}, {}
+        for kind, path, payload in items:
+            if kind == 'write':
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(payload)
+                logging.info(f"Отчет записан в файл {path}")
+            elif kind == 'append':
+                appends.setdefault(path, []).append(payload)
+            else:
+                batches.setdefault(path, []).append(payload)
+
+        # Строки журнала и пакеты отчетов записываются одной операцией на файл
+        for path, lines in appends.items():
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+            logging.info(f"{len(lines)} отчетов дописано в файл {path}")
+        for directory, payloads in batches.items():
+            path = os.path.join(directory, self._unique_name('reports'))
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('[\n' + ',\n'.join(payloads) + '\n]')
+            logging.info(f"{len(payloads)} отчетов записано в файл {path}")
+
+
+_report_sink = None
+_report_sink_lock = threading.Lock()
+_flush_registered = False
+
+
+def _flush_report_sink():
+    if _report_sink is not None:
+        _report_sink.flush()
+
+
+def _register_flush():
+    # Вызывается под _report_sink_lock: обработчик регистрируется один раз для любого текущего приемника
+    global _flush_registered
+    if not _flush_registered:
+        atexit.register(_flush_report_sink)
+        _flush_registered = True
+
+
+def get_report_sink():
+    """
+    Возвращает общий приемник отчетов, создавая его при первом обращении.
+
+    Если задана переменная окружения REPORTS_JSONL, отчеты дописываются в указанный файл
+    JSON Lines. Незаписанные отчеты записываются при завершении программы.
+    """
+    global _report_sink
+    with _report_sink_lock:
+        if _report_sink is None:
+            _report_sink = ReportSink(jsonl_path=os.getenv('REPORTS_JSONL'))
+            _register_flush()
+        return _report_sink
+
+
+def set_report_sink(sink):
+    """
+    Заменяет общий приемник отчетов.
+
+    Аргументы:
+    sink (ReportSink): Новый приемник (None — приемник по умолчанию будет создан при следующем обращении).
+
+    Возвращает:
+    ReportSink: Предыдущий приемник (None, если он еще не создавался).
+    """
+    global _report_sink
+    with _report_sink_lock:
+        previous, _report_sink = _report_sink, sink
+        _register_flush()
+    if previous is not None:
+        previous.flush()
+    return previous
+
+
+# Декоратор для записи отчета в файл
+def report_decorator(file_name=None, sink=None):
     def decorator(func):
+        @functools.wraps(func)
         def wrapper(*args, **kwargs):
             result = func(*args, **kwargs)
-            # Записываем результат в файл, без экранирования символов в Unicode
-            with open(file_name, 'w', encoding='utf-8') as f:
-                json.dump(result, f, indent=4, ensure_ascii=False)
-            logging.info(f"Отчет записан в файл {file_name}")
+            # Запись на диск выполняется в фоне, без экранирования символов в Unicode
+            (sink or get_report_sink()).submit(func.__name__, result, file_name)
             return result
 
         return wrapper
@@ -27,33 +206,107 @@ def report_decorator(file_name=None):
     return decorator
 
 
+def _spending_table(transactions, rates=None):
+    """
+    Возвращает ключи времени (в наносекундах), категории и суммы (в копейках) для расчета расходов.
+
+    Для хранилища используются дневные агрегаты куба: агрегаты операций ровно в полночь
+    получают ключ полуночи, остальные — полночь + 1 нс. Границы периодов приходятся на полночь,
+    поэтому такие ключи дают тот же результат, что и время каждой операции.
+    Если задана таблица курсов, суммы переводятся в рубли по строкам: агрегаты куба
+    складывают суммы в разных валютах.
+    """
+    if rates is not None:
+        transactions = get_transactions(transactions)
+        dates = pd.to_datetime(transactions['Дата операции'], errors='coerce')
+        valid = dates.notna().to_numpy()
+        keys = dates.to_numpy()[valid].astype('datetime64[ns]').astype(np.int64)
+        amounts = to_kopecks(rates.to_rub(transactions[valid]))
+        return keys, transactions['Категория'][valid], amounts.to_numpy()
+
+    if isinstance(transactions, TransactionStore):
+        buckets = transactions.derived('cube', AggregateCube.build).buckets
+        keys = buckets['day'].to_numpy().astype('datetime64[ns]').astype(np.int64)
+        keys = keys + (~buckets['midnight'].to_numpy()).astype(np.int64)
+        return keys, buckets['category'], buckets['amount'].to_numpy()
+
+    dates = pd.to_datetime(transactions['Дата операции'], errors='coerce')
+    valid = dates.notna().to_numpy()
+    keys = dates.to_numpy()[valid].astype('datetime64[ns]').astype(np.int64)
+    return keys, transactions['Категория'][valid], amount_kopecks(transactions)[valid].to_numpy()
+
+
+def calculate_spending(transactions, categories=None, dates=None, rates=None):
+    """
+    Рассчитывает суммы трат по нескольким категориям за 90 дней до каждой из дат за один проход.
+
+    Операции группируются по категориям один раз, а сумма за каждый период считается как
+    разность накопленных сумм, границы периодов находятся бинарным поиском.
+
+    Аргументы:
+    transactions (TransactionStore или pandas.DataFrame): Хранилище или данные о транзакциях.
+    categories (list): Категории (по умолчанию все категории из данных).
+    dates (list): Даты окончания периодов в формате 'YYYY-MM-DD' (по умолчанию текущая дата).
+    rates (RateTable): Таблица курсов (src.fx); если задана, суммы в валюте переводятся в рубли.
+
+    Возвращает:
+    dict: Длина периода и список сумм трат по категориям и датам.
+    """
+    keys, category_column, amounts = _spending_table(transactions, rates)
+    if categories is None:
+        categories = sorted(category_column.dropna().unique())
+    if not dates:
+        dates = [datetime.now().strftime('%Y-%m-%d')]
+
+    # Границы периодов в наносекундах: с даты три месяца назад по дату окончания включительно
+    end_dates = [datetime.strptime(date, '%Y-%m-%d') for date in dates]
+    ends = np.array([pd.Timestamp(end_date).value for end_date in end_dates], dtype=np.int64)
+    starts = ends - pd.Timedelta(days=REPORT_PERIOD_DAYS).value
+
+    selected = category_column.isin(categories).to_numpy()
+    totals = {}
+    frame = pd.DataFrame({'key': keys[selected], 'category': category_column.to_numpy()[selected],
+                          'amount': amounts[selected]})
+    for category, group in frame.groupby('category', sort=False):
+        order = np.argsort(group['key'].to_numpy(), kind='stable')
+        group_keys = group['key'].to_numpy()[order]
+        cumulative = np.concatenate([[0], np.cumsum(group['amount'].to_numpy()[order])])
+        lo = np.searchsorted(group_keys, starts, side='left')
+        hi = np.searchsorted(group_keys, ends, side='right')
+        totals[category] = cumulative[hi] - cumulative[lo]
+
+    reports = []
+    for category in categories:
+        kopecks = totals.get(category, np.zeros(len(dates), dtype=np.int64))
+        for date, total in zip(dates, kopecks):
+            # Целая часть суммы в рублях, как int() от суммы
+            reports.append({'category': category, 'date': date, 'total_spending': int(int(total) / 100)})
+
+    logging.info(f"Рассчитаны суммы трат по {len(categories)} категориям для {len(dates)} дат")
+    return {'period_days': REPORT_PERIOD_DAYS, 'reports': reports}
+
+
+# Функция для получения сумм трат по нескольким категориям и датам (один файл отчета на вызов)
+@instrument()
+@report_decorator()
+def spending_by_categories(transactions, categories=None, dates=None, rates=None):
+    return calculate_spending(transactions, categories, dates, rates)
+
+
 # Функция для получения суммы трат по категории за указанный период
+@instrument()
 @report_decorator()
-def spending_by_category(transactions, category, date=None):
+def spending_by_category(transactions, category, date=None, rates=None):
     # Если дата не передана, берем текущую
     if date is None:
         date = datetime.now().strftime('%Y-%m-%d')
 
-    # Преобразуем строку в дату
-    end_date = datetime.strptime(date, '%Y-%m-%d')
-
-    # Определяем дату три месяца назад
-    start_date = end_date - timedelta(days=90)
-
-    # Убедимся, что 'Дата операции' в формате datetime
-    transactions['Дата операции'] = pd.to_datetime(transactions['Дата операции'], errors='coerce')
-
-    # Фильтруем транзакции по категории и дате
-    filtered_transactions = transactions[
-        (transactions['Категория'] == category) &
-        (transactions['Дата операции'] >= start_date) &
-        (transactions['Дата операции'] <= end_date)
-        ]
-
-    # Суммируем только значения по столбцу "Сумма операции"
-    total_spending = int(filtered_transactions['Сумма операции'].sum())
+    # Считаем сумму трат за три месяца до даты
+    total_spending = calculate_spending(transactions, [category], [date], rates)['reports'][0]['total_spending']
 
     # Выводим информацию о фильтрации
+    end_date = datetime.strptime(date, '%Y-%m-%d')
+    start_date = end_date - timedelta(days=REPORT_PERIOD_DAYS)
     logging.info(
         f"Общая сумма расходов по категории '{category}' за период с {start_date.strftime('%Y-%m-%d')} по {end_date.strftime('%Y-%m-%d')}: {total_spending}")
 
@@ -0,0 +1,179 @@
+import asyncio
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from src.config import init
+from src.services import find_transactions
+from src.utils import logger
+from src.views import get_dashboard_data, get_default_store
+
+# Максимальный размер тела запроса (тело GET-запросов не используется)
+MAX_BODY_SIZE = 1 << 20
+
+# Размер страницы поиска по умолчанию и наибольший допустимый: ответ собирается в памяти целиком
+SEARCH_PAGE_SIZE = 100
+MAX_SEARCH_PAGE_SIZE = 1000
+
+
+class DashboardServer:
+    """
+    Асинхронный HTTP-сервер дашборда на asyncio.
+
+    Обслуживает GET /dashboard?date=YYYY-MM-DD HH:MM:SS и GET /search?q=...&limit=...&offset=...
+    по данным хранилища транзакций. Поиск возвращает страницу из limit транзакций
+    (по умолчанию SEARCH_PAGE_SIZE, не больше MAX_SEARCH_PAGE_SIZE). Соединения обрабатываются в цикле событий,
+    а расчеты (фильтрация, агрегация, поиск, запросы курсов) выполняются в пуле потоков,
+    чтобы не блокировать цикл событий. Поддерживаются keep-alive соединения HTTP/1.1.
+    """
+
+    def __init__(self, store=None, host='127.0.0.1', port=8000, max_workers=8):
+        self.store = store
+        self.host = host
+        self.port = port
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='dashboard')
+        self._server = None
+
+    async def start(self):
+        """
+        Запускает сервер. Если port=0, порт выбирается системой и записывается в self.port.
+        """
+        if self.store is None:
+            self.store = get_default_store()
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"Сервер дашборда запущен на http://{self.host}:{self.port}")
+
+    async def serve_forever(self):
+        """Запускает сервер и обслуживает запросы до остановки."""
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        """Останавливает сервер и пул потоков."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self._executor.shutdown(wait=False)
+
+    def handle(self, method, target):
+        """
+        Обрабатывает запрос и возвращает статус и тело ответа в JSON.
+
+        Аргументы:
+        method (str): HTTP-метод.
+        target (str): Путь запроса с параметрами.
+
+        Возвращает:
+        tuple: HTTP-статус (HTTPStatus) и тело ответа (str).
+        """
+        if method != 'GET':
+            return HTTPStatus.METHOD_NOT_ALLOWED, json.dumps({"error": "Поддерживается только GET"})
+
+        url = urlsplit(target)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        try:
+            if url.path == '/dashboard':
+                if 'date' not in params:
+                    raise ValueError("Не указан параметр date")
+                dashboard = get_dashboard_data(params['date'], store=self.store)
+                return HTTPStatus.OK, json.dumps(dashboard, ensure_ascii=False)
+            if url.path == '/search':
+                if 'q' not in params:
+                    raise ValueError("Не указан параметр q")
+                limit = min(int(params.get('limit', SEARCH_PAGE_SIZE)), MAX_SEARCH_PAGE_SIZE)
+                offset = int(params.get('offset', 0))
+                result = find_transactions(self.store, params['q'])
+                return HTTPStatus.OK, ''.join(result.iter_json(limit, offset))
+        except ValueError as err:
+            return HTTPStatus.BAD_REQUEST, json.dumps({"error": str(err)}, ensure_ascii=False)
+        except Exception as err:
+            logger.exception(f"Ошибка при обработке запроса {target}: {err}")
+            return HTTPStatus.INTERNAL_SERVER_ERROR, json.dumps({"error": "Внутренняя ошибка сервера"},
+                                                                ensure_ascii=False)
+        return HTTPStatus.NOT_FOUND, json.dumps({"error": "Не найдено"}, ensure_ascii=False)
+
+    async def _handle_connection(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except (ValueError, asyncio.LimitOverrunError):
+                    # Строка запроса или заголовок длиннее буфера StreamReader: отвечаем и закрываем соединение
+                    body = json.dumps({"error": "Слишком длинный заголовок запроса"}, ensure_ascii=False)
+                    self._write_response(writer, HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, body, False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, target, keep_alive = request
+                if method is None:
+                    status, body = HTTPStatus.BAD_REQUEST, json.dumps({"error": "Некорректный запрос"})
+                else:
+                    # Расчеты выполняются в пуле потоков, цикл событий продолжает принимать запросы
+                    status, body = await loop.run_in_executor(self._executor, self.handle, method, target)
+                self._write_response(writer, status, body, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    @staticmethod
+    async def _read_request(reader):
+        request_line = await reader.readline()
+        if not request_line.strip():
+            return None
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if not line or line in (b'\r\n', b'\n'):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        parts = request_line.decode('latin-1').split()
+        if len(parts) != 3:
+            return None, None, False
+        method, target, version = parts
+
+        try:
+            length = int(headers.get('content-length') or 0)
+        except ValueError:
+            return None, None, False
+        if length < 0 or length > MAX_BODY_SIZE:
+            return None, None, False
+        if length:
+            await reader.readexactly(length)
+
+        connection = headers.get('connection', '').lower()
+        keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+        return method, target, keep_alive
+
+    @staticmethod
+    def _write_response(writer, status, body, keep_alive):
+        payload = body.encode('utf-8')
+        head = (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + payload)
+
+
+if __name__ == '__main__':
+    # Запуск: python -m src.server [порт]
+    init()
+    server = DashboardServer(port=int(sys.argv[1]) if len(sys.argv) > 1 else 8000)
+    asyncio.run(server.serve_forever())
@@ -1,58 +1,429 @@
+import bisect
 import json
 import logging
+import time
+from collections import defaultdict
 
-# Настройка логгера для записи в файл app.search.log
-logging.basicConfig(
-    filename='app.search.log',  # Логи будут записываться в файл app.search.log
-    level=logging.INFO,  # Уровень логирования
-    format='%(asctime)s - %(levelname)s - %(message)s'  # Формат лог-сообщений
-)
+import numpy as np
 
+from src.cache import get_cache_key, get_cache_path, load_arrays, save_arrays
+from src.metrics import instrument, result_rows
+from src.store import TransactionStore, get_transactions
+from src.utils import expand_transactions
 
-def search_transactions(df, query):
+# Разделители строк и полей в общей строке поиска
+ROW_SEPARATOR = '\x00'
+FIELD_SEPARATOR = '\x01'
+
+# Длина n-грамм в индексе поиска
+NGRAM_SIZE = 3
+
+# Число транзакций, для которых записи формируются за один раз при потоковой выдаче
+SEARCH_BATCH_SIZE = 1000
+
+logger = logging.getLogger('financial_dashboard')
+
+
+def normalize_search_column(column):
     """
-    Ищет транзакции, содержащие запрос в описании или категории.
+    Приводит колонку к виду, в котором по ней выполняется поиск: строка без пробелов по краям в нижнем регистре.
 
     Аргументы:
-    df (pandas.DataFrame): Данные о транзакциях.
-    query (str): Поисковый запрос.
+    column (pandas.Series): Колонка с текстом.
 
     Возвращает:
-    str: JSON-ответ со списком найденных транзакций.
+    pandas.Series: Нормализованная колонка.
     """
-    # Логгируем начало поиска
-    logging.info(f"Начинаем поиск транзакций по запросу: {query}")
+    # Пропуски ищутся как строка 'nan', так же как str(value) для NaN
+    return column.astype(str).fillna('nan').str.strip().str.lower()
 
-    query = query.lower()  # Приводим запрос к нижнему регистру
 
-    # Приводим столбцы "Описание" и "Категория" к строковому типу и удаляем лишние пробелы
-    df['Описание'] = df['Описание'].astype(str).str.strip()
-    df['Категория'] = df['Категория'].astype(str).str.strip()
+class NgramIndex:
+    """
+    Инвертированный индекс n-грамм (по умолчанию триграмм) описания и категории.
 
-    # Преобразуем все столбцы с типом Timestamp в строку
-    for column in df.select_dtypes(include=['datetime64']).columns:
-        df[column] = df[column].dt.strftime('%Y-%m-%d %H:%M:%S')
+    Для каждой n-граммы хранится отсортированный список строк, в которых она встречается.
+    Все списки лежат в одном массиве postings, границы списков задает массив offsets.
+    """
 
-    # Фильтруем транзакции с помощью filter и lambda
-    filtered_transactions = filter(
-        lambda row: query in str(row['Описание']).lower() or query in str(row['Категория']).lower(),
-        df.to_dict(orient="records")
-    )
+    def __init__(self, keys, offsets, postings, n=NGRAM_SIZE):
+        self.keys = keys
+        self.offsets = offsets
+        self.postings = postings
+        self.n = n
+        self._positions = {key: i for i, key in enumerate(keys.tolist())}
 
-    filtered_transactions_list = list(filtered_transactions)
+    @classmethod
+    def build(cls, descriptions, categories, n=NGRAM_SIZE):
+        """
+        Строит индекс по нормализованным описаниям и категориям.
 
-    # Логгируем количество найденных транзакций
-    logging.info(f"Найдено {len(filtered_transactions_list)} транзакций по запросу '{query}'.")
+        Аргументы:
+        descriptions (list): Нормализованные описания.
+        categories (list): Нормализованные категории.
+        n (int): Длина n-грамм.
 
-    # Если транзакции не найдены, записываем предупреждение
-    if len(filtered_transactions_list) == 0:
-        logging.warning(f"По запросу '{query}' не найдено ни одной транзакции.")
+        Возвращает:
+        NgramIndex: Построенный индекс.
+        """
+        postings = defaultdict(list)
+        for row, (description, category) in enumerate(zip(descriptions, categories)):
+            grams = {description[i:i + n] for i in range(len(description) - n + 1)}
+            grams.update(category[i:i + n] for i in range(len(category) - n + 1))
+            for gram in grams:
+                postings[gram].append(row)
+
+        keys = sorted(postings)
+        lengths = np.array([len(postings[key]) for key in keys], dtype=np.int64)
+        offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        flat = [row for key in keys for row in postings[key]]
+        return cls(np.array(keys, dtype=str), offsets, np.array(flat, dtype=np.int64), n)
+
+    def to_arrays(self):
+        """
+        Возвращает массивы индекса для сохранения.
+
+        Возвращает:
+        dict: Массивы по именам.
+        """
+        return {'keys': self.keys, 'offsets': self.offsets, 'postings': self.postings}
+
+    def candidates(self, query):
+        """
+        Возвращает строки, содержащие все n-граммы запроса.
+
+        Аргументы:
+        query (str): Поисковый запрос в нижнем регистре.
+
+        Возвращает:
+        numpy.ndarray или None: Позиции строк-кандидатов или None, если запрос короче n-граммы.
+        """
+        if len(query) < self.n:
+            return None
+
+        lists = []
+        for gram in {query[i:i + self.n] for i in range(len(query) - self.n + 1)}:
+            position = self._positions.get(gram)
+            if position is None:
+                return np.empty(0, dtype=np.int64)
+            lists.append(self.postings[self.offsets[position]:self.offsets[position + 1]])
+
+        # Пересекаем списки, начиная с самых коротких
+        lists.sort(key=len)
+        result = np.asarray(lists[0])
+        for postings in lists[1:]:
+            if not len(result):
+                break
+            result = np.intersect1d(result, postings, assume_unique=True)
+        return result
+
+
+class TransactionSearch:
+    """
+    Поиск подстроки в описании и категории транзакций.
+
+    Описание и категория нормализуются один раз при создании и склеиваются в одну строку,
+    по которой запрос ищется встроенным str.find. Строки DataFrame создаются только для
+    найденных транзакций. Если задан индекс n-грамм (index), проверяются только строки-кандидаты из него.
+    """
+
+    def __init__(self, df, index=None):
+        self.df = df
+        self.index = index
+        self._starts = []
+        self._haystack = ''
+        self._descriptions = []
+        self._categories = []
+        self._add_rows(df)
+
+    def _add_rows(self, df):
+        descriptions = normalize_search_column(df['Описание']).tolist()
+        categories = normalize_search_column(df['Категория']).tolist()
+        rows = [f"{description}{FIELD_SEPARATOR}{category}"
+                for description, category in zip(descriptions, categories)]
+        if not rows:
+            return
 
-    # Преобразуем результат в JSON и возвращаем
-    result = json.dumps(filtered_transactions_list, ensure_ascii=False,
-                        indent=4) if filtered_transactions_list else '[]'
+        # Позиции начала каждой строки в общей строке поиска
+        offset = len(self._haystack) + 1 if self._starts else 0
+        lengths = np.fromiter((len(row) + 1 for row in rows), dtype=np.int64, count=len(rows))
+        self._starts.extend((np.cumsum(lengths) - lengths + offset).tolist())
+        rows_text = ROW_SEPARATOR.join(rows)
+        self._haystack = f"{self._haystack}{ROW_SEPARATOR}{rows_text}" if offset else rows_text
+        self._descriptions.extend(descriptions)
+        self._categories.extend(categories)
+
+    def find(self, query):
+        """
+        Находит позиции транзакций, у которых запрос входит в описание или категорию.
+
+        Аргументы:
+        query (str): Поисковый запрос в нижнем регистре.
+
+        Возвращает:
+        list: Позиции найденных строк в DataFrame.
+        """
+        if self.index is not None and ROW_SEPARATOR not in query and FIELD_SEPARATOR not in query:
+            candidates = self.index.candidates(query)
+            if candidates is not None:
+                # Кандидаты проверяем той же проверкой вхождения подстроки, что и при полном просмотре
+                return [i for i in candidates.tolist()
+                        if query in self._descriptions[i] or query in self._categories[i]]
+
+        if ROW_SEPARATOR in query or FIELD_SEPARATOR in query:
+            return [i for i, (description, category) in enumerate(zip(self._descriptions, self._categories))
+                    if query in description or query in category]
+
+        positions = []
+        starts = self._starts
+        total = len(starts)
+        find = self._haystack.find
+        pos = find(query)
+        while pos != -1:
+            row = bisect.bisect_right(starts, pos) - 1
+            positions.append(row)
+            if row + 1 >= total:
+                break
+            # Продолжаем поиск со следующей строки: одна транзакция попадает в результат один раз
+            pos = find(query, starts[row + 1])
+        return positions
+
+    def extend(self, new_rows, df):
+        """
+        Дополняет движок транзакциями, добавленными в конец данных (см. TransactionStore.append_file).
+
+        Аргументы:
+        new_rows (pandas.DataFrame): Добавленные транзакции.
+        df (pandas.DataFrame): Все данные о транзакциях после добавления.
+
+        Возвращает:
+        bool: True, если движок дополнен; False, если его нужно построить заново.
+        """
+        # Индекс n-грамм не дополняется
+        if self.index is not None:
+            return False
+        self._add_rows(new_rows)
+        self.df = df
+        return True
+
+    def build_index(self, n=NGRAM_SIZE):
+        """
+        Строит индекс n-грамм по нормализованным описаниям и категориям.
+
+        Аргументы:
+        n (int): Длина n-грамм.
+
+        Возвращает:
+        NgramIndex: Индекс n-грамм.
+        """
+        return NgramIndex.build(self._descriptions, self._categories, n)
+
+    def records(self, positions):
+        """
+        Формирует список словарей для найденных транзакций.
+
+        Аргументы:
+        positions (list): Позиции найденных строк.
+
+        Возвращает:
+        list: Список словарей с данными транзакций.
+        """
+        rows = expand_transactions(self.df.iloc[positions]).copy()
+
+        # Приводим столбцы "Описание" и "Категория" к строковому типу и удаляем лишние пробелы
+        rows['Описание'] = rows['Описание'].astype(str).str.strip()
+        rows['Категория'] = rows['Категория'].astype(str).str.strip()
+
+        # Преобразуем все столбцы с типом Timestamp в строку
+        for column in rows.select_dtypes(include=['datetime64']).columns:
+            rows[column] = rows[column].dt.strftime('%Y-%m-%d %H:%M:%S')
+
+        return rows.to_dict(orient="records")
+
+
+def load_ngram_index(engine, file_path, cache_dir=None, appended_files=()):
+    """
+    Загружает индекс n-грамм из кэша рядом с данными или строит и сохраняет его.
+
+    Ключ кэша учитывает исходный файл и все добавленные к нему выгрузки, поэтому индекс
+    для одного набора выгрузок не подходит к другому с тем же числом строк.
+
+    Аргументы:
+    engine (TransactionSearch): Поисковый движок с нормализованными данными.
+    file_path (str): Путь к исходному файлу с операциями.
+    cache_dir (str): Каталог для кэшей.
+    appended_files (list): Пути к выгрузкам, добавленным к данным (см. TransactionStore.append_file).
+
+    Возвращает:
+    NgramIndex: Индекс n-грамм.
+    """
+    index_path = f"{get_cache_path(file_path, cache_dir)}.ngram"
+    key = dict(get_cache_key(file_path), rows=len(engine.df), n=NGRAM_SIZE,
+               appended=[get_cache_key(path) for path in appended_files])
+    try:
+        arrays = load_arrays(index_path, key)
+    except (OSError, ValueError) as err:
+        logger.warning(f"Не удалось прочитать индекс поиска {index_path}: {err}")
+        arrays = None
+    if arrays is not None:
+        return NgramIndex(**arrays)
 
-    # Логгируем результат, который возвращается
-    logging.info(f"Результат поиска: {result}")
+    index = engine.build_index()
+    try:
+        save_arrays(index_path, index.to_arrays(), key)
+    except OSError as err:
+        logger.warning(f"Не удалось записать индекс поиска {index_path}: {err}")
+    return index
 
+
+def get_search_engine(source):
+    """
+    Возвращает поисковый движок для хранилища или DataFrame.
+
+    Для хранилища движок строится один раз на версию данных. Если в хранилище включен
+    индекс поиска (search_index=True), движок использует индекс n-грамм.
+
+    Аргументы:
+    source (TransactionStore или pandas.DataFrame): Источник данных.
+
+    Возвращает:
+    TransactionSearch: Поисковый движок.
+    """
+    if isinstance(source, TransactionStore):
+        return source.derived('search', lambda df: _build_store_engine(source, df))
+    return TransactionSearch(get_transactions(source))
+
+
+def _build_store_engine(store, df):
+    engine = TransactionSearch(df)
+    if store.search_index:
+        engine.index = load_ngram_index(engine, store.file_path, store.cache_dir, store.appended_files)
+    return engine
+
+
+class SearchResult:
+    """
+    Ленивый результат поиска транзакций.
+
+    Хранит только позиции найденных строк; словари транзакций формируются пакетами
+    при обходе, поэтому память при потоковой выдаче не зависит от числа найденных транзакций.
+    """
+
+    def __init__(self, engine, query, positions):
+        self.engine = engine
+        self.query = query
+        self.positions = positions
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _page(self, limit=None, offset=0):
+        if offset < 0 or (limit is not None and limit < 0):
+            raise ValueError("limit и offset не могут быть отрицательными")
+        end = None if limit is None else offset + limit
+        return self.positions[offset:end]
+
+    def iter_records(self, limit=None, offset=0, batch_size=SEARCH_BATCH_SIZE):
+        """
+        Возвращает найденные транзакции по одной, формируя записи пакетами.
+
+        Аргументы:
+        limit (int): Максимальное число транзакций (по умолчанию все).
+        offset (int): Число пропускаемых транзакций.
+        batch_size (int): Число транзакций в пакете.
+
+        Возвращает:
+        generator: Словари с данными транзакций.
+        """
+        positions = self._page(limit, offset)
+        for start in range(0, len(positions), batch_size):
+            yield from self.engine.records(positions[start:start + batch_size])
+
+    def records(self, limit=None, offset=0):
+        """
+        Возвращает страницу найденных транзакций списком.
+
+        Аргументы:
+        limit (int): Максимальное число транзакций (по умолчанию все).
+        offset (int): Число пропускаемых транзакций.
+
+        Возвращает:
+        list: Список словарей с данными транзакций.
+        """
+        return self.engine.records(self._page(limit, offset))
+
+    def iter_json(self, limit=None, offset=0, batch_size=SEARCH_BATCH_SIZE):
+        """
+        Возвращает JSON-массив найденных транзакций частями, по одной части на пакет.
+
+        Аргументы:
+        limit (int): Максимальное число транзакций (по умолчанию все).
+        offset (int): Число пропускаемых транзакций.
+        batch_size (int): Число транзакций в пакете.
+
+        Возвращает:
+        generator: Части компактного JSON-ответа (str).
+        """
+        positions = self._page(limit, offset)
+        yield '['
+        for start in range(0, len(positions), batch_size):
+            batch = self.engine.records(positions[start:start + batch_size])
+            part = ','.join(json.dumps(record, ensure_ascii=False, separators=(',', ':')) for record in batch)
+            yield part if start == 0 else ',' + part
+        yield ']'
+
+    def write_json(self, fp, limit=None, offset=0, batch_size=SEARCH_BATCH_SIZE):
+        """
+        Записывает компактный JSON-массив найденных транзакций в файловый объект.
+
+        Аргументы:
+        fp: Текстовый файловый объект.
+        limit (int): Максимальное число транзакций (по умолчанию все).
+        offset (int): Число пропускаемых транзакций.
+        batch_size (int): Число транзакций в пакете.
+        """
+        for part in self.iter_json(limit, offset, batch_size):
+            fp.write(part)
+
+
+@instrument(rows=result_rows)
+def find_transactions(df, query):
+    """
+    Находит транзакции, содержащие запрос в описании или категории, без формирования записей.
+
+    Аргументы:
+    df (TransactionStore или pandas.DataFrame): Хранилище или данные о транзакциях.
+    query (str): Поисковый запрос.
+
+    Возвращает:
+    SearchResult: Ленивый результат поиска.
+    """
+    start = time.perf_counter()
+    query = query.lower()  # Приводим запрос к нижнему регистру
+    engine = get_search_engine(df)
+    result = SearchResult(engine, query, engine.find(query))
+
+    # В журнал попадают только сведения о поиске, а не найденные транзакции
+    logging.info(f"Поиск по запросу '{query}': найдено {len(result)} транзакций "
+                 f"за {(time.perf_counter() - start) * 1000:.1f} мс")
+    if not len(result):
+        logging.warning(f"По запросу '{query}' не найдено ни одной транзакции.")
     return result
+
+
+@instrument()
+def search_transactions(df, query, limit=None, offset=0):
+    """
+    Ищет транзакции, содержащие запрос в описании или категории.
+
+    Аргументы:
+    df (TransactionStore или pandas.DataFrame): Хранилище или данные о транзакциях.
+    query (str): Поисковый запрос.
+    limit (int): Максимальное число транзакций в ответе (по умолчанию все).
+    offset (int): Число пропускаемых транзакций.
+
+    Возвращает:
+    str: JSON-ответ со списком найденных транзакций.
+    """
+    records = find_transactions(df, query).records(limit, offset)
+    return json.dumps(records, ensure_ascii=False, indent=4)
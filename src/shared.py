@@ -0,0 +1,257 @@
+import argparse
+import json
+import os
+import re
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.config import init
+from src.store import TransactionStore
+from src.utils import compact_transactions, logger
+
+# Файл-указатель с номером текущей версии набора данных
+CURRENT_FILE = 'CURRENT'
+
+# Сколько прежних версий остается на диске после публикации новой
+DEFAULT_KEEP = 2
+
+# Сколько раз подключение повторяется, если версия была удалена между чтением указателя и открытием файлов
+ATTACH_RETRIES = 3
+
+_VERSION_PATTERN = re.compile(r'^v(\d+)$')
+
+
+def version_path(root, version):
+    """
+    Возвращает путь к каталогу версии набора данных.
+
+    Аргументы:
+    root (str): Каталог набора данных.
+    version (int): Номер версии.
+
+    Возвращает:
+    str: Путь к каталогу версии.
+    """
+    return os.path.join(root, f"v{version:08d}")
+
+
+def list_versions(root):
+    """
+    Возвращает номера версий набора данных, лежащих в каталоге.
+
+    Аргументы:
+    root (str): Каталог набора данных.
+
+    Возвращает:
+    list: Номера версий по возрастанию.
+    """
+    if not os.path.isdir(root):
+        return []
+    versions = [_VERSION_PATTERN.match(name) for name in os.listdir(root)]
+    return sorted(int(match.group(1)) for match in versions if match)
+
+
+def read_current_version(root):
+    """
+    Возвращает номер текущей (последней опубликованной) версии набора данных.
+
+    Аргументы:
+    root (str): Каталог набора данных.
+
+    Возвращает:
+    int: Номер версии.
+    """
+    try:
+        with open(os.path.join(root, CURRENT_FILE), encoding='utf-8') as f:
+            return int(f.read().strip())
+    except FileNotFoundError:
+        raise FileNotFoundError(f"В каталоге {root} нет опубликованного набора данных.") from None
+
+
+def publish_dataset(df, root, keep=DEFAULT_KEEP):
+    """
+    Публикует данные о транзакциях для рабочих процессов.
+
+    Данные переводятся в компактное представление (см. compact_transactions): строковые колонки
+    становятся кодами категорий, поэтому все колонки — числовые массивы без объектов Python.
+    Каждая колонка записывается в .npy-файл в каталог новой версии, после чего файл-указатель
+    CURRENT атомарно подменяется номером этой версии. Рабочие процессы отображают файлы в память
+    только для чтения (см. attach_dataset), и система держит одну копию данных для всех процессов.
+
+    Версии старше keep последних удаляются. Процессы, которые еще работают со старой версией,
+    сохраняют к ней доступ: отображение удаленного файла остается действительным до закрытия.
+
+    Аргументы:
+    df (pandas.DataFrame): Данные о транзакциях (обычные или компактные).
+    root (str): Каталог набора данных.
+    keep (int): Количество прежних версий, которые остаются на диске.
+
+    Возвращает:
+    int: Номер опубликованной версии.
+    """
+    if df.attrs.get('dtypes') is None:
+        df = compact_transactions(df)
+    os.makedirs(root, exist_ok=True)
+    version = max(list_versions(root), default=0) + 1
+
+    # Сначала пишем во временный каталог, затем атомарно переименовываем
+    target = version_path(root, version)
+    tmp_path = f"{target}.tmp{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    columns = []
+    for i, column in enumerate(df.columns):
+        series = df[column]
+        file_name = f"col_{i:03d}.npy"
+        entry = {'name': column, 'file': file_name}
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            values = series.array.codes
+            entry.update(kind='category', categories=series.cat.categories.tolist(),
+                         categories_dtype=str(series.cat.categories.dtype), ordered=bool(series.cat.ordered))
+        else:
+            values = series.to_numpy()
+            entry['kind'] = 'array'
+        if values.dtype == object:
+            raise ValueError(f"Колонку {column} с типом {series.dtype} нельзя опубликовать без объектов Python.")
+        np.save(os.path.join(tmp_path, file_name), np.ascontiguousarray(values))
+        columns.append(entry)
+
+    meta = {
+        'version': version,
+        'rows': len(df),
+        'columns': columns,
+        'dtypes': {column: str(dtype) for column, dtype in df.attrs['dtypes'].items()},
+        'kopecks': list(df.attrs['kopecks']),
+    }
+    with open(os.path.join(tmp_path, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp_path, target)
+
+    # Указатель подменяется одной операцией: читатель видит либо прежнюю, либо новую версию
+    current_tmp = os.path.join(root, f"{CURRENT_FILE}.tmp{os.getpid()}")
+    with open(current_tmp, 'w', encoding='utf-8') as f:
+        f.write(str(version))
+    os.replace(current_tmp, os.path.join(root, CURRENT_FILE))
+
+    for old in list_versions(root)[:-(keep + 1)]:
+        shutil.rmtree(version_path(root, old), ignore_errors=True)
+    logger.info(f"Опубликована версия {version} набора данных ({len(df)} транзакций) в {root}.")
+    return version
+
+
+def _load_column(path, rows):
+    # Пустой файл нельзя отобразить в память, поэтому пустые колонки читаются обычным образом
+    if not rows:
+        return np.load(path)
+    # Обычный ndarray поверх отображения: операции над колонкой не порождают объекты np.memmap
+    return np.load(path, mmap_mode='r').view(np.ndarray)
+
+
+def _attach(path):
+    with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+        meta = json.load(f)
+
+    columns = {}
+    for entry in meta['columns']:
+        values = _load_column(os.path.join(path, entry['file']), meta['rows'])
+        if entry['kind'] == 'category':
+            categories = pd.Index(entry['categories'], dtype=pd.api.types.pandas_dtype(entry['categories_dtype']))
+            values = pd.Categorical.from_codes(values, categories=categories, ordered=entry['ordered'],
+                                               validate=False)
+        # copy=False: колонки ссылаются на отображенные файлы, а не на копии в памяти процесса
+        columns[entry['name']] = pd.Series(values, copy=False)
+
+    df = pd.DataFrame(columns, copy=False)
+    df.attrs = {
+        'dtypes': {column: pd.api.types.pandas_dtype(dtype) for column, dtype in meta['dtypes'].items()},
+        'kopecks': meta['kopecks'],
+    }
+    return df
+
+
+def attach_dataset(root, version=None):
+    """
+    Подключает опубликованный набор данных без копирования.
+
+    Колонки DataFrame — отображения файлов версии в память только для чтения: страницы с данными
+    общие для всех процессов, подключивших ту же версию. Данные компактные (см. compact_transactions);
+    изменение колонок создает копию в памяти процесса, а сами файлы не меняются.
+
+    Аргументы:
+    root (str): Каталог набора данных.
+    version (int): Номер версии (по умолчанию текущая).
+
+    Возвращает:
+    tuple: Данные о транзакциях (pandas.DataFrame) и номер подключенной версии.
+    """
+    for attempt in range(ATTACH_RETRIES):
+        if version is None or attempt:
+            version = read_current_version(root)
+        try:
+            return _attach(version_path(root, version)), version
+        except FileNotFoundError:
+            # Версию успели удалить после публикации более новых: подключаем текущую
+            if attempt == ATTACH_RETRIES - 1:
+                raise
+
+
+class SharedTransactionStore(TransactionStore):
+    """
+    Хранилище транзакций рабочего процесса, подключенное к набору данных, опубликованному publish_dataset.
+
+    Данные не загружаются из файла выписки и не копируются: колонки ссылаются на общие для всех
+    процессов отображения файлов в память. Не чаще одного раза в check_interval секунд хранилище
+    читает указатель текущей версии и, если опубликована новая, подключает ее целиком, поэтому
+    рабочий процесс никогда не видит смесь колонок разных версий. Номер подключенной опубликованной
+    версии хранится в dataset_version. Производные структуры (поиск, агрегаты, кэш дашборда)
+    строятся в каждом процессе и перестраиваются после смены версии, как в TransactionStore.
+    """
+
+    def __init__(self, root, check_interval=1.0):
+        super().__init__(os.path.join(root, CURRENT_FILE), check_interval=check_interval, compact=True)
+        self.root = root
+        self.dataset_version = None
+
+    def _read_signature(self):
+        return read_current_version(self.root)
+
+    def _load(self, signature):
+        df, self.dataset_version = attach_dataset(self.root, signature)
+        return df
+
+
+def main(argv=None):
+    """
+    Загрузчик набора данных: читает выписку и публикует ее для рабочих процессов.
+
+    С параметром --watch загрузчик не завершается, а проверяет выписку и публикует новую версию
+    после каждого ее изменения.
+    """
+    parser = argparse.ArgumentParser(description='Публикация данных о транзакциях для рабочих процессов')
+    parser.add_argument('file_path', help='файл с выпиской')
+    parser.add_argument('root', help='каталог набора данных (например, в /dev/shm)')
+    parser.add_argument('--cache-dir', help='каталог кэша выписки')
+    parser.add_argument('--keep', type=int, default=DEFAULT_KEEP, help='сколько прежних версий хранить')
+    parser.add_argument('--watch', type=float, help='интервал проверки выписки в секундах')
+    args = parser.parse_args(argv)
+
+    store = TransactionStore(args.file_path, cache_dir=args.cache_dir, check_interval=0, compact=True)
+    published = None
+    while True:
+        df, version = store.snapshot()
+        if version != published:
+            publish_dataset(df, args.root, keep=args.keep)
+            published = version
+        if args.watch is None:
+            return 0
+        time.sleep(args.watch)
+
+
+if __name__ == '__main__':
+    # Запуск: python -m src.shared operations.xlsx /dev/shm/finance --watch 5
+    init()
+    raise SystemExit(main())
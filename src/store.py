@@ -0,0 +1,278 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.utils import append_transactions, compact_transactions, load_operations_data, logger, transaction_keys
+
+
+def get_file_signature(file_path):
+    """
+    Возвращает сигнатуру файла (время изменения и размер) для отслеживания изменений.
+
+    Аргументы:
+    file_path (str): Путь к файлу.
+
+    Возвращает:
+    tuple: Время изменения в наносекундах и размер файла.
+    """
+    stat = os.stat(file_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def count_keys(df):
+    """
+    Считает транзакции с каждым ключом (см. transaction_keys).
+
+    Аргументы:
+    df (pandas.DataFrame): Данные о транзакциях.
+
+    Возвращает:
+    dict: Количество транзакций по ключу.
+    """
+    keys, counts = np.unique(transaction_keys(df), return_counts=True)
+    return dict(zip(keys.tolist(), counts.tolist()))
+
+
+class TransactionStore:
+    """
+    Хранилище транзакций, которое загружает данные один раз и держит их в памяти.
+
+    При обращении к данным хранилище не чаще одного раза в check_interval секунд
+    проверяет исходный файл и перезагружает данные, если файл изменился.
+    Каждая перезагрузка увеличивает номер версии данных (version).
+    Если search_index=True, для поиска строится индекс n-грамм, который сохраняется рядом с кэшем данных.
+    Если compact=True, данные держатся в памяти в компактном представлении (см. compact_transactions).
+
+    Дополнительные выгрузки добавляются методом append_file: в хранилище попадают только
+    транзакции, которых в нем еще нет, а производные структуры обновляются по новым строкам.
+    """
+
+    def __init__(self, file_path, cache_dir=None, check_interval=1.0, search_index=False, compact=False):
+        self.file_path = file_path
+        self.cache_dir = cache_dir
+        self.check_interval = check_interval
+        self.search_index = search_index
+        self.compact = compact
+        self.version = 0
+        self._df = None
+        self._signature = None
+        self._checked_at = 0.0
+        self._derived = {}
+        # Блокировки построения производных структур по имени: каждую структуру строит один поток
+        self._build_locks = {}
+        self._appended_files = []
+        self._key_counts = None
+        self._lock = threading.RLock()
+        # Блокировка изменяющих операций (перезагрузка, добавление выгрузок); чтение ее не ждет
+        self._reload_lock = threading.RLock()
+
+    @property
+    def df(self):
+        """
+        Возвращает актуальные данные о транзакциях.
+
+        Возвращает:
+        pandas.DataFrame: Данные о транзакциях.
+        """
+        self.refresh()
+        return self._df
+
+    @property
+    def appended_files(self):
+        """
+        Возвращает пути к выгрузкам, добавленным в хранилище методом append_file.
+
+        Возвращает:
+        tuple: Пути к файлам в порядке добавления.
+        """
+        return tuple(self._appended_files)
+
+    def refresh(self, force=False):
+        """
+        Перезагружает данные, если исходный файл изменился.
+
+        Новые данные загружаются без блокировки хранилища и подменяют прежние одной операцией:
+        пока идет загрузка, другие потоки получают прежние данные и не ждут ее окончания.
+        Загрузку выполняет один поток; остальные ждут ее только при первой загрузке и при force=True.
+
+        Аргументы:
+        force (bool): Перезагрузить данные без проверки файла.
+
+        Возвращает:
+        bool: True, если данные были перезагружены.
+        """
+        now = time.monotonic()
+        if not force and self._df is not None and now - self._checked_at < self.check_interval:
+            return False
+
+        if not self._reload_lock.acquire(blocking=force or self._df is None):
+            # Данные уже перезагружает другой поток
+            return False
+        try:
+            signature = self._read_signature()
+            self._checked_at = now
+            if not force and self._df is not None and signature == self._signature:
+                return False
+
+            df = self._load(signature)
+            key_counts = None
+            # Добавленные ранее выгрузки применяются к перезагруженным данным заново
+            for file_path in self._appended_files:
+                if key_counts is None:
+                    key_counts = count_keys(df)
+                df, _ = self._append(df, key_counts, load_operations_data(file_path, cache_dir=self.cache_dir))
+
+            with self._lock:
+                self._df, self._key_counts, self._signature = df, key_counts, signature
+                self.version += 1
+            logger.info(f"Хранилище транзакций обновлено до версии {self.version}.")
+            return True
+        finally:
+            self._reload_lock.release()
+
+    def _read_signature(self):
+        # Сигнатура источника данных: по ее изменению хранилище понимает, что данные нужно перезагрузить
+        return get_file_signature(self.file_path)
+
+    def _load(self, signature):
+        # Загружает данные источника, соответствующие сигнатуре signature
+        df = load_operations_data(self.file_path, cache_dir=self.cache_dir)
+        return compact_transactions(df) if self.compact else df
+
+    def snapshot(self):
+        """
+        Возвращает актуальные данные вместе с их версией.
+
+        Данные и версия берутся под блокировкой, поэтому соответствуют друг другу
+        даже при одновременной перезагрузке.
+
+        Возвращает:
+        tuple: Данные о транзакциях (pandas.DataFrame) и номер версии.
+        """
+        self.refresh()
+        with self._lock:
+            return self._df, self.version
+
+    def append_file(self, file_path, chunk_size=None):
+        """
+        Добавляет в хранилище транзакции из еще одной выгрузки, пересекающейся с уже загруженными.
+
+        Транзакции сравниваются по ключу (см. transaction_keys). Одинаковые транзакции внутри
+        выгрузки нумеруются, поэтому добавляются только те повторы, которых в хранилище меньше,
+        чем в выгрузке. Производные структуры с методом extend (агрегаты, поиск) обновляются
+        по новым строкам, остальные перестраиваются при следующем обращении.
+
+        Аргументы:
+        file_path (str): Путь к файлу Excel с выгрузкой.
+        chunk_size (int): Количество строк в блоке при потоковом чтении (см. load_operations_data).
+
+        Возвращает:
+        int: Количество добавленных транзакций.
+        """
+        new_rows = load_operations_data(file_path, cache_dir=self.cache_dir, chunk_size=chunk_size)
+        with self._reload_lock:
+            self.refresh()
+            if self._key_counts is None:
+                self._key_counts = count_keys(self._df)
+            df, new_rows = self._append(self._df, self._key_counts, new_rows)
+
+            with self._lock:
+                self._appended_files.append(file_path)
+                if new_rows is None:
+                    return 0
+                version = self.version
+                self._df = df
+                self.version += 1
+                for name, (built_version, value) in list(self._derived.items()):
+                    extend = getattr(value, 'extend', None)
+                    if built_version == version and extend is not None and extend(new_rows, df):
+                        self._derived[name] = (self.version, value)
+                    else:
+                        del self._derived[name]
+            logger.info(f"Из файла {file_path} добавлено {len(new_rows)} транзакций, версия {self.version}.")
+            return len(new_rows)
+
+    def _append(self, df, key_counts, new_rows):
+        # Добавляет к df транзакции new_rows, которых в нем еще нет; key_counts (счетчики ключей df) обновляются.
+        # Возвращает данные после добавления и добавленные строки (None, если новых нет)
+        keys = transaction_keys(new_rows)
+        # Номер повтора транзакции внутри выгрузки против количества таких транзакций в хранилище
+        occurrence = pd.Series(keys).groupby(keys).cumcount().to_numpy()
+        known = np.fromiter((key_counts.get(key, 0) for key in keys.tolist()), dtype=np.int64, count=len(keys))
+        fresh = occurrence >= known
+        if not fresh.any():
+            return df, None
+
+        new_rows = new_rows[fresh]
+        for key in keys[fresh].tolist():
+            key_counts[key] = key_counts.get(key, 0) + 1
+        df = append_transactions(df, new_rows)
+        if self.compact:
+            new_rows = compact_transactions(new_rows)
+        return df, new_rows
+
+    def derived(self, name, build, version=None):
+        """
+        Возвращает производную структуру (индекс, агрегаты), построенную для текущей версии данных.
+
+        Структура строится функцией build один раз и перестраивается после перезагрузки данных.
+        Построение идет без блокировки хранилища, поэтому snapshot и другие структуры его не ждут;
+        одну и ту же структуру одновременно строит только один поток. Если за время построения
+        данные обновились, структура возвращается, но не сохраняется.
+
+        Аргументы:
+        name (str): Имя структуры.
+        build (callable): Функция, строящая структуру по DataFrame.
+        version (int): Версия данных, для которой нужна структура (см. snapshot).
+            Если данные уже обновились, возвращается None.
+
+        Возвращает:
+        object: Построенная структура.
+        """
+        self.refresh()
+        with self._lock:
+            value = self._cached_derived(name, version)
+            if value is not None:
+                return value
+            build_lock = self._build_locks.setdefault(name, threading.Lock())
+
+        with build_lock:
+            with self._lock:
+                # Пока поток ждал, структуру мог построить другой поток
+                value = self._cached_derived(name, version)
+                if value is not None or (version is not None and version != self.version):
+                    return value
+                df, built_version = self._df, self.version
+
+            value = build(df)
+            with self._lock:
+                if built_version == self.version:
+                    self._derived[name] = (built_version, value)
+                elif version is not None:
+                    return None
+            return value
+
+    def _cached_derived(self, name, version):
+        # Уже построенная для текущей версии структура; None, если ее нет или версия version устарела
+        if version is not None and version != self.version:
+            return None
+        built_version, value = self._derived.get(name, (None, None))
+        return value if built_version == self.version else None
+
+
+def get_transactions(source):
+    """
+    Возвращает DataFrame с транзакциями из хранилища или сам переданный DataFrame.
+
+    Аргументы:
+    source (TransactionStore или pandas.DataFrame): Источник данных.
+
+    Возвращает:
+    pandas.DataFrame: Данные о транзакциях.
+    """
+    if isinstance(source, TransactionStore):
+        return source.df
+    return source
@@ -1,47 +1,45 @@
 import datetime
 import logging
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 
+import numpy as np
 import pandas as pd
 
+from src.cache import is_cached, load_bundle, load_cached, save_bundle_chunks, save_cached, save_cached_chunks
+from src.metrics import input_rows, instrument, result_rows
 
-# Конфигурация логгера
 
+# Логгер приложения; запись в app.log настраивается в src.config.init
+logger = logging.getLogger('financial_dashboard')
 
-def setup_logger():
-    logger = logging.getLogger('financial_dashboard')
-    logger.setLevel(logging.INFO)
+# Колонка с датой операции
+DATE_COLUMN = 'Дата операции'
 
-    # Создаем обработчик для записи в файл
-    file_handler = logging.FileHandler('app.log', encoding='utf-8')
-    file_handler.setLevel(logging.INFO)
+# Количество строк в блоке при потоковом чтении Excel
+CHUNK_SIZE = 50_000
 
-    # Создаем форматтер
-    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-    file_handler.setFormatter(formatter)
+# Колонки с суммами в рублях, которые в компактном представлении хранятся в копейках
+AMOUNT_COLUMNS = ['Сумма операции', 'Сумма платежа', 'Сумма операции с округлением']
 
-    # Добавляем обработчик в логгер
-    logger.addHandler(file_handler)
+# Колонки транзакций в топе дашборда
+TOP_COLUMNS = ['Дата операции', 'Сумма операции', 'Категория', 'Описание']
 
-    return logger
+# Колонки, по которым транзакция из пересекающихся выгрузок считается одной и той же
+TRANSACTION_KEY_COLUMNS = ['Дата операции', 'Номер карты', 'Сумма операции', 'Валюта операции', 'Описание']
 
 
-# Получаем логгер
-logger = setup_logger()
-
-
-def load_operations_data(file_path):
+def convert_operations_types(df):
     """
-    Загружает данные о транзакциях из Excel-файла.
+    Приводит колонки выгрузки операций к нужным типам (даты, числа).
 
     Аргументы:
-    file_path (str): Путь к файлу Excel.
+    df (pandas.DataFrame): Сырые данные из Excel.
 
     Возвращает:
-    pandas.DataFrame: Данные о транзакциях.
+    pandas.DataFrame: Данные с преобразованными типами.
     """
-    # Загрузка данных из Excel
-    df = pd.read_excel(file_path)
-
     # Преобразуем колонку "Дата операции" в формат datetime
     df['Дата операции'] = pd.to_datetime(df['Дата операции'], errors='coerce', dayfirst=True)
 
@@ -55,12 +53,470 @@ def load_operations_data(file_path):
     df['Бонусы (включая кэшбэк)'] = pd.to_numeric(df['Бонусы (включая кэшбэк)'], errors='coerce')
     df['Округление на инвесткопилку'] = pd.to_numeric(df['Округление на инвесткопилку'], errors='coerce')
     df['Сумма операции с округлением'] = pd.to_numeric(df['Сумма операции с округлением'], errors='coerce')
+    return df
+
+
+def _convert_cell(value):
+    # Как pd.read_excel: целые числа, записанные как float, читаются как int
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _typed_chunk(rows, header):
+    df = pd.DataFrame(rows, columns=header)
+    return convert_operations_types(df)
+
+
+def iter_operations_chunks(file_path, chunk_size=CHUNK_SIZE):
+    """
+    Читает выгрузку операций из Excel блоками по chunk_size строк.
+
+    Лист читается openpyxl в режиме read_only строка за строкой, поэтому в памяти
+    находится только текущий блок. Каждый блок типизируется convert_operations_types.
+    Пустые строки в конце листа пропускаются, как в pd.read_excel.
+
+    Аргументы:
+    file_path (str): Путь к файлу Excel.
+    chunk_size (int): Количество строк в блоке.
+
+    Возвращает:
+    generator: Блоки данных о транзакциях (pandas.DataFrame).
+    """
+    # openpyxl нужен только для потокового чтения, поэтому импортируется здесь
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        header = list(header)
+        width = len(header)
+
+        block = []
+        empty = []
+        yielded = False
+        for row in rows:
+            if all(value is None for value in row):
+                empty.append([None] * width)
+                continue
+            # Пустые строки внутри данных сохраняются, в конце листа — отбрасываются
+            block.extend(empty)
+            empty = []
+            values = [_convert_cell(value) for value in row[:width]]
+            block.append(values + [None] * (width - len(values)))
+            if len(block) >= chunk_size:
+                yield _typed_chunk(block, header)
+                yielded = True
+                block = []
+        if block or not yielded:
+            yield _typed_chunk(block, header)
+    finally:
+        workbook.close()
+
+
+def to_kopecks(amounts):
+    """
+    Переводит суммы в рублях в целое число копеек (пропуски считаются нулем).
+
+    Аргументы:
+    amounts (pandas.Series): Суммы в рублях.
+
+    Возвращает:
+    pandas.Series: Суммы в копейках (int64).
+    """
+    return (amounts * 100).round().fillna(0).astype('int64')
+
+
+def calculate_cashback(spent_kopecks):
+    """
+    Рассчитывает кешбэк: 1% от суммы расходов, округленный до копейки так же, как numpy.round
+    (половина копейки округляется по двоичному значению суммы, как round от numpy.float64).
+
+    Сумма расходов берется точной, в копейках, а не суммой float в рублях. Если ошибка суммирования
+    float сдвигает сумму с половины копейки кешбэка (например, 3983.4999999999995 вместо 3983.50),
+    результат отличается от суммы float на 1 копейку и соответствует точной сумме.
+
+    Аргументы:
+    spent_kopecks (int): Сумма расходов в копейках (неотрицательная).
+
+    Возвращает:
+    float: Кешбэк в рублях.
+    """
+    return float(np.round(spent_kopecks / 100 / 100, 2))
+
+
+def compact_transactions(df):
+    """
+    Переводит данные о транзакциях в компактное представление для хранения в памяти.
+
+    Строковые колонки становятся категориальными, суммы (AMOUNT_COLUMNS) — целыми копейками (int64),
+    остальные числа приводятся к меньшим типам. Преобразование выполняется только без потери точности:
+    колонка, которую нельзя сжать без потерь, остается как есть. Исходные типы сохраняются
+    в df.attrs, по ним expand_transactions восстанавливает данные.
+
+    Аргументы:
+    df (pandas.DataFrame): Данные о транзакциях.
+
+    Возвращает:
+    pandas.DataFrame: Компактные данные о транзакциях.
+    """
+    compact = df.copy()
+    dtypes = {}
+    kopecks = []
+    for column in df.columns:
+        values = df[column]
+        if column in AMOUNT_COLUMNS and values.dtype.kind == 'f' and values.notna().all():
+            amounts = to_kopecks(values)
+            if (amounts / 100).equals(values):
+                compact[column] = amounts
+                kopecks.append(column)
+        elif values.dtype == object or pd.api.types.is_string_dtype(values.dtype):
+            compact[column] = values.astype('category')
+        elif values.dtype.kind == 'i':
+            compact[column] = pd.to_numeric(values, downcast='integer')
+        elif values.dtype.kind == 'f':
+            downcast = values.astype('float32')
+            if downcast.astype(values.dtype).equals(values):
+                compact[column] = downcast
+        if compact[column].dtype != values.dtype:
+            dtypes[column] = values.dtype
+
+    compact.attrs = {'dtypes': dtypes, 'kopecks': kopecks}
+    return compact
+
+
+def expand_transactions(df):
+    """
+    Восстанавливает исходные типы колонок данных, сжатых compact_transactions.
+
+    Аргументы:
+    df (pandas.DataFrame): Компактные или обычные данные о транзакциях.
+
+    Возвращает:
+    pandas.DataFrame: Данные о транзакциях с исходными типами колонок.
+    """
+    dtypes = df.attrs.get('dtypes')
+    if not dtypes:
+        return df
+
+    expanded = df.copy()
+    for column, dtype in dtypes.items():
+        if column in df.attrs['kopecks']:
+            expanded[column] = (df[column] / 100).astype(dtype)
+        else:
+            expanded[column] = df[column].astype(dtype)
+    expanded.attrs = {}
+    return expanded
+
+
+def amount_kopecks(df, column='Сумма операции'):
+    """
+    Возвращает суммы колонки в копейках для обычных и компактных данных.
+
+    Аргументы:
+    df (pandas.DataFrame): Данные о транзакциях.
+    column (str): Колонка с суммами.
+
+    Возвращает:
+    pandas.Series: Суммы в копейках (int64).
+    """
+    if column in df.attrs.get('kopecks', ()):
+        return df[column]
+    return to_kopecks(pd.to_numeric(df[column]))
+
+
+def amount_rubles(df, column='Сумма операции'):
+    """
+    Возвращает суммы колонки в рублях для обычных и компактных данных.
+
+    Аргументы:
+    df (pandas.DataFrame): Данные о транзакциях.
+    column (str): Колонка с суммами.
+
+    Возвращает:
+    pandas.Series: Суммы в рублях.
+    """
+    if column in df.attrs.get('kopecks', ()):
+        return df[column] / 100
+    return pd.to_numeric(df[column])
+
+
+class DateOrder:
+    """
+    Порядок транзакций по дате операции для выбора диапазонов дат бинарным поиском.
+
+    Сами данные не меняются и остаются в порядке файла: хранятся позиции строк,
+    упорядоченные по дате (устойчиво, пропуски в конце), и отсортированные даты.
+    Диапазон дат находится за O(log n) (см. slice_by_date).
+    """
+
+    def __init__(self, df):
+        self.df = df
+        dates = pd.to_datetime(df[DATE_COLUMN], errors='coerce').to_numpy().astype('datetime64[ns]')
+        # Устойчивая сортировка сохраняет порядок операций с одинаковым временем, NaT идут в конце
+        self.positions = np.argsort(dates, kind='stable')
+        self.dates = dates[self.positions]
+
+    def __len__(self):
+        return len(self.positions)
+
+    def range(self, start_date, end_date):
+        """
+        Возвращает позиции транзакций с датой операции в диапазоне [start_date, end_date].
+
+        Аргументы:
+        start_date (datetime): Начало диапазона (включительно).
+        end_date (datetime): Конец диапазона (включительно).
+
+        Возвращает:
+        numpy.ndarray: Позиции строк в порядке данных.
+        """
+        start, end = self.bounds([start_date], [end_date])
+        return np.sort(self.positions[start[0]:end[0]])
+
+    def bounds(self, start_dates, end_dates):
+        """
+        Возвращает границы диапазонов дат в упорядоченных по дате позициях (positions).
+
+        Аргументы:
+        start_dates (list): Начала диапазонов (включительно).
+        end_dates (list): Концы диапазонов (включительно).
+
+        Возвращает:
+        tuple: Массивы начал и концов диапазонов в positions.
+        """
+        starts = np.array([pd.Timestamp(date).as_unit('ns').to_datetime64() for date in start_dates],
+                          dtype='datetime64[ns]')
+        ends = np.array([pd.Timestamp(date).as_unit('ns').to_datetime64() for date in end_dates],
+                        dtype='datetime64[ns]')
+        return (np.searchsorted(self.dates, starts, side='left'),
+                np.searchsorted(self.dates, ends, side='right'))
+
+    def extend(self, new_rows, df):
+        """
+        Дополняет порядок транзакциями, добавленными в конец данных (см. TransactionStore.append_file).
+
+        Новые даты вставляются в уже упорядоченные за O(n) без повторной сортировки.
+
+        Аргументы:
+        new_rows (pandas.DataFrame): Добавленные транзакции.
+        df (pandas.DataFrame): Все данные о транзакциях после добавления.
+
+        Возвращает:
+        bool: Всегда True.
+        """
+        added = DateOrder(new_rows)
+        # side='right': новые операции идут после прежних с тем же временем
+        insert_at = np.searchsorted(self.dates, added.dates, side='right')
+        self.positions = np.insert(self.positions, insert_at, added.positions + len(self.positions))
+        self.dates = np.insert(self.dates, insert_at, added.dates)
+        self.df = df
+        return True
+
+
+def transaction_keys(df):
+    """
+    Возвращает ключ каждой транзакции: хэш колонок TRANSACTION_KEY_COLUMNS.
+
+    Ключ не зависит от представления данных (обычное или компактное), поэтому по нему
+    можно находить одни и те же транзакции в пересекающихся выгрузках.
+
+    Аргументы:
+    df (pandas.DataFrame): Данные о транзакциях.
+
+    Возвращает:
+    numpy.ndarray: Ключи транзакций (uint64).
+    """
+    columns = {}
+    for column in TRANSACTION_KEY_COLUMNS:
+        if column in AMOUNT_COLUMNS:
+            columns[column] = amount_kopecks(df, column).to_numpy()
+        elif pd.api.types.is_datetime64_any_dtype(df[column]):
+            columns[column] = df[column].to_numpy().astype('datetime64[ns]').view('int64')
+        else:
+            columns[column] = df[column].astype(object).to_numpy()
+    return pd.util.hash_pandas_object(pd.DataFrame(columns), index=False).to_numpy()
+
+
+def _concat_compact(df, new_rows):
+    # Компактные данные склеиваются по колонкам: категории объединяются (в порядке значений, как при сжатии),
+    # числа приводятся к общему типу
+    new_rows = compact_transactions(new_rows)
+    if new_rows.attrs['kopecks'] != df.attrs['kopecks']:
+        return None
+
+    columns = {}
+    dtypes = dict(new_rows.attrs['dtypes'], **df.attrs['dtypes'])
+    for column in df.columns:
+        old, new = df[column], new_rows[column]
+        if isinstance(old.dtype, pd.CategoricalDtype) and isinstance(new.dtype, pd.CategoricalDtype):
+            columns[column] = pd.api.types.union_categoricals([old, new], sort_categories=True)
+        elif isinstance(old.dtype, pd.CategoricalDtype) or isinstance(new.dtype, pd.CategoricalDtype):
+            return None
+        else:
+            dtype = np.result_type(old.dtype, new.dtype)
+            columns[column] = np.concatenate([old.to_numpy(dtype=dtype), new.to_numpy(dtype=dtype)])
+            if dtypes.get(column) == dtype:
+                del dtypes[column]
+
+    combined = pd.DataFrame(columns)
+    combined.attrs = {'dtypes': dtypes, 'kopecks': df.attrs['kopecks']}
+    return combined
+
+
+def append_transactions(df, new_rows):
+    """
+    Добавляет новые транзакции в конец данных.
+
+    Прежние строки сохраняют свои позиции. Компактные данные остаются компактными.
+
+    Аргументы:
+    df (pandas.DataFrame): Данные о транзакциях.
+    new_rows (pandas.DataFrame): Новые транзакции в обычном представлении.
+
+    Возвращает:
+    pandas.DataFrame: Данные с новыми транзакциями.
+    """
+    if df.attrs.get('dtypes') is not None:
+        combined = _concat_compact(df, new_rows)
+        if combined is None:
+            # Типы новых данных несовместимы с компактными колонками: сжимаем заново
+            combined = compact_transactions(pd.concat([expand_transactions(df), new_rows], ignore_index=True))
+        return combined
+    return pd.concat([df, new_rows], ignore_index=True)
+
+
+def slice_by_date(df, start_date, end_date, order=None):
+    """
+    Возвращает транзакции с датой операции в диапазоне [start_date, end_date].
+
+    Если передан порядок по дате (см. DateOrder), диапазон находится бинарным
+    поиском за O(log n), иначе строится булева маска по всей колонке.
+    Транзакции в результате идут в том же порядке, что и в df.
+
+    Аргументы:
+    df (pandas.DataFrame): Данные о транзакциях.
+    start_date (datetime): Начало диапазона (включительно).
+    end_date (datetime): Конец диапазона (включительно).
+    order (DateOrder): Порядок по дате, построенный для df.
+
+    Возвращает:
+    pandas.DataFrame: Транзакции за указанный период.
+    """
+    if order is not None:
+        return df.iloc[order.range(start_date, end_date)]
+
+    dates = pd.to_datetime(df[DATE_COLUMN], errors='coerce')
+    return df[(dates >= start_date) & (dates <= end_date)]
+
+
+@instrument(rows=result_rows)
+def load_operations_data(file_path, use_cache=True, cache_dir=None, chunk_size=None):
+    """
+    Загружает данные о транзакциях из Excel-файла.
+
+    Строки идут в порядке файла. Уже типизированные данные сохраняются в колоночный кэш (.npy) рядом с файлом.
+    Повторная загрузка неизмененного файла читает кэш вместо разбора Excel.
+
+    Если задан chunk_size, Excel читается потоково блоками (см. iter_operations_chunks),
+    которые сразу записываются в колоночный кэш (или во временный каталог без кэша).
+    Пиковое потребление памяти при разборе ограничено размером блока, а не файла.
+    Если колонка в разных блоках содержит значения разных типов, файл читается целиком.
+
+    Аргументы:
+    file_path (str): Путь к файлу Excel.
+    use_cache (bool): Использовать кэш.
+    cache_dir (str): Каталог для кэша (по умолчанию рядом с файлом).
+    chunk_size (int): Количество строк в блоке при потоковом чтении.
+
+    Возвращает:
+    pandas.DataFrame: Данные о транзакциях.
+    """
+    if use_cache:
+        df = load_cached(file_path, cache_dir)
+        if df is not None:
+            logger.info(f"Данные из файла {file_path} загружены из кэша.")
+            return df
+
+    if chunk_size:
+        df = None
+        if use_cache and save_cached_chunks(iter_operations_chunks(file_path, chunk_size), file_path, cache_dir):
+            df = load_cached(file_path, cache_dir)
+        if df is None:
+            try:
+                with tempfile.TemporaryDirectory() as tmp_dir:
+                    bundle_path = os.path.join(tmp_dir, 'operations')
+                    save_bundle_chunks(iter_operations_chunks(file_path, chunk_size), bundle_path)
+                    df = load_bundle(bundle_path, mmap=False)
+            except ValueError as err:
+                # Типы колонки различаются между блоками: читаем файл целиком, как без chunk_size
+                logger.warning(f"Не удалось загрузить {file_path} блоками: {err}")
+        if df is not None:
+            logger.info(f"Данные из файла {file_path} успешно загружены блоками по {chunk_size} строк.")
+            return df
+
+    # Загрузка данных из Excel
+    df = convert_operations_types(pd.read_excel(file_path))
+
+    if use_cache:
+        save_cached(df, file_path, cache_dir)
     logger.info(f"Данные из файла {file_path} успешно загружены.")
     # print (df.head())
     return df
 
 
-def filter_data_by_date(df, target_date):
+def _load_in_worker(file_path, use_cache, cache_dir, chunk_size):
+    # Разбор файла в дочернем процессе. Если данные попали в кэш, DataFrame не передается через pickle:
+    # родительский процесс откроет кэш через memory-map
+    if use_cache and is_cached(file_path, cache_dir):
+        return None
+    df = load_operations_data(file_path, use_cache=use_cache, cache_dir=cache_dir, chunk_size=chunk_size)
+    if use_cache and is_cached(file_path, cache_dir):
+        return None
+    return df
+
+
+def load_operations_many(file_paths, workers=None, use_cache=True, cache_dir=None, chunk_size=None):
+    """
+    Загружает данные о транзакциях из нескольких Excel-файлов, разбирая их параллельно в пуле процессов.
+
+    Каждый файл разбирается и типизируется так же, как в load_operations_data, в отдельном процессе.
+    Строки идут в порядке файлов в file_paths и строк в файле, поэтому порядок строк
+    не зависит от числа процессов.
+
+    Аргументы:
+    file_paths (list): Пути к файлам Excel.
+    workers (int): Количество процессов (по умолчанию по числу ядер).
+    use_cache (bool): Использовать кэш.
+    cache_dir (str): Каталог для кэша (по умолчанию рядом с каждым файлом).
+    chunk_size (int): Количество строк в блоке при потоковом чтении.
+
+    Возвращает:
+    pandas.DataFrame: Данные о транзакциях из всех файлов.
+    """
+    file_paths = list(file_paths)
+    workers = min(workers or os.cpu_count() or 1, len(file_paths))
+    if workers <= 1:
+        frames = [load_operations_data(file_path, use_cache, cache_dir, chunk_size) for file_path in file_paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_load_in_worker, file_paths, [use_cache] * len(file_paths),
+                                        [cache_dir] * len(file_paths), [chunk_size] * len(file_paths)))
+        frames = [load_operations_data(file_path, use_cache, cache_dir, chunk_size) if df is None else df
+                  for file_path, df in zip(file_paths, results)]
+
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat([frame.reset_index(drop=True) for frame in frames], ignore_index=True)
+    logger.info(f"Загружены данные из {len(file_paths)} файлов ({len(df)} транзакций).")
+    return df
+
+
+@instrument(rows=result_rows)
+def filter_data_by_date(df, target_date, order=None):
     """
         Фильтрует данные о транзакциях по диапазону дат:
         с 1-го числа месяца до целевой даты.
@@ -68,14 +524,15 @@ def filter_data_by_date(df, target_date):
         Аргументы:
         df (pandas.DataFrame): Данные о транзакциях.
         target_date (datetime): Целевая дата для фильтрации.
+        order (DateOrder): Порядок по дате, построенный для df (для бинарного поиска).
 
         Возвращает:
         pandas.DataFrame: Отфильтрованные данные о транзакциях.
         """
     # Определяем первый день месяца
     first_of_month = target_date.replace(day=1)
-    # Фильтруем данные, чтобы оставить только транзакции с 1-го числа месяца до целевой даты
-    filtered_data = df[(df['Дата операции'] >= first_of_month) & (df['Дата операции'] <= target_date)]
+    # Оставляем только транзакции с 1-го числа месяца до целевой даты
+    filtered_data = slice_by_date(df, first_of_month, target_date, order)
     return filtered_data
 
 
@@ -98,12 +555,15 @@ def get_greeting():
         return "Доброй ночи"
 
 
-def calculate_card_data(df):
+@instrument(rows=input_rows)
+def calculate_card_data(df, rates=None):
     """
     Рассчитывает данные по картам: общую сумму расходов (по "Сумма платежа") и кешбэк.
 
     Аргументы:
     df (pandas.DataFrame): Данные о транзакциях.
+    rates (RateTable): Таблица курсов (src.fx); если задана, суммы операций в валюте переводятся в рубли
+    по курсу на день операции.
 
     Возвращает:
     list: Список словарей с данными по картам.
@@ -111,37 +571,191 @@ def calculate_card_data(df):
     # Фильтруем строки, где есть номер карты и статус OK
     df_filtered = df[df['Номер карты'].notnull() & (df['Статус'] == 'OK')]
 
-    card_data = []
-    for card, group in df_filtered.groupby('Номер карты'):
-        # Суммируем только отрицательные значения в "Сумма операции"
-        total_spent = group[group['Сумма операции'] < 0]['Сумма операции'].sum()
+    # Суммируем по картам только отрицательные значения в "Сумма операции" (в копейках, без ошибок округления)
+    kopecks = amount_kopecks(df_filtered) if rates is None else to_kopecks(rates.to_rub(df_filtered))
+    spent_kopecks = kopecks.where(kopecks < 0, 0).groupby(df_filtered['Номер карты'], observed=True).sum().abs()
 
-        # Если total_spent отрицательный, делаем его положительным
-        total_spent = abs(total_spent)
+    return _card_records(spent_kopecks.index, spent_kopecks.to_numpy())
 
-        # Рассчитываем кешбэк (по положительной сумме расходов)
-        cashback = total_spent / 100
-        cashback = max(cashback, 0)  # Если кешбэк отрицательный, устанавливаем его в 0
 
-        card_data.append({
+def _card_records(cards, spent_kopecks):
+    # Записи по картам: сумма расходов (в копейках, неотрицательная) и кешбэк по ней
+    total_spent = np.round(spent_kopecks / 100, 2)
+    cashback = [calculate_cashback(kopecks) for kopecks in np.asarray(spent_kopecks).tolist()]
+
+    return [
+        {
             'last_digits': card[-4:],  # Последние 4 цифры карты
-            'total_spent': round(total_spent, 2),
-            'cashback': round(cashback, 2),
-        })
-
-    return card_data
-
-
-def top_five_transact(df):
-    df_filtered = df[['Дата операции', 'Сумма операции', 'Категория', 'Описание']]
-    df_filtered = df_filtered.sort_values(by='Сумма операции', key=abs, ascending=False).head(5)
-    top_transact = []
-    for _, row in df_filtered.iterrows():
-        top_transact.append({
-            "date": row['Дата операции'].strftime("%d.%m.%Y"),  # Форматируем дату
-            "amount": round(row['Сумма операции'], 2),
-            "category": row['Категория'],
-            "description": row['Описание']
-        })
-
-    return top_transact
+            'total_spent': spent,
+            'cashback': card_cashback,
+        }
+        for card, spent, card_cashback in zip(cards, total_spent.tolist(), cashback)
+    ]
+
+
+@instrument(rows=input_rows)
+def top_five_transact(df, k=5):
+    """
+    Возвращает топ-k (по умолчанию 5) транзакций по сумме платежа.
+
+    Результат совпадает с sort_values(key=abs, ascending=False).head(k). Отбор выполняется
+    частичной сортировкой за O(n); если в топ попадают равные суммы, порядок которых у
+    sort_values зависит от всех данных, топ берется полной сортировкой, как в sort_values.
+
+    Аргументы:
+    df (pandas.DataFrame): Данные о транзакциях.
+    k (int): Количество транзакций.
+
+    Возвращает:
+    list: Список словарей с датой, суммой, категорией и описанием транзакций.
+    """
+    df_filtered = df[TOP_COLUMNS]
+    values = _top_values(df_filtered)
+    top = _top_positions(values, k + 1)
+    top = _sorted_top(values, k) if _has_ties(values, top) else top[:k]
+    return _top_records(df_filtered, top)
+
+
+def _top_values(df):
+    # Абсолютные суммы для отбора топа; пропуски в сумме идут после всех остальных транзакций
+    values = np.abs(amount_rubles(df).to_numpy(dtype=float))
+    return np.where(np.isnan(values), -1.0, values)
+
+
+def _top_positions(values, k, ties=None):
+    # Позиции k наибольших значений по убыванию, равные значения — по возрастанию ties (по умолчанию позиций)
+    k = min(k, len(values))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if ties is None:
+        ties = np.arange(len(values))
+
+    # Отбираем k наибольших за O(n): все значения больше k-го и первые из равных ему
+    kth = np.partition(values, len(values) - k)[len(values) - k]
+    above = np.flatnonzero(values > kth)
+    equal = np.flatnonzero(values == kth)
+    equal = equal[np.argsort(ties[equal], kind='stable')[:k - len(above)]]
+    positions = np.concatenate([above, equal])
+    return positions[np.lexsort((ties[positions], -values[positions]))]
+
+
+def _has_ties(values, top):
+    # Есть ли равные суммы среди отобранных по убыванию позиций top (k+1 позиция на топ из k);
+    # пропуски не в счет: sort_values ставит их в конец в порядке данных
+    head = values[top]
+    head = head[head >= 0]
+    return bool((head[1:] == head[:-1]).any())
+
+
+def _sorted_top(values, k):
+    # Позиции k наибольших значений в порядке sort_values(ascending=False): равные значения
+    # упорядочиваются так же, как их упорядочивает сортировка pandas по всем данным
+    amounts = pd.Series(np.where(values < 0, np.nan, values))
+    return amounts.sort_values(ascending=False).index.to_numpy()[:max(k, 0)]
+
+
+def _top_records(df, positions):
+    top = df.iloc[positions]
+    return [
+        {
+            "date": date,  # Форматируем дату
+            "amount": amount,
+            "category": category,
+            "description": description
+        }
+        for date, amount, category, description in zip(
+            top['Дата операции'].dt.strftime("%d.%m.%Y").tolist(),
+            amount_rubles(top).round(2).tolist(),
+            top['Категория'].tolist(),
+            top['Описание'].tolist(),
+        )
+    ]
+
+
+@instrument(rows=input_rows)
+def dashboard_sections_batch(df, target_dates, k=5, order=None):
+    """
+    Рассчитывает данные по картам и топ-k транзакций с 1-го числа месяца до каждой из дат за один проход.
+
+    Результат для каждой даты совпадает с calculate_card_data и top_five_transact
+    от filter_data_by_date(df, target_date). Даты с одинаковым началом периода обрабатываются
+    вместе в порядке возрастания: суммы по картам накапливаются, а топ дополняется только
+    транзакциями, добавившимися с предыдущей даты, поэтому каждая строка просматривается
+    один раз на начало периода. Если в топ даты попадают равные суммы, топ этой даты берется
+    сортировкой строк ее периода, как в top_five_transact. Данные df не изменяются: проход
+    идет по позициям строк, упорядоченным по дате (см. DateOrder).
+
+    Аргументы:
+    df (pandas.DataFrame): Данные о транзакциях.
+    target_dates (list): Целевые даты (datetime).
+    k (int): Количество транзакций в топе.
+    order (DateOrder): Порядок по дате, построенный для df (по умолчанию строится заново).
+
+    Возвращает:
+    list: Для каждой даты (в порядке target_dates) словарь с ключами "cards" и "top_transactions".
+    """
+    if order is None:
+        order = DateOrder(df)
+    positions = order.positions
+
+    targets = [pd.Timestamp(target_date) for target_date in target_dates]
+    starts, ends = order.bounds([target.replace(day=1) for target in targets], targets)
+
+    # Коды карт в порядке номеров (как в groupby), -1 для строк, которые не учитываются в расходах
+    card_column = df['Номер карты']
+    if isinstance(card_column.dtype, pd.CategoricalDtype):
+        codes, cards = card_column.cat.codes.to_numpy(), card_column.cat.categories
+    else:
+        codes, cards = pd.factorize(card_column, sort=True)
+    cards = np.asarray(cards, dtype=object)
+    valid = (card_column.notnull() & (df['Статус'] == 'OK')).to_numpy()
+    # Значения по строкам берутся в порядке дат
+    codes = np.where(valid, codes, -1)[positions]
+    kopecks = amount_kopecks(df).to_numpy()
+    spent = np.where(kopecks < 0, kopecks, 0)[positions]
+
+    top_frame = df[TOP_COLUMNS]
+    data_values = _top_values(top_frame)
+    values = data_values[positions]
+
+    sections = [None] * len(targets)
+    tops = [None] * len(targets)
+    sweep = sorted(range(len(targets)), key=lambda i: (starts[i], ends[i]))
+    previous_start = None
+    for i in sweep:
+        start, end = starts[i], ends[i]
+        if start != previous_start:
+            # Новое начало периода: накопление начинается заново
+            totals = np.zeros(len(cards), dtype=np.int64)
+            seen = np.zeros(len(cards), dtype=bool)
+            top = np.empty(0, dtype=np.int64)
+            position = previous_start = start
+
+        if end > position:
+            block_codes = codes[position:end]
+            counted = block_codes >= 0
+            np.add.at(totals, block_codes[counted], spent[position:end][counted])
+            seen[block_codes[counted]] = True
+
+            # Топ объединения — топ из прежнего топа и топа новых строк (k+1 строка, чтобы видеть
+            # равенство на границе топа); равные суммы упорядочиваются по позиции строки в данных
+            block = position + _top_positions(values[position:end], k + 1, positions[position:end])
+            candidates = np.concatenate([top, block])
+            top = candidates[np.lexsort((positions[candidates], -values[candidates]))][:k + 1]
+            position = end
+
+        present = np.flatnonzero(seen)
+        sections[i] = {"cards": _card_records(cards[present], np.abs(totals[present]))}
+        if _has_ties(values, top):
+            # Порядок равных сумм, как в top_five_transact, дает только сортировка всех строк периода
+            rows = np.sort(positions[start:end])
+            tops[i] = rows[_sorted_top(data_values[rows], k)]
+        else:
+            tops[i] = positions[top[:k]]
+
+    # Записи топа формируются для всех дат одной выборкой строк
+    records = _top_records(top_frame, np.concatenate(tops)) if tops else []
+    bounds = np.cumsum([0] + [len(top) for top in tops]).tolist()
+    for i, section in enumerate(sections):
+        section["top_transactions"] = records[bounds[i]:bounds[i + 1]]
+    return sections
@@ -1,140 +1,310 @@
 import datetime
+import importlib
 import json
-import os
-from src.utils import load_operations_data, filter_data_by_date, get_greeting, calculate_card_data, top_five_transact
-import requests
-from dotenv import load_dotenv
-
-# Загружаем переменные окружения из файла .env (если используете этот метод)
-load_dotenv()
-
-# Загружаем настройки пользователя
-with open('user_settings.json') as f:
-    user_settings = json.load(f)
-
-# Получаем API-ключ из переменной окружения
-api_key = os.getenv('API_KEY')
-
-if not api_key:
-    raise ValueError("API-ключ не найден. Установите переменную среды API_KEY.")
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+from src.config import get_settings, init
+from src.metrics import instrument
+
+if TYPE_CHECKING:
+    from src.market_data import MarketDataCache, MarketDataClient
+    from src.shared import SharedTransactionStore
+    from src.store import TransactionStore
+    from src.utils import (DateOrder, calculate_card_data, dashboard_sections_batch, filter_data_by_date,
+                           get_greeting, top_five_transact)
+
+# Объекты, которые импортируются при первом обращении: модули данных и API тянут pandas и requests,
+# а импорт src.views должен оставаться быстрым и без побочных эффектов
+_LAZY_IMPORTS = {
+    'TransactionStore': 'src.store',
+    'SharedTransactionStore': 'src.shared',
+    'load_operations_data': 'src.utils',
+    'DateOrder': 'src.utils',
+    'filter_data_by_date': 'src.utils',
+    'get_greeting': 'src.utils',
+    'calculate_card_data': 'src.utils',
+    'top_five_transact': 'src.utils',
+    'dashboard_sections_batch': 'src.utils',
+    'MarketDataCache': 'src.market_data',
+    'MarketDataClient': 'src.market_data',
+}
+
+
+def __getattr__(name):
+    module = _LAZY_IMPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def _import_lazy(*names):
+    # Подставляем в модуль отложенные объекты; уже подставленные (в том числе подмененные в тестах) не трогаем
+    for name in names:
+        if name not in globals():
+            __getattr__(name)
+
+
+# Общее хранилище транзакций, создается при первом обращении
+_default_store = None
+
+# Общий клиент API курсов и цен, создается при первом обращении
+_market_data_client = None
+
+# Пул, в котором get_dashboard_data запрашивает курсы и цены одновременно. Он отдельный от пула клиента:
+# его задачи ждут пакетные запросы в пуле клиента и не должны занимать потоки этого пула
+_market_data_executor = None
+
+# Количество потоков пула запросов курсов и цен
+MARKET_DATA_WORKERS = 4
+
+# Количество потоков, в которых кэш клиента обновляет устаревшие курсы и цены
+MARKET_DATA_REFRESH_WORKERS = 2
+
+# Кэши разделов дашборда по хранилищам (удаляются вместе с хранилищем)
+_dashboard_caches = weakref.WeakKeyDictionary()
+
+# Количество дат, для которых хранятся разделы дашборда
+DASHBOARD_CACHE_SIZE = 256
+
+
+class DashboardCache:
+    """
+    LRU-кэш разделов дашборда, которые зависят только от данных: карты и топ транзакций.
+
+    Значения привязаны к версии данных хранилища: при первом обращении с новой версией
+    (данные перезагружены или дополнены) все значения сбрасываются. Приветствие, курсы
+    и цены в кэш не попадают и запрашиваются при каждом формировании дашборда.
+    """
+
+    def __init__(self, maxsize=DASHBOARD_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, version, target_date, compute):
+        """
+        Возвращает разделы дашборда для даты из кэша или рассчитывает их функцией compute.
+
+        Аргументы:
+        version (int): Версия данных хранилища.
+        target_date (datetime): Дата дашборда.
+        compute (callable): Функция без аргументов, рассчитывающая разделы.
+
+        Возвращает:
+        dict: Разделы дашборда (копия, которую можно изменять).
+        """
+        with self._lock:
+            if self._version is None or version > self._version:
+                if self._version is not None:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._version = version
+            # Запрос со старой версией данных (во время перезагрузки) рассчитывается без кэша
+            sections = self._entries.get(target_date) if version == self._version else None
+            if sections is not None:
+                self._entries.move_to_end(target_date)
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if sections is None:
+            sections = compute()
+            with self._lock:
+                if version == self._version:
+                    self._entries[target_date] = sections
+                    while len(self._entries) > self.maxsize:
+                        self._entries.popitem(last=False)
+        return {name: [dict(item) for item in items] for name, items in sections.items()}
+
+    def stats(self):
+        """
+        Возвращает счетчики попаданий и промахов кэша.
+
+        Возвращает:
+        dict: Количество попаданий, промахов, сбросов по новой версии данных и записей, доля попаданий.
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "invalidations": self.invalidations,
+                    "size": len(self._entries), "hit_rate": self.hits / total if total else 0.0}
+
+
+def get_dashboard_cache(store):
+    """
+    Возвращает кэш разделов дашборда для хранилища.
+
+    Аргументы:
+    store (TransactionStore): Хранилище транзакций.
+
+    Возвращает:
+    DashboardCache: Кэш разделов дашборда.
+    """
+    cache = _dashboard_caches.get(store)
+    if cache is None:
+        cache = _dashboard_caches.setdefault(store, DashboardCache())
+    return cache
+
+
+def get_default_store():
+    """
+    Возвращает общее хранилище транзакций для файла operations.xlsx.
+
+    Если задан каталог общего набора данных (переменная окружения SHARED_DATASET), хранилище
+    подключается к набору, опубликованному загрузчиком (см. src.shared), вместо чтения файла.
+
+    Возвращает:
+    TransactionStore: Хранилище транзакций.
+    """
+    global _default_store
+    if _default_store is None:
+        settings = get_settings()
+        if settings.shared_dataset:
+            _import_lazy('SharedTransactionStore')
+            _default_store = SharedTransactionStore(settings.shared_dataset)
+        else:
+            _import_lazy('TransactionStore')
+            _default_store = TransactionStore(settings.operations_file)
+    return _default_store
+
+
+def get_market_data_client():
+    """
+    Возвращает общий клиент API курсов валют и цен на акции.
+
+    Ответы кэшируются в памяти, устаревшие значения обновляются в отдельном пуле потоков:
+    обновление само запрашивает пакеты в пуле клиента и не должно занимать его потоки.
+    Если задана переменная окружения MARKET_DATA_CACHE, кэш дополнительно сохраняется в указанный файл.
+
+    Возвращает:
+    MarketDataClient: Клиент с пулом соединений и кэшем.
+    """
+    global _market_data_client
+    if _market_data_client is None:
+        _import_lazy('MarketDataCache', 'MarketDataClient')
+        client = MarketDataClient()
+        refresh_executor = ThreadPoolExecutor(max_workers=MARKET_DATA_REFRESH_WORKERS,
+                                              thread_name_prefix='market-data-refresh')
+        client.cache = MarketDataCache(path=get_settings().market_data_cache, executor=refresh_executor)
+        _market_data_client = client
+    return _market_data_client
+
+
+def _get_market_data_executor():
+    global _market_data_executor
+    if _market_data_executor is None:
+        _market_data_executor = ThreadPoolExecutor(max_workers=MARKET_DATA_WORKERS,
+                                                   thread_name_prefix='dashboard-market-data')
+    return _market_data_executor
 
 
 def get_currency_rates():
-    rates = []
-
-    # Обрабатываем каждую валюту из списка user_currencies
-    for currency in user_settings['user_currencies']:
-        try:
-            # Формируем URL для запроса к API
-            url = f"https://api.apilayer.com/exchangerates_data/latest?symbols=RUB&base={currency}"
-
-            headers = {
-                "apikey": api_key
-            }
-
-            # Делаем запрос к API
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()  # Поднимет исключение для HTTP ошибок
-
-            # Если запрос успешен
-            data = response.json()
-
-            if 'rates' not in data:
-                return {"error": "Курсы не обнаружены в данных ответа"}
-
-            # Получаем курс для рубля относительно текущей базовой валюты
-            rate = data['rates'].get('RUB')
-            if rate:
-                rates.append({
-                    "currency": currency,
-                    "rate": rate
-                })
-        except requests.exceptions.HTTPError as http_err:
-            return {"error": f"HTTP error occurred: {http_err}"}
-        except requests.exceptions.RequestException as req_err:
-            return {"error": f"Request error occurred: {req_err}"}
-        except Exception as err:
-            return {"error": f"An error occurred: {err}"}
+    settings = get_settings()
+    if not settings.api_key:
+        print("Ошибка: API-ключ не найден. Установите переменную среды API_KEY.")
+        return {"error": "API key is missing"}
 
-    return {"currency_rates": rates}
+    # Запрашиваем курсы всех валют из списка user_currencies одним запросом
+    return get_market_data_client().get_currency_rates(settings.user_currencies, settings.api_key)
 
 
 def get_stock_prices():
-    stock_prices = []
-    api_key = os.getenv("MARKETSTACK_API_KEY")  # Получаем API-ключ из переменной окружения
-
-    if not api_key:
+    settings = get_settings()
+    if not settings.marketstack_api_key:
         print("Ошибка: API-ключ не найден. Проверьте .env файл.")
         return {"error": "API key is missing"}
 
-    for stock in user_settings['user_stocks']:
-        try:
-            # Формируем URL с тикером акции
-            url = f"https://api.marketstack.com/v1/eod?access_key={api_key}&symbols={stock}"
-
-            # Делаем запрос к API
-            response = requests.get(url)
-            response.raise_for_status()  # Проверяем ошибки HTTP
-
-            # Получаем JSON-ответ
-            data = response.json()
+    # Запрашиваем цены всех акций из списка user_stocks параллельно
+    return get_market_data_client().get_stock_prices(settings.user_stocks, settings.marketstack_api_key)
 
-            # Проверяем, есть ли данные о цене
-            if "data" not in data or not data["data"]:
-                print(f"Ошибка: нет данных для {stock}")
-                continue
 
-            # Получаем последнюю цену закрытия акции
-            price = data["data"][0]["close"]
-
-            stock_prices.append({
-                "stock": stock,
-                "price": price
-            })
-
-        except requests.exceptions.HTTPError as http_err:
-            print(f"HTTP error for {stock}: {http_err}")
-        except requests.exceptions.RequestException as req_err:
-            print(f"Request error for {stock}: {req_err}")
-        except Exception as err:
-            print(f"An error occurred for {stock}: {err}")
-
-    return {"stock_prices": stock_prices}
-
-
-def get_dashboard_data(target_date):
+def _parse_target_date(target_date):
     if isinstance(target_date, str):
         try:
-            target_date = datetime.datetime.strptime(target_date, "%Y-%m-%d %H:%M:%S")
+            return datetime.datetime.strptime(target_date, "%Y-%m-%d %H:%M:%S")
         except ValueError:
             raise ValueError("Неверный формат даты. Используйте формат 'YYYY-MM-DD HH:MM:SS'.")
+    return target_date
+
+
+@instrument()
+def get_dashboard_data(target_date, store=None):
+    target_date = _parse_target_date(target_date)
+    _import_lazy('DateOrder', 'filter_data_by_date', 'get_greeting', 'calculate_card_data', 'top_five_transact')
+
+    # Курсы и цены запрашиваются одновременно, пока рассчитываются разделы по данным
+    executor = _get_market_data_executor()
+    currency_rates = executor.submit(get_currency_rates)
+    stock_prices = executor.submit(get_stock_prices)
 
-    # Загружаем данные
-    # file_path = '../operations.xlsx'
-    file_path = os.path.join(os.path.dirname(__file__), '../operations.xlsx')
-    df = load_operations_data(file_path)
+    # Берем данные из хранилища, которое держит их в памяти между запросами
+    if store is None:
+        store = get_default_store()
+    df, version = store.snapshot()
 
-    # Фильтруем по дате
-    filtered_df = filter_data_by_date(df, target_date)
+    def compute_sections():
+        # Фильтруем по дате бинарным поиском по порядку дат, который хранилище строит один раз на версию данных
+        order = store.derived('date_order', DateOrder, version)
+        filtered_df = filter_data_by_date(df, target_date, order)
+        return {"cards": calculate_card_data(filtered_df), "top_transactions": top_five_transact(filtered_df)}
+
+    # Разделы, зависящие только от данных, берем из кэша для текущей версии данных
+    sections = get_dashboard_cache(store).get(version, target_date, compute_sections)
 
     # Формируем JSON
     dashboard_data = {
         "greeting": get_greeting(),
-        "cards": calculate_card_data(filtered_df),
-        "top_transactions": top_five_transact(filtered_df),
-        "currency_rates": get_currency_rates().get("currency_rates", []),
-        "stock_prices": get_stock_prices().get("stock_prices", [])
+        "cards": sections["cards"],
+        "top_transactions": sections["top_transactions"],
+        "currency_rates": currency_rates.result().get("currency_rates", []),
+        "stock_prices": stock_prices.result().get("stock_prices", [])
     }
 
     return dashboard_data
 
 
+@instrument()
+def get_dashboard_batch(target_dates, store=None, k=5):
+    """
+    Рассчитывает разделы дашборда, зависящие от данных, для многих дат за один проход.
+
+    Для каждой даты результат совпадает с разделами "cards" и "top_transactions"
+    get_dashboard_data (при k=5), но данные берутся из хранилища один раз, а суммы по картам
+    и топ транзакций накапливаются от даты к дате (см. dashboard_sections_batch).
+
+    Аргументы:
+    target_dates (list): Даты в формате 'YYYY-MM-DD HH:MM:SS' или datetime.
+    store (TransactionStore): Хранилище транзакций (по умолчанию общее).
+    k (int): Количество транзакций в топе.
+
+    Возвращает:
+    list: Для каждой даты (в порядке target_dates) словарь с ключами "cards" и "top_transactions".
+    """
+    targets = [_parse_target_date(target_date) for target_date in target_dates]
+    _import_lazy('DateOrder', 'dashboard_sections_batch')
+
+    if store is None:
+        store = get_default_store()
+    df, version = store.snapshot()
+    return dashboard_sections_batch(df, targets, k, store.derived('date_order', DateOrder, version))
+
+
 # import datetime
 # target_date = datetime.datetime(2021, 12, 20)
 # dashboard = get_dashboard_data(target_date)
 # print(json.dumps(dashboard, ensure_ascii=False, indent=4))
 
 if __name__ == "__main__":
+    init()
     # target_date = datetime.datetime(2021, 12, 20)
     target_date = ("2021-12-20 17:00:00")
     dashboard = get_dashboard_data(target_date)
@@ -2,3 +2,42 @@ import os
 import sys
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pandas as pd  # noqa: E402
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+def operations_file(tmp_path):
+    # Небольшая выгрузка в том же формате, что и operations.xlsx
+    df = pd.DataFrame({
+        "Дата операции": ["31.12.2021 16:44:00", "30.12.2021 10:00:00"],
+        "Дата платежа": ["31.12.2021", None],
+        "Номер карты": ["*7197", None],
+        "Статус": ["OK", "FAILED"],
+        "Сумма операции": [-160.89, 500.0],
+        "Валюта операции": ["RUB", "RUB"],
+        "Сумма платежа": [-160.89, 500.0],
+        "Валюта платежа": ["RUB", "RUB"],
+        "Кэшбэк": [None, 5.0],
+        "Категория": ["Супермаркеты", None],
+        "MCC": [5411.0, None],
+        "Описание": ["Колхоз", "Перевод"],
+        "Бонусы (включая кэшбэк)": [3, 0],
+        "Округление на инвесткопилку": [0, 0],
+        "Сумма операции с округлением": [160.89, 500.0],
+    })
+    file_path = tmp_path / "operations.xlsx"
+    df.to_excel(file_path, index=False)
+    return str(file_path)
+
+
+@pytest.fixture
+def metrics_enabled():
+    from src import metrics
+
+    metrics.reset()
+    metrics.enable()
+    yield metrics
+    metrics.disable()
+    metrics.reset()
@@ -0,0 +1,60 @@
+import pandas as pd
+import pytest
+
+from src.aggregates import AggregateCube
+from src.reports import spending_by_category
+from src.utils import DateOrder
+
+
+@pytest.fixture
+def transactions():
+    return pd.DataFrame({
+        "Дата операции": pd.to_datetime([
+            "2024-01-01 00:00:00", "2024-01-01 17:00:00", "2024-01-15 12:00:00", "2024-01-20 00:00:00",
+            "2024-01-20 10:00:00", "2024-02-01 09:00:00", "2024-02-03 18:30:00"
+        ]),
+        "Номер карты": ["*1111", "*1111", "*2222", None, "*2222", "*1111", "*2222"],
+        "Статус": ["OK", "OK", "OK", "OK", "FAILED", "OK", "OK"],
+        "Сумма операции": [-100.10, -0.05, 250.0, -300.0, -1000.0, -99.99, -0.01],
+        "Категория": ["Фастфуд", "Фастфуд", "Переводы", "Фастфуд", "Фастфуд", "Такси", "Фастфуд"],
+    })
+
+
+@pytest.mark.parametrize("date", ["2024-01-01", "2024-01-20", "2024-02-01", "2024-04-20"])
+@pytest.mark.parametrize("category", ["Фастфуд", "Такси", "Переводы"])
+def test_category_spending_matches_report(transactions, category, date):
+    cube = AggregateCube.build(transactions)
+    end_date = pd.Timestamp(date)
+    expected = spending_by_category(transactions, category, date)["total_spending"]
+    assert cube.category_spending(category, end_date - pd.Timedelta(days=90), end_date) == expected
+
+
+@pytest.mark.parametrize("start_date, end_date", [("2024-01-01 12:00:00", "2024-01-20 11:00:00"),
+                                                  ("2024-01-15", "2024-02-03 18:00:00")])
+def test_category_spending_partial_days(transactions, start_date, end_date):
+    cube = AggregateCube.build(transactions)
+    rows = transactions[(transactions["Дата операции"] >= start_date) & (transactions["Дата операции"] <= end_date)]
+    expected = int(rows.loc[rows["Категория"] == "Фастфуд", "Сумма операции"].sum())
+    assert cube.category_spending("Фастфуд", start_date, end_date, transactions) == expected
+    assert cube.category_spending("Фастфуд", start_date, end_date, transactions, DateOrder(transactions)) == expected
+
+
+def test_cube_incremental_update(transactions):
+    cube = AggregateCube.build(transactions.iloc[:4])
+    cube.update(transactions.iloc[4:])
+    pd.testing.assert_frame_equal(cube.buckets, AggregateCube.build(transactions).buckets)
+
+
+def test_window_requires_data_for_partial_days(transactions):
+    cube = AggregateCube.build(transactions)
+    with pytest.raises(ValueError):
+        cube.window(pd.Timestamp("2024-01-01"), pd.Timestamp("2024-01-20 11:00:00"))
+
+
+def test_cube_keeps_only_category_dimensions(transactions):
+    # Карта и статус не читаются отчетами по категориям и в куб не попадают
+    other_cards = transactions.assign(**{"Номер карты": "*3333", "Статус": "FAILED"})
+    cube = AggregateCube.build(pd.concat([transactions, other_cards], ignore_index=True))
+    assert cube.buckets.columns.tolist() == ["day", "midnight", "category", "amount", "count"]
+    assert len(cube.buckets) == len(AggregateCube.build(transactions).buckets)
+    assert cube.buckets["count"].tolist() == [2] * len(cube.buckets)
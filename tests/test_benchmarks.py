@@ -0,0 +1,27 @@
+import pandas as pd
+
+from benchmarks.run import compare, run
+from benchmarks.synthetic import CATEGORY_PROFILES, make_statement
+
+
+def test_make_statement_is_reproducible():
+    pd.testing.assert_frame_equal(make_statement(1_000, seed=3), make_statement(1_000, seed=3))
+    df = make_statement(1_000)
+    # Описания согласованы с категориями, поступления идут без карты
+    for category, description in zip(df["Категория"], df["Описание"]):
+        assert description in CATEGORY_PROFILES[category][1]
+    assert df.loc[df["Категория"] == "Пополнения", "Номер карты"].isna().all()
+    assert (df.loc[df["Категория"] == "Пополнения", "Сумма операции"] > 0).all()
+
+
+def test_benchmark_run_and_compare(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    results = run([300], repeat=1, memory=False, only=["load_operations_data", "get_dashboard_data"])
+    assert [item["name"] for item in results["results"]] == [
+        "load_operations_data[xlsx]", "load_operations_data[cache]", "get_dashboard_data"]
+    assert results["environment"]["seed"] == 0
+    assert list(tmp_path.iterdir()) == []
+
+    slower = {"results": [dict(item, min_seconds=item["min_seconds"] / 2) for item in results["results"]]}
+    assert [name for name, _, _ in compare(results, slower)] == [item["name"] for item in results["results"]]
+    assert compare(results, results) == []
@@ -0,0 +1,78 @@
+import os
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from src.cache import get_cache_path, load_bundle, save_bundle, save_bundle_chunks
+from src.utils import load_operations_data
+
+
+def test_bundle_roundtrip(tmp_path):
+    df = pd.DataFrame({
+        "Дата": pd.to_datetime(["2024-01-01", None]),
+        "Сумма": [-1.5, 2.0],
+        "Описание": ["Кафе", None],
+    })
+    save_bundle(df, str(tmp_path / "bundle"), key={"k": 1})
+    pd.testing.assert_frame_equal(load_bundle(str(tmp_path / "bundle"), key={"k": 1}), df)
+    assert load_bundle(str(tmp_path / "bundle"), key={"k": 2}) is None
+
+
+def test_bundle_maps_numbers_and_codes_strings(tmp_path):
+    df = pd.DataFrame({"Сумма": [-1.5, 2.0, 3.0], "Описание": ["Кафе " * 100, None, "Кафе " * 100]})
+    bundle_path = str(tmp_path / "bundle")
+    save_bundle(df, bundle_path)
+    # Строки хранятся кодами: размер файла не зависит от длины строк
+    assert np.load(os.path.join(bundle_path, "col_001.npy")).tolist() == [0, -1, 0]
+
+    loaded = load_bundle(bundle_path)
+    base = loaded["Сумма"].to_numpy()
+    while base.base is not None and not isinstance(base, np.memmap):
+        base = base.base
+    assert isinstance(base, np.memmap)
+    # Изменение загруженных данных не меняет файл кэша
+    loaded.loc[0, "Сумма"] = 10.0
+    pd.testing.assert_frame_equal(load_bundle(bundle_path), df)
+
+
+def test_load_operations_data_uses_cache(operations_file, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    cold = load_operations_data(operations_file, cache_dir=cache_dir)
+    assert os.path.exists(get_cache_path(operations_file, cache_dir))
+
+    # Повторная загрузка не должна разбирать Excel
+    with patch("src.utils.pd.read_excel") as mock_read_excel:
+        warm = load_operations_data(operations_file, cache_dir=cache_dir)
+    mock_read_excel.assert_not_called()
+    pd.testing.assert_frame_equal(warm, cold)
+
+
+def test_load_operations_data_cache_invalidated(operations_file, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    load_operations_data(operations_file, cache_dir=cache_dir)
+
+    # Изменяем исходный файл: кэш должен быть перестроен
+    df = pd.read_excel(operations_file)
+    df.loc[0, "Сумма операции"] = -1000.0
+    df.to_excel(operations_file, index=False)
+
+    result = load_operations_data(operations_file, cache_dir=cache_dir)
+    assert result.loc[0, "Сумма операции"] == -1000.0
+
+
+def test_bundle_chunks_match_bundle(tmp_path):
+    df = pd.DataFrame({
+        "Дата": pd.to_datetime(["2024-01-01", None, "2024-01-03", None]),
+        "Сумма": [1.5, None, 2.0, None],
+        "Бонусы": [1, 2, 3, 4],
+        "Описание": [None, "Кафе", "Аптека", None],
+    })
+    # Блоки из одних пропусков (даже типа object) не определяют тип колонки
+    middle = df.iloc[1:2].astype({"Дата": object, "Сумма": object})
+    save_bundle_chunks([df.iloc[0:1], middle, df.iloc[2:4]], str(tmp_path / "bundle"), key={"k": 1})
+    save_bundle(df, str(tmp_path / "whole"))
+
+    pd.testing.assert_frame_equal(load_bundle(str(tmp_path / "bundle"), key={"k": 1}),
+                                  load_bundle(str(tmp_path / "whole")))
+    assert sorted(os.listdir(tmp_path / "bundle")) == sorted(os.listdir(tmp_path / "whole"))
@@ -0,0 +1,64 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from src.config import PROJECT_DIR, Settings, get_settings, set_settings
+
+IMPORT_CHECK = """
+import logging, sys
+import src.views
+heavy = sorted(name for name in ('pandas', 'numpy', 'requests', 'openpyxl', 'dotenv') if name in sys.modules)
+print(heavy, logging.getLogger().handlers)
+import src.reports, src.services, src.server
+print(logging.getLogger().handlers, logging.getLogger('financial_dashboard').handlers)
+"""
+
+
+def test_import_is_fast_and_side_effect_free(tmp_path):
+    # Импорт без API-ключей и без user_settings.json в текущей папке
+    env = {key: value for key, value in os.environ.items() if key not in ("API_KEY", "MARKETSTACK_API_KEY")}
+    env["PYTHONPATH"] = PROJECT_DIR
+    result = subprocess.run([sys.executable, "-c", IMPORT_CHECK], cwd=tmp_path, env=env, capture_output=True,
+                            text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.splitlines() == ["[] []", "[] []"]
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_settings_are_lazy(tmp_path, monkeypatch):
+    settings_path = tmp_path / "settings.json"
+    settings = Settings(str(settings_path))
+    # Файл читается только при обращении к настройкам пользователя
+    settings_path.write_text(json.dumps({"user_currencies": ["USD"], "user_stocks": ["AAPL"]}), encoding="utf-8")
+    assert settings.user_currencies == ["USD"]
+    assert settings.user_stocks == ["AAPL"]
+
+    monkeypatch.setenv("API_KEY", "key")
+    assert settings.api_key == "key"
+    monkeypatch.delenv("API_KEY")
+    assert settings.api_key is None
+
+    monkeypatch.setenv("USER_SETTINGS", str(settings_path))
+    assert Settings().resolve_settings_path() == str(settings_path)
+    monkeypatch.delenv("USER_SETTINGS")
+    monkeypatch.chdir(tmp_path)
+    assert Settings().resolve_settings_path() == os.path.join(PROJECT_DIR, "user_settings.json")
+
+
+def test_missing_settings_file_fails_on_use(tmp_path):
+    settings = Settings(str(tmp_path / "missing.json"))
+    with pytest.raises(FileNotFoundError):
+        settings.user_stocks
+
+
+def test_set_settings():
+    settings = Settings()
+    previous = get_settings()
+    try:
+        set_settings(settings)
+        assert get_settings() is settings
+    finally:
+        set_settings(previous)
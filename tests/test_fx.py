@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.fx import RateTable
+from src.reports import spending_by_categories, spending_by_category
+from src.store import TransactionStore
+from src.utils import calculate_card_data, compact_transactions
+
+RATES = [
+    ("2021-12-30", "USD", 74.0),
+    ("2021-12-31", "USD", 75.0),
+    ("2021-12-31", "EUR", 85.0),
+]
+
+
+@pytest.fixture
+def transactions():
+    # Операции в рублях, долларах и евро по одной карте
+    return pd.DataFrame({
+        "Дата операции": pd.to_datetime(["2021-12-30 10:00:00", "2021-12-31 12:00:00", "2022-01-02 09:00:00",
+                                         "2021-12-31 18:00:00"]),
+        "Номер карты": ["*7197", "*7197", "*7197", "*7197"],
+        "Статус": ["OK", "OK", "OK", "OK"],
+        "Сумма операции": [-100.0, -10.0, -2.0, -1000.0],
+        "Валюта операции": ["USD", "EUR", "USD", "RUB"],
+        "Категория": ["Супермаркеты", "Супермаркеты", "Супермаркеты", "Фастфуд"],
+    })
+
+
+def test_lookup_uses_last_known_rate():
+    table = RateTable(RATES)
+    rates = table.lookup(pd.Series(pd.to_datetime(["2021-12-30 00:00:00", "2021-12-31 15:00:00", "2022-01-05 00:00:00",
+                                                   "2022-01-08 00:00:00", "2021-12-29 00:00:00", None])),
+                         pd.Series(["USD", "USD", "USD", "USD", "USD", "RUB"]))
+    # Курс действует еще MAX_RATE_AGE_DAYS дней; рубль всегда 1
+    np.testing.assert_array_equal(rates, [74.0, 75.0, 75.0, np.nan, np.nan, 1.0])
+    assert np.isnan(table.rate("2021-12-31", "GBP"))
+
+
+def test_to_rub_string_and_compact(transactions):
+    table = RateTable(RATES)
+    expected = [-7400.0, -850.0, -150.0, -1000.0]
+    assert table.to_rub(transactions).tolist() == expected
+    assert table.to_rub(compact_transactions(transactions)).tolist() == expected
+
+
+def test_to_rub_missing_rate(transactions):
+    table = RateTable(RATES[:1])
+    with pytest.raises(ValueError, match="EUR 2021-12-31"):
+        table.to_rub(transactions)
+    assert np.isnan(table.to_rub(transactions, errors="coerce")[1])
+    assert table.missing(transactions)[["currency"]].to_dict("list") == {"currency": ["EUR"]}
+
+
+def test_update_save_and_load(tmp_path):
+    table = RateTable(RATES)
+    table.update([("2021-12-31", "USD", 76.0), ("2022-01-10", "USD", 77.0)])
+    assert table.rate("2021-12-31", "USD") == 76.0
+    assert len(table) == 4
+
+    path = tmp_path / "rates.csv"
+    table.save(str(path))
+    loaded = RateTable.from_file(str(path))
+    pd.testing.assert_frame_equal(loaded.rates, table.rates)
+    assert loaded.rate("2022-01-11", "USD") == 77.0
+
+
+def test_reports_convert_with_rates(transactions, operations_file, tmp_path):
+    table = RateTable(RATES)
+    assert calculate_card_data(transactions, rates=table) == [
+        {"last_digits": "7197", "total_spent": 9400.0, "cashback": 94.0}]
+    # Без таблицы курсов суммы складываются как есть
+    assert calculate_card_data(transactions)[0]["total_spent"] == 1112.0
+
+    assert spending_by_category(transactions, "Супермаркеты", "2022-01-03", rates=table)["total_spending"] == -8400
+    result = spending_by_categories(transactions, dates=["2022-01-03"], rates=table)
+    assert [report["total_spending"] for report in result["reports"]] == [-8400, -1000]
+
+    # Для хранилища с таблицей курсов суммы переводятся по строкам, а не по агрегатам куба
+    store = TransactionStore(operations_file, cache_dir=str(tmp_path / "cache"))
+    assert spending_by_category(store, "Супермаркеты", "2022-01-01", rates=table)["total_spending"] == -160
+
+
+class StubClient:
+    # Клиент API: курс 80 рублей за доллар на каждый день периода
+    def __init__(self):
+        self.requests = []
+
+    def fetch_currency_timeseries(self, currencies, start_date, end_date, api_key):
+        self.requests.append((currencies, start_date, end_date))
+        days = pd.date_range(start_date, end_date).strftime("%Y-%m-%d")
+        return {"rates": {day: {currency: 80.0 for currency in currencies} for day in days}}
+
+
+def test_fill_from_api_requests_missing_periods(transactions):
+    table = RateTable()
+    client = StubClient()
+    transactions.loc[4] = [pd.Timestamp("2023-06-01"), "*7197", "OK", -1.0, "USD", "Фастфуд"]
+
+    assert table.fill_from_api(transactions, api_key="key", client=client) == {"added": 9}
+    # Один запрос на период не длиннее года, все валюты периода в одном запросе
+    assert client.requests == [(["EUR", "USD"], "2021-12-30", "2022-01-02"), (["USD"], "2023-06-01", "2023-06-01")]
+    assert table.missing(transactions).empty
+    assert table.fill_from_api(transactions, api_key="key", client=client) == {"added": 0}
+
+
+def test_fill_from_api_error(transactions):
+    class FailingClient:
+        def fetch_currency_timeseries(self, currencies, start_date, end_date, api_key):
+            return {"error": "HTTP error occurred"}
+
+    table = RateTable()
+    assert table.fill_from_api(transactions, api_key="key", client=FailingClient()) == {"error": "HTTP error occurred"}
+    assert len(table) == 0
@@ -0,0 +1,228 @@
+import datetime
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from src.market_data import MarketDataCache, MarketDataClient
+
+# Задержка ответа заглушки для каждого символа (в секундах)
+DELAYS = {"SLOW": 0.3, "SLOW2": 0.3, "HANG": 2.0}
+RATES = {"USD": 0.0125, "EUR": 0.01}
+PRICES = {"AAPL": 150.0, "MSFT": 300.0, "SLOW": 10.0, "SLOW2": 20.0, "HANG": 1.0}
+
+# Запросы, полученные заглушкой
+REQUESTS = []
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # Заглушка API: /latest?base=RUB&symbols=... отдает курсы, /timeseries?... — курсы за каждый день периода,
+    # /eod/latest?symbols=... отдает цены.
+    # Символ FAIL в запросе приводит к ошибке сервера, неизвестные символы в ответ не попадают.
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        symbols = params.get("symbols", "").split(",")
+        REQUESTS.append((url.path, symbols))
+        time.sleep(max(DELAYS.get(symbol, 0) for symbol in symbols))
+
+        if "FAIL" in symbols:
+            self._send(500, {"error": "server error"})
+        elif url.path.endswith("/latest") and params.get("base") == "RUB":
+            self._send(200, {"rates": {symbol: RATES[symbol] for symbol in symbols if symbol in RATES}})
+        elif url.path.endswith("/timeseries") and params.get("base") == "RUB":
+            start = datetime.date.fromisoformat(params["start_date"])
+            days = (datetime.date.fromisoformat(params["end_date"]) - start).days + 1
+            rates = {symbol: RATES[symbol] for symbol in symbols if symbol in RATES}
+            self._send(200, {"rates": {(start + datetime.timedelta(days=i)).isoformat(): rates for i in range(days)}})
+        elif url.path.endswith("/eod/latest"):
+            self._send(200, {"data": [{"symbol": symbol, "close": PRICES[symbol]}
+                                      for symbol in symbols if symbol in PRICES]})
+        else:
+            self._send(404, {"error": "not found"})
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    REQUESTS.clear()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(stub_server):
+    client = MarketDataClient(currency_url=f"{stub_server}/latest", stock_url=f"{stub_server}/eod/latest",
+                              timeout=0.5, stock_batch_size=2, timeseries_url=f"{stub_server}/timeseries")
+    yield client
+    client.close()
+
+
+def test_currency_rates_single_request(client):
+    result = client.get_currency_rates(["USD", "EUR"], "key")
+    assert result == {"currency_rates": [{"currency": "USD", "rate": 80.0}, {"currency": "EUR", "rate": 100.0}]}
+    assert REQUESTS == [("/latest", ["USD", "EUR"])]
+
+
+def test_currency_timeseries_single_request(client):
+    result = client.fetch_currency_timeseries(["USD", "EUR", "XXX"], "2021-12-30", "2021-12-31", "key")
+    assert result == {"rates": {"2021-12-30": {"USD": 80.0, "EUR": 100.0}, "2021-12-31": {"USD": 80.0, "EUR": 100.0}}}
+    assert REQUESTS == [("/timeseries", ["USD", "EUR", "XXX"])]
+    assert "error" in client.fetch_currency_timeseries(["FAIL"], "2021-12-30", "2021-12-31", "key")
+
+
+def test_currency_rates_error(client):
+    result = client.get_currency_rates(["USD", "FAIL"], "key")
+    assert "error" in result
+
+
+def test_stock_prices_are_batched(stub_server):
+    client = MarketDataClient(stock_url=f"{stub_server}/eod/latest")
+    stocks = [f"T{i}" for i in range(48)] + ["AAPL", "MSFT"]
+    result = client.get_stock_prices(stocks, "key")
+    client.close()
+
+    assert result == {"stock_prices": [{"stock": "AAPL", "price": 150.0}, {"stock": "MSFT", "price": 300.0}]}
+    assert len(REQUESTS) == 1
+
+
+def test_stock_batches_are_fetched_concurrently(client):
+    start = time.monotonic()
+    result = client.get_stock_prices(["SLOW", "AAPL", "MSFT", "SLOW2", "SLOW", "AAPL"], "key")
+    elapsed = time.monotonic() - start
+
+    assert [item["stock"] for item in result["stock_prices"]] == ["SLOW", "AAPL", "MSFT", "SLOW2", "SLOW", "AAPL"]
+    # Повторяющиеся тикеры запрашиваются один раз: пакеты [SLOW, AAPL] и [MSFT, SLOW2]
+    assert sorted(symbols for _, symbols in REQUESTS) == [["MSFT", "SLOW2"], ["SLOW", "AAPL"]]
+    # Последовательно два медленных пакета заняли бы не меньше 0.6 секунды
+    assert elapsed < 0.55
+
+
+def test_stock_prices_skip_failed_and_timed_out(client):
+    start = time.monotonic()
+    result = client.get_stock_prices(["AAPL", "XXX", "MSFT", "FAIL", "HANG", "SLOW"], "key")
+    elapsed = time.monotonic() - start
+
+    # Пакет [AAPL, XXX]: XXX нет в ответе; [MSFT, FAIL]: ошибка сервера; [HANG, SLOW]: таймаут
+    assert result == {"stock_prices": [{"stock": "AAPL", "price": 150.0}]}
+    assert elapsed < 1.5
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cache_hit_and_miss():
+    cache = MarketDataCache(ttl={"stock": 60}, clock=FakeClock())
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return {"stock": "AAPL", "price": 150.0}
+
+    assert cache.get("stock", "AAPL", fetch) == {"stock": "AAPL", "price": 150.0}
+    assert cache.get("stock", "AAPL", fetch) == {"stock": "AAPL", "price": 150.0}
+    assert len(calls) == 1
+    assert cache.stats() == {"hits": 1, "stale_hits": 0, "misses": 1, "size": 1}
+
+
+def test_cache_serves_stale_and_refreshes_in_background():
+    clock = FakeClock()
+    cache = MarketDataCache(ttl={"stock": 60}, clock=clock)
+    cache.get("stock", "AAPL", lambda: {"stock": "AAPL", "price": 150.0})
+
+    clock.now += 61
+    refreshed = threading.Event()
+
+    def fetch():
+        refreshed.set()
+        return {"stock": "AAPL", "price": 151.0}
+
+    # Устаревшее значение отдается сразу, новое появляется после фонового обновления
+    assert cache.get("stock", "AAPL", fetch)["price"] == 150.0
+    assert refreshed.wait(1)
+    for _ in range(100):
+        if cache.get("stock", "AAPL", fetch)["price"] == 151.0:
+            break
+        time.sleep(0.01)
+    assert cache.get("stock", "AAPL", fetch)["price"] == 151.0
+    assert cache.stats()["stale_hits"] >= 1
+
+
+def test_cache_lru_eviction_and_errors_not_cached():
+    cache = MarketDataCache(maxsize=2)
+    for stock in ["AAPL", "MSFT", "TSLA"]:
+        cache.get("stock", stock, lambda: {"stock": stock, "price": 1.0})
+    cache.get("currency", "USD", lambda: {"error": "HTTP error occurred"})
+    assert cache.stats()["size"] == 2
+
+    calls = []
+    cache.get("stock", "AAPL", lambda: calls.append(1) or {"stock": "AAPL", "price": 1.0})
+    assert calls == [1]
+
+
+def test_cache_persists_to_disk(tmp_path):
+    path = str(tmp_path / "market_data.json")
+    MarketDataCache(path=path).get("currency", "USD", lambda: {"currency": "USD", "rate": 75.0})
+
+    restored = MarketDataCache(path=path)
+    assert restored.get("currency", "USD", lambda: None) == {"currency": "USD", "rate": 75.0}
+    assert restored.stats()["hits"] == 1
+
+
+def test_cache_saves_once_per_request(tmp_path):
+    path = str(tmp_path / "market_data.json")
+    cache = MarketDataCache(path=path)
+    stocks = [f"T{i}" for i in range(50)]
+
+    with patch.object(MarketDataCache, "_save", autospec=True, side_effect=MarketDataCache._save) as save:
+        cache.get_many("stock", stocks, lambda symbols: {stock: {"stock": stock, "price": 1.0} for stock in symbols})
+    # 50 тикеров одного запроса записываются в файл одной перезаписью
+    assert save.call_count == 1
+    assert MarketDataCache(path=path).stats()["size"] == 50
+
+
+def test_client_uses_cache(stub_server):
+    client = MarketDataClient(stock_url=f"{stub_server}/eod/latest", cache=MarketDataCache())
+    client.get_stock_prices(["AAPL", "MSFT"], "key")
+    result = client.get_stock_prices(["AAPL", "MSFT", "SLOW"], "key")
+    client.close()
+
+    assert result["stock_prices"][1] == {"stock": "MSFT", "price": 300.0}
+    assert client.cache.stats()["hits"] == 2
+    # Второй запрос к API содержит только отсутствующий в кэше тикер
+    assert REQUESTS[-1] == ("/eod/latest", ["SLOW"])
+
+
+def test_requests_are_instrumented(client, metrics_enabled):
+    client.get_stock_prices(["AAPL", "MSFT", "SLOW"], "key")
+    client.get_currency_rates(["USD"], "key")
+
+    collected = metrics_enabled.get_metrics()
+    assert collected["market_data.stock_prices"]["calls"] == 2
+    assert collected["market_data.stock_prices"]["rows"] == 3
+    assert collected["market_data.stock_prices"]["max_seconds"] >= DELAYS["SLOW"]
+    assert collected["market_data.currency_rates"]["calls"] == 1
@@ -0,0 +1,47 @@
+import pytest
+
+from src import metrics
+from src.reports import spending_by_category
+from src.store import TransactionStore
+from src.utils import calculate_card_data, filter_data_by_date, load_operations_data
+from src.views import get_dashboard_data
+
+
+def test_instrument_disabled_records_nothing(operations_file):
+    metrics.reset()
+    load_operations_data(operations_file, use_cache=False)
+    assert metrics.get_metrics() == {}
+
+
+def test_dashboard_call_is_instrumented(operations_file, tmp_path, metrics_enabled, monkeypatch):
+    monkeypatch.setattr("src.views.get_currency_rates", lambda: {"currency_rates": []})
+    monkeypatch.setattr("src.views.get_stock_prices", lambda: {"stock_prices": []})
+    store = TransactionStore(operations_file, cache_dir=str(tmp_path / "cache"))
+    get_dashboard_data("2021-12-31 23:00:00", store=store)
+
+    collected = metrics_enabled.get_metrics()
+    assert collected["load_operations_data"]["rows"] == 2
+    assert collected["filter_data_by_date"]["rows"] == 2
+    assert collected["calculate_card_data"]["rows"] == 2
+    assert collected["top_five_transact"]["calls"] == 1
+    assert collected["get_dashboard_data"]["seconds"] >= collected["calculate_card_data"]["seconds"]
+    assert collected["get_dashboard_data"]["avg_seconds"] == collected["get_dashboard_data"]["seconds"]
+
+
+def test_errors_and_prometheus_text(operations_file, tmp_path, metrics_enabled, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    df = load_operations_data(operations_file, use_cache=False)
+    spending_by_category(df, "Супермаркеты", "2021-12-31")
+    with pytest.raises(TypeError):
+        filter_data_by_date(df, "31.12.2021")
+    calculate_card_data(df)
+
+    collected = metrics_enabled.get_metrics()
+    assert (collected["filter_data_by_date"]["calls"], collected["filter_data_by_date"]["errors"]) == (1, 1)
+    assert collected["spending_by_category"]["calls"] == 1
+
+    text = metrics.prometheus_text()
+    assert "# TYPE finance_calls_total counter" in text
+    assert 'finance_errors_total{function="filter_data_by_date"} 1' in text
+    assert 'finance_rows_total{function="calculate_card_data"} 2' in text
+    assert "# TYPE finance_max_seconds gauge" in text
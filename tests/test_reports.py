@@ -1,7 +1,11 @@
+import json
+import os
+import threading
+
 import pandas as pd
 import pytest
 
-from src.reports import spending_by_category
+from src.reports import ReportSink, get_report_sink, report_decorator, spending_by_categories, spending_by_category
 
 
 @pytest.fixture
@@ -16,3 +20,89 @@ def transactions_data():
 def test_spending_by_category(transactions_data):
     result = spending_by_category(transactions_data, "Фастфуд", "2024-02-01")
     assert result["total_spending"] == -700
+
+
+@pytest.fixture
+def many_transactions():
+    return pd.DataFrame({
+        "Дата операции": pd.to_datetime([
+            "2023-12-01 00:00", "2024-01-01 00:00", "2024-02-01 00:00", "2024-02-01 10:00", "2024-03-15 00:00"
+        ]),
+        "Категория": ["Фастфуд", "Фастфуд", "Такси", "Фастфуд", None],
+        "Сумма операции": [-1000.5, -500, -200.25, -300, -50]
+    })
+
+
+def test_spending_by_categories_matches_single(many_transactions, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    dates = ["2024-01-01", "2024-02-01", "2024-03-31"]
+    result = spending_by_categories(many_transactions, dates=dates)
+    get_report_sink().flush()
+
+    # Все категории и даты считаются за один вызов и записываются в один файл отчета
+    assert len(list(tmp_path.iterdir())) == 1
+    assert [(r["category"], r["date"]) for r in result["reports"]] == [
+        (category, date) for category in ["Такси", "Фастфуд"] for date in dates
+    ]
+    for report in result["reports"]:
+        single = spending_by_category(many_transactions, report["category"], report["date"])
+        assert single["total_spending"] == report["total_spending"]
+
+
+def test_spending_by_categories_unknown_category(many_transactions):
+    result = spending_by_categories(many_transactions, ["Аптеки"], ["2024-02-01"])
+    assert result["reports"] == [{"category": "Аптеки", "date": "2024-02-01", "total_spending": 0}]
+
+
+def test_report_files_unique_under_concurrency(tmp_path):
+    sink = ReportSink(directory=str(tmp_path))
+
+    @report_decorator(sink=sink)
+    def report(i):
+        return {"i": i}
+
+    threads = [threading.Thread(target=report, args=(i,)) for i in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    sink.flush()
+
+    files = list(tmp_path.iterdir())
+    assert len(files) == 20
+    assert sorted(json.loads(f.read_text(encoding="utf-8"))["i"] for f in files) == list(range(20))
+
+
+def test_report_jsonl_and_named_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    sink = ReportSink(jsonl_path="reports.jsonl")
+
+    @report_decorator(sink=sink)
+    def report(category):
+        return {"category": category}
+
+    @report_decorator("named.json", sink=sink)
+    def named_report():
+        return {"category": "Такси"}
+
+    for category in ["Фастфуд", "Аптеки"]:
+        report(category)
+    named_report()
+    sink.flush()
+
+    lines = (tmp_path / "reports.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["result"] for line in lines] == [{"category": "Фастфуд"}, {"category": "Аптеки"}]
+    assert json.loads(lines[0])["report"] == "report"
+    assert json.loads((tmp_path / "named.json").read_text(encoding="utf-8")) == {"category": "Такси"}
+
+
+def test_report_batches(tmp_path):
+    sink = ReportSink(directory=str(tmp_path), batch_size=5, max_delay=10)
+    for i in range(12):
+        sink.submit("report", {"i": i})
+    # flush записывает неполный пакет, не дожидаясь max_delay
+    sink.flush()
+
+    batches = [json.loads(f.read_text(encoding="utf-8")) for f in sorted(tmp_path.iterdir(), key=os.path.getmtime)]
+    assert sorted(len(batch) for batch in batches) == [2, 5, 5]
+    assert sorted(report["i"] for batch in batches for report in batch) == list(range(12))
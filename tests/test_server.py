@@ -0,0 +1,109 @@
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+
+from src.server import DashboardServer
+from src.store import TransactionStore
+
+
+async def fetch(port, targets):
+    # Отправляет запросы по одному keep-alive соединению и возвращает статусы и тела ответов
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    responses = []
+    for target in targets:
+        writer.write(f"GET {target} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        await writer.drain()
+        status = int((await reader.readline()).split()[1])
+        headers = {}
+        while (line := await reader.readline()) != b"\r\n":
+            name, _, value = line.decode().partition(":")
+            headers[name.lower()] = value.strip()
+        body = await reader.readexactly(int(headers["content-length"]))
+        responses.append((status, json.loads(body)))
+    writer.close()
+    return responses
+
+
+@pytest.fixture
+def run_server(operations_file, tmp_path):
+    store = TransactionStore(operations_file, cache_dir=str(tmp_path / "cache"))
+
+    def run(client):
+        async def main():
+            server = DashboardServer(store=store, port=0)
+            await server.start()
+            try:
+                return await client(server.port)
+            finally:
+                await server.close()
+
+        return asyncio.run(main())
+
+    return run
+
+
+@patch("src.views.get_stock_prices", return_value={"stock_prices": []})
+@patch("src.views.get_currency_rates", return_value={"currency_rates": []})
+def test_dashboard_and_search(mock_rates, mock_stocks, run_server):
+    responses = run_server(lambda port: fetch(port, [
+        "/dashboard?date=2021-12-31%2023:00:00",
+        "/search?q=%D0%BA%D0%BE%D0%BB%D1%85%D0%BE%D0%B7",
+        "/search?q=%D0%BE&limit=1&offset=1",
+        "/search?q=nan&limit=-1",
+        "/dashboard?date=31.12.2021",
+        "/dashboard",
+        "/unknown",
+    ]))
+
+    status, dashboard = responses[0]
+    assert status == 200
+    assert dashboard["cards"] == [{"last_digits": "7197", "total_spent": 160.89, "cashback": 1.61}]
+    assert [row["Описание"] for row in responses[1][1]] == ["Колхоз"]
+    # Найденные транзакции идут в порядке файла: вторая — "Перевод"
+    assert [row["Описание"] for row in responses[2][1]] == ["Перевод"]
+    assert [status for status, _ in responses[3:]] == [400, 400, 400, 404]
+
+
+@patch("src.views.get_stock_prices", return_value={"stock_prices": []})
+@patch("src.views.get_currency_rates", return_value={"currency_rates": []})
+def test_many_concurrent_clients(mock_rates, mock_stocks, run_server):
+    targets = ["/dashboard?date=2021-12-31+23:00:00", "/search?q=nan"]
+
+    async def clients(port):
+        return await asyncio.gather(*(fetch(port, targets) for _ in range(50)))
+
+    results = run_server(clients)
+    assert len(results) == 50
+    assert all(response == results[0] for response in results)
+    assert [status for status, _ in results[0]] == [200, 200]
+
+
+def test_search_page_size(run_server, monkeypatch):
+    monkeypatch.setattr("src.server.SEARCH_PAGE_SIZE", 1)
+    monkeypatch.setattr("src.server.MAX_SEARCH_PAGE_SIZE", 1)
+    # Без limit возвращается страница по умолчанию, limit больше наибольшего уменьшается до него
+    responses = run_server(lambda port: fetch(port, ["/search?q=%D0%BE", "/search?q=%D0%BE&limit=10"]))
+    assert [[row["Описание"] for row in body] for _, body in responses] == [["Колхоз"], ["Колхоз"]]
+
+
+def test_too_long_header(run_server):
+    async def client(port):
+        errors = []
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        # Заголовок длиннее буфера StreamReader (64 КиБ)
+        writer.write(b"GET /search?q=a HTTP/1.1\r\nX-Long: " + b"a" * 70_000 + b"\r\n\r\n")
+        await writer.drain()
+        status = int((await reader.readline()).split()[1])
+        await reader.read()
+        writer.close()
+        await asyncio.sleep(0.05)
+        # Соединение закрыто без необработанных исключений, сервер продолжает отвечать
+        return status, list(errors), await fetch(port, ["/search?q=%D0%BE&limit=1"])
+
+    status, errors, responses = run_server(client)
+    assert status == 431
+    assert errors == [], errors
+    assert responses[0][0] == 200
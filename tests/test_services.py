@@ -1,7 +1,12 @@
+import io
+import json
+import logging
+
 import pandas as pd
 import pytest
 
-from src.services import search_transactions
+from src.services import TransactionSearch, find_transactions, get_search_engine, search_transactions
+from src.store import TransactionStore
 
 
 @pytest.fixture
@@ -22,3 +27,97 @@ def test_search_transactions_found(sample_transactions):
 def test_search_transactions_not_found(sample_transactions):
     result = search_transactions(sample_transactions, "аптека")
     assert "[]" in result
+
+
+def test_search_transactions_does_not_mutate(sample_transactions):
+    sample_transactions["Дата операции"] = pd.to_datetime(["2024-01-01"] * 4)
+    original = sample_transactions.copy()
+    search_transactions(sample_transactions, "транспорт")
+    pd.testing.assert_frame_equal(sample_transactions, original)
+
+
+def test_search_engine_matches_row_scan(sample_transactions):
+    sample_transactions.loc[1, "Категория"] = None
+    engine = TransactionSearch(sample_transactions)
+    for query in ["", "а", "транспорт", "nan", "кафе", "т\x01п"]:
+        expected = [
+            i for i, row in enumerate(sample_transactions.to_dict(orient="records"))
+            if query in str(row["Описание"]).strip().lower() or query in str(row["Категория"]).strip().lower()
+        ]
+        assert engine.find(query) == expected
+
+
+def test_ngram_index_matches_substring_semantics():
+    df = pd.DataFrame({
+        "Описание": ["Колхоз", " Магнит ", "Перевод между счетами", "Ситидрайв", None, "ККК"],
+        "Категория": ["Супермаркеты", "Супермаркеты", "Переводы", None, "Каршеринг", "Ккк"],
+    })
+    engine = TransactionSearch(df)
+    engine.index = engine.build_index()
+    texts = [(str(d).strip().lower(), str(c).strip().lower()) for d, c in zip(df["Описание"], df["Категория"])]
+
+    # Проверяем все подстроки всех текстов, а также запросы, которых нет в данных
+    queries = {text[i:j] for pair in texts for text in pair for i in range(len(text)) for j in range(i, len(text) + 1)}
+    queries.update(["кол хоз", "супермаркетыы", "nan", "т\x01с"])
+    for query in queries:
+        expected = [i for i, (description, category) in enumerate(texts) if query in description or query in category]
+        assert engine.find(query) == expected, query
+
+
+def test_store_search_index_is_persisted(operations_file, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    store = TransactionStore(operations_file, cache_dir=cache_dir, search_index=True)
+    built = get_search_engine(store)
+    assert built.index is not None
+
+    # Второе хранилище читает индекс из кэша
+    loaded = get_search_engine(TransactionStore(operations_file, cache_dir=cache_dir, search_index=True))
+    assert loaded.index.keys.tolist() == built.index.keys.tolist()
+    assert '"Описание": "Колхоз"' in search_transactions(store, "колхоз")
+
+
+def test_store_search_index_depends_on_appended_files(operations_file, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    # Две выгрузки с одинаковым числом строк, но разными описаниями
+    for name, description in (("a.xlsx", "Аптека"), ("b.xlsx", "Бургерная")):
+        df = pd.read_excel(operations_file).iloc[[0]]
+        df["Описание"] = description
+        df.to_excel(tmp_path / name, index=False)
+
+    first = TransactionStore(operations_file, cache_dir=cache_dir, search_index=True)
+    first.append_file(str(tmp_path / "a.xlsx"))
+    assert len(json.loads(search_transactions(first, "аптека"))) == 1
+
+    # Индекс первого хранилища не подходит ко второму с другой выгрузкой
+    second = TransactionStore(operations_file, cache_dir=cache_dir, search_index=True)
+    second.append_file(str(tmp_path / "b.xlsx"))
+    assert json.loads(search_transactions(second, "аптека")) == []
+    assert [row["Описание"] for row in json.loads(search_transactions(second, "бургер"))] == ["Бургерная"]
+
+
+def test_search_result_pagination_and_streaming(sample_transactions, caplog):
+    sample_transactions["Дата операции"] = pd.to_datetime(["2024-01-01"] * 4)
+    expected = json.loads(search_transactions(sample_transactions, "т"))
+    assert len(expected) == 4
+
+    with caplog.at_level(logging.INFO):
+        result = find_transactions(sample_transactions, "Т")
+    assert len(result) == 4
+    # В журнал попадают только сведения о поиске
+    assert "Супермаркеты" not in caplog.text and "найдено 4" in caplog.text
+
+    assert result.records(limit=2, offset=1) == expected[1:3]
+    assert json.loads(search_transactions(sample_transactions, "т", limit=2, offset=3)) == expected[3:]
+    assert list(result.iter_records(offset=1, batch_size=2)) == expected[1:]
+
+    parts = list(result.iter_json(batch_size=3))
+    assert len(parts) == 4
+    assert json.loads("".join(parts)) == expected
+    assert "".join(result.iter_json(limit=0)) == "[]"
+
+    buffer = io.StringIO()
+    result.write_json(buffer, offset=2, batch_size=1)
+    assert json.loads(buffer.getvalue()) == expected[2:]
+
+    with pytest.raises(ValueError):
+        result.records(offset=-1)
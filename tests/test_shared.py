@@ -0,0 +1,124 @@
+import json
+import os
+import subprocess
+import sys
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.reports import spending_by_category
+from src.services import search_transactions
+from src.shared import (SharedTransactionStore, attach_dataset, list_versions, publish_dataset,
+                        read_current_version)
+from src.utils import compact_transactions, expand_transactions, load_operations_data
+from src.views import get_dashboard_data
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def test_publish_and_attach_round_trip(operations_file, tmp_path):
+    df = load_operations_data(operations_file, use_cache=False)
+    root = str(tmp_path / "shared")
+
+    assert publish_dataset(df, root) == 1
+    shared, version = attach_dataset(root)
+
+    assert version == 1
+    pd.testing.assert_frame_equal(expand_transactions(shared), df)
+    pd.testing.assert_frame_equal(shared, compact_transactions(df))
+
+
+def test_attached_columns_are_read_only_views(operations_file, tmp_path):
+    root = str(tmp_path / "shared")
+    publish_dataset(load_operations_data(operations_file, use_cache=False), root)
+    shared, _ = attach_dataset(root)
+
+    for column in shared.columns:
+        values = shared[column].array
+        values = values.codes if isinstance(values, pd.Categorical) else values.to_numpy()
+        base = values
+        while base.base is not None and not isinstance(base, np.memmap):
+            base = base.base
+        assert isinstance(base, np.memmap), column
+        assert not values.flags.writeable
+    assert isinstance(shared.index, pd.RangeIndex)
+
+
+def test_publish_keeps_recent_versions(operations_file, tmp_path):
+    df = load_operations_data(operations_file, use_cache=False)
+    root = str(tmp_path / "shared")
+    for _ in range(4):
+        publish_dataset(df, root, keep=1)
+
+    assert read_current_version(root) == 4
+    assert list_versions(root) == [3, 4]
+
+
+def test_attach_without_dataset(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        attach_dataset(str(tmp_path))
+
+
+def test_publish_rejects_object_columns(tmp_path):
+    df = pd.DataFrame({"Описание": pd.Categorical(["a"]), "Данные": [{"a": 1}]})
+    df.attrs = {"dtypes": {}, "kopecks": []}
+    with pytest.raises(ValueError):
+        publish_dataset(df, str(tmp_path))
+
+
+@patch("src.views.get_stock_prices", return_value={"stock_prices": []})
+@patch("src.views.get_currency_rates", return_value={"currency_rates": []})
+def test_shared_store_picks_up_new_version(mock_rates, mock_stocks, operations_file, tmp_path):
+    df = load_operations_data(operations_file, use_cache=False)
+    root = str(tmp_path / "shared")
+    publish_dataset(df, root)
+    store = SharedTransactionStore(root, check_interval=0)
+
+    assert json.loads(search_transactions(store, "колхоз"))[0]["Описание"] == "Колхоз"
+    assert spending_by_category(store, "Супермаркеты", "2022-01-01")["total_spending"] == -160
+    dashboard = get_dashboard_data("2021-12-31 23:00:00", store=store)
+    assert dashboard["cards"] == [{"last_digits": "7197", "total_spent": 160.89, "cashback": 1.61}]
+    assert (store.version, store.dataset_version) == (1, 1)
+
+    # Загрузчик публикует новую версию: хранилище подключает ее целиком при следующем обращении
+    publish_dataset(pd.concat([df, df[df["Описание"] == "Колхоз"]]), root)
+    assert store.refresh() is True
+    assert len(store.df) == 3
+    assert (store.version, store.dataset_version) == (2, 2)
+    assert json.loads(search_transactions(store, "колхоз", limit=10))[1]["Описание"] == "Колхоз"
+
+
+def test_worker_process_attaches_published_dataset(operations_file, tmp_path):
+    root = str(tmp_path / "shared")
+    publish_dataset(load_operations_data(operations_file, use_cache=False), root)
+
+    # Рабочий процесс подключается к набору, опубликованному другим процессом
+    code = ("import sys; from src.shared import SharedTransactionStore; "
+            "store = SharedTransactionStore(sys.argv[1]); "
+            "print(len(store.df), store.dataset_version)")
+    result = subprocess.run([sys.executable, "-c", code, root], capture_output=True, text=True, cwd=ROOT_DIR,
+                            check=True)
+    assert result.stdout.split() == ["2", "1"]
+
+
+def test_loader_publishes_statement(operations_file, tmp_path):
+    from src.shared import main
+
+    root = str(tmp_path / "shared")
+    assert main([operations_file, root, "--cache-dir", str(tmp_path / "cache")]) == 0
+    assert read_current_version(root) == 1
+
+
+def test_default_store_attaches_shared_dataset(operations_file, tmp_path, monkeypatch):
+    from src.views import get_default_store
+
+    root = str(tmp_path / "shared")
+    publish_dataset(load_operations_data(operations_file, use_cache=False), root)
+    monkeypatch.setenv("SHARED_DATASET", root)
+    monkeypatch.setattr("src.views._default_store", None)
+
+    store = get_default_store()
+    assert isinstance(store, SharedTransactionStore)
+    assert len(store.df) == 2
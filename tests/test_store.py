@@ -0,0 +1,170 @@
+import json
+import threading
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from src.aggregates import AggregateCube
+from src.reports import spending_by_category
+from src.services import get_search_engine, search_transactions
+from src.store import TransactionStore, get_transactions
+from src.utils import DateOrder
+from src.views import get_dashboard_data
+
+
+def test_store_loads_once(operations_file, tmp_path):
+    store = TransactionStore(operations_file, cache_dir=str(tmp_path / "cache"), check_interval=0)
+    df = store.df
+    assert store.version == 1
+    assert store.df is df
+    assert store.version == 1
+
+
+def test_store_reloads_on_file_change(operations_file, tmp_path):
+    store = TransactionStore(operations_file, cache_dir=str(tmp_path / "cache"), check_interval=0)
+    assert len(store.df) == 2
+
+    df = pd.read_excel(operations_file)
+    pd.concat([df, df.iloc[[0]]]).to_excel(operations_file, index=False)
+
+    assert len(store.df) == 3
+    assert store.version == 2
+
+
+def test_store_serves_old_data_during_reload(operations_file, tmp_path):
+    started, release = threading.Event(), threading.Event()
+
+    class SlowStore(TransactionStore):
+        def _load(self, signature):
+            if self._df is not None:
+                started.set()
+                assert release.wait(5)
+            return super()._load(signature)
+
+    store = SlowStore(operations_file, cache_dir=str(tmp_path / "cache"), check_interval=0)
+    old, version = store.snapshot()
+    df = pd.read_excel(operations_file)
+    pd.concat([df, df.iloc[[0]]]).to_excel(operations_file, index=False)
+
+    reloader = threading.Thread(target=store.refresh)
+    reloader.start()
+    assert started.wait(5)
+    # Пока идет перезагрузка, другие потоки сразу получают прежние данные
+    current, current_version = store.snapshot()
+    assert current is old and current_version == version
+    assert store.refresh() is False
+    release.set()
+    reloader.join(5)
+
+    assert len(store.df) == 3
+    assert store.version == version + 1
+
+
+def test_derived_builds_outside_store_lock(operations_file, tmp_path):
+    store = TransactionStore(operations_file, cache_dir=str(tmp_path / "cache"))
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow_build(df):
+        calls.append(len(df))
+        started.set()
+        assert release.wait(5)
+        return DateOrder(df)
+
+    builders = [threading.Thread(target=store.derived, args=("date_order", slow_build)) for _ in range(2)]
+    for builder in builders:
+        builder.start()
+    assert started.wait(5)
+    # Пока структура строится, данные и другие структуры доступны без ожидания
+    assert store.snapshot()[1] == store.version
+    assert store.derived("cube", AggregateCube.build) is not None
+    release.set()
+    for builder in builders:
+        builder.join(5)
+
+    # Одну структуру строит один поток
+    assert calls == [2]
+    assert isinstance(store.derived("date_order", slow_build), DateOrder)
+    assert calls == [2]
+
+
+def test_get_transactions_passes_dataframe_through():
+    df = pd.DataFrame({"Сумма операции": [1]})
+    assert get_transactions(df) is df
+
+
+@patch("src.views.get_stock_prices", return_value={"stock_prices": []})
+@patch("src.views.get_currency_rates", return_value={"currency_rates": []})
+def test_functions_accept_store(mock_rates, mock_stocks, operations_file, tmp_path):
+    store = TransactionStore(operations_file, cache_dir=str(tmp_path / "cache"))
+
+    result = json.loads(search_transactions(store, "колхоз"))
+    assert [row["Описание"] for row in result] == ["Колхоз"]
+    # Поиск не должен изменять данные в хранилище
+    assert pd.api.types.is_datetime64_any_dtype(store.df["Дата операции"])
+
+    assert spending_by_category(store, "Супермаркеты", "2022-01-01")["total_spending"] == -160
+
+    dashboard = get_dashboard_data("2021-12-31 23:00:00", store=store)
+    assert dashboard["cards"] == [{"last_digits": "7197", "total_spent": 160.89, "cashback": 1.61}]
+
+
+def write_statement(path, operations_file, rows):
+    # Выгрузка с колонками фикстуры: rows — список (дата, сумма, описание)
+    df = pd.read_excel(operations_file).iloc[[0] * len(rows)].reset_index(drop=True)
+    df["Дата операции"] = [date for date, _, _ in rows]
+    df["Сумма операции"] = [amount for _, amount, _ in rows]
+    df["Описание"] = [description for _, _, description in rows]
+    df.to_excel(path, index=False)
+    return str(path)
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_append_file_adds_only_new_rows(operations_file, tmp_path, compact):
+    store = TransactionStore(operations_file, cache_dir=str(tmp_path / "cache"), compact=compact)
+    engine = get_search_engine(store)
+    cube = store.derived("cube", AggregateCube.build)
+
+    new_file = write_statement(tmp_path / "new.xlsx", operations_file, [
+        ("31.12.2021 16:44:00", -160.89, "Колхоз"),  # уже есть в хранилище
+        ("01.01.2022 10:00:00", -50.0, "Аптека"),
+        ("01.01.2022 10:00:00", -50.0, "Аптека"),  # второй такой же платеж
+    ])
+    assert store.append_file(new_file) == 2
+    assert store.append_file(new_file) == 0
+    assert len(store.df) == 4
+    assert store.version == 2
+
+    # Новые строки в конце: поиск и агрегаты дополнены, а не построены заново
+    assert get_search_engine(store) is engine
+    assert store.derived("cube", AggregateCube.build) is cube
+    assert len(json.loads(search_transactions(store, "аптека"))) == 2
+    assert cube.category_spending("Супермаркеты", "2022-01-01", "2022-01-02") == -100
+
+
+def test_append_file_keeps_file_order(operations_file, tmp_path):
+    store = TransactionStore(operations_file, cache_dir=str(tmp_path / "cache"))
+    engine = get_search_engine(store)
+    order = store.derived("date_order", DateOrder)
+
+    old_file = write_statement(tmp_path / "old.xlsx", operations_file, [("15.12.2021 12:00:00", -10.0, "Аптека")])
+    assert store.append_file(old_file) == 1
+    # Более ранняя операция добавляется в конец данных, а порядок по дате дополняется
+    assert store.df["Описание"].iloc[-1] == "Аптека"
+    assert isinstance(store.df.index, pd.RangeIndex)
+    assert get_search_engine(store) is engine
+    assert store.derived("date_order", DateOrder) is order
+    assert order.positions.tolist() == [2, 1, 0]
+    assert order.range("2021-12-01", "2021-12-30 23:59:59").tolist() == [1, 2]
+    assert [row["Описание"] for row in json.loads(search_transactions(store, "аптека"))] == ["Аптека"]
+
+
+def test_append_file_survives_reload(operations_file, tmp_path):
+    store = TransactionStore(operations_file, cache_dir=str(tmp_path / "cache"), check_interval=0)
+    new_file = write_statement(tmp_path / "new.xlsx", operations_file, [("01.01.2022 10:00:00", -50.0, "Аптека")])
+    store.append_file(new_file)
+
+    df = pd.read_excel(operations_file)
+    pd.concat([df, df.iloc[[0]]]).to_excel(operations_file, index=False)
+    assert len(store.df) == 4
@@ -0,0 +1,161 @@
+import datetime
+import json
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import make_statement
+from src.aggregates import AggregateCube
+from src.services import search_transactions
+from src.store import TransactionStore
+from src.utils import (DateOrder, append_transactions, calculate_card_data, compact_transactions,
+                       convert_operations_types, dashboard_sections_batch, expand_transactions, filter_data_by_date,
+                       iter_operations_chunks, load_operations_data, load_operations_many, top_five_transact)
+
+
+def test_compact_transactions_memory_report():
+    df = make_statement(50_000)
+    compact = compact_transactions(df)
+
+    before = df.memory_usage(deep=True).sum()
+    after = compact.memory_usage(deep=True).sum()
+    # Компактные данные занимают по memory_usage(deep=True) как минимум втрое меньше
+    assert after * 3 < before
+    assert compact['Сумма операции'].dtype == 'int64'
+    assert compact['Категория'].dtype == 'category'
+
+
+def test_compact_transactions_roundtrip(operations_file):
+    df = load_operations_data(operations_file, use_cache=False)
+    pd.testing.assert_frame_equal(expand_transactions(compact_transactions(df)), df)
+
+
+def test_compact_keeps_lossy_columns():
+    df = pd.DataFrame({"Сумма операции": [1.005, -2.5], "MCC": [0.1, None], "Описание": ["a", "b"]})
+    compact = compact_transactions(df)
+    assert compact["Сумма операции"].dtype == "float64"
+    assert compact["MCC"].dtype == "float64"
+    pd.testing.assert_frame_equal(expand_transactions(compact), df)
+
+
+def test_compact_results_unchanged():
+    df = make_statement(20_000)
+    compact = compact_transactions(df)
+    target_date = pd.Timestamp('2021-06-15 12:00:00')
+
+    filtered, compact_filtered = filter_data_by_date(df, target_date), filter_data_by_date(compact, target_date)
+    assert calculate_card_data(compact_filtered) == calculate_card_data(filtered)
+    assert top_five_transact(compact_filtered) == top_five_transact(filtered)
+    assert search_transactions(compact, 'аптек') == search_transactions(df, 'аптек')
+
+
+def test_store_compact(operations_file, tmp_path):
+    store = TransactionStore(operations_file, cache_dir=str(tmp_path / "cache"), compact=True)
+    assert sorted(store.df['Сумма операции'].tolist()) == [-16089, 50000]
+    assert json.loads(search_transactions(store, 'колхоз'))[0]['Сумма операции'] == -160.89
+
+
+def test_append_compact_keeps_sorted_categories():
+    df = compact_transactions(pd.DataFrame({"Номер карты": ["*7197"], "Статус": ["OK"], "Сумма операции": [-1.0]}))
+    new_rows = pd.DataFrame({"Номер карты": ["*1111"], "Статус": ["OK"], "Сумма операции": [-2.0]})
+
+    combined = append_transactions(df, new_rows)
+    # Категории остаются упорядоченными, как после compact_transactions: карты идут в порядке номеров
+    assert combined["Номер карты"].cat.categories.tolist() == ["*1111", "*7197"]
+    assert combined["Номер карты"].tolist() == ["*7197", "*1111"]
+    assert [card["last_digits"] for card in calculate_card_data(combined)] == ["1111", "7197"]
+
+
+def test_iter_operations_chunks(operations_file):
+    assert [len(chunk) for chunk in iter_operations_chunks(operations_file, chunk_size=1)] == [1, 1]
+
+    expected = convert_operations_types(pd.read_excel(operations_file))
+    pd.testing.assert_frame_equal(next(iter_operations_chunks(operations_file, chunk_size=2)), expected)
+
+
+def test_load_operations_data_chunked(operations_file, tmp_path):
+    expected = load_operations_data(operations_file, use_cache=False)
+    pd.testing.assert_frame_equal(load_operations_data(operations_file, use_cache=False, chunk_size=1), expected)
+
+    cache_dir = str(tmp_path / "cache")
+    pd.testing.assert_frame_equal(load_operations_data(operations_file, cache_dir=cache_dir, chunk_size=1), expected)
+    with patch("src.utils.iter_operations_chunks") as mock_chunks:
+        pd.testing.assert_frame_equal(load_operations_data(operations_file, cache_dir=cache_dir, chunk_size=1),
+                                      expected)
+    mock_chunks.assert_not_called()
+
+
+def test_load_operations_data_chunked_mixed_types(operations_file, tmp_path):
+    # MCC: число в первом блоке и строка во втором — блоки нельзя склеить по колонкам
+    df = pd.read_excel(operations_file)
+    df["MCC"] = [5411, "нет"]
+    df.to_excel(operations_file, index=False)
+    expected = load_operations_data(operations_file, use_cache=False)
+
+    pd.testing.assert_frame_equal(load_operations_data(operations_file, use_cache=False, chunk_size=1), expected)
+    cache_dir = tmp_path / "cache"
+    result = load_operations_data(operations_file, cache_dir=str(cache_dir), chunk_size=1)
+    assert result["MCC"].tolist() == expected["MCC"].tolist()
+    # Во временных каталогах кэша не остается недописанных частей
+    assert not [path.name for path in cache_dir.iterdir() if ".tmp" in path.name]
+
+
+def test_cube_from_chunks():
+    df = make_statement(5_000)
+    chunks = [df.iloc[i:i + 700] for i in range(0, len(df), 700)]
+    pd.testing.assert_frame_equal(AggregateCube.from_chunks(chunks).buckets, AggregateCube.build(df).buckets)
+
+
+@pytest.mark.parametrize("use_cache", [False, True])
+def test_load_operations_many(operations_file, tmp_path, use_cache):
+    df = pd.read_excel(operations_file)
+    file_paths = []
+    for i in range(3):
+        # Файлы с пересекающимися датами: строки идут в порядке файлов
+        part = df.copy()
+        part["Описание"] = [f"Файл {i}, строка {j}" for j in range(len(part))]
+        file_paths.append(str(tmp_path / f"account_{i}.xlsx"))
+        part.to_excel(file_paths[-1], index=False)
+
+    cache_dir = str(tmp_path / "cache")
+    serial = load_operations_many(file_paths, workers=1, use_cache=use_cache, cache_dir=cache_dir)
+    parallel = load_operations_many(file_paths, workers=3, use_cache=use_cache, cache_dir=cache_dir)
+    pd.testing.assert_frame_equal(parallel, serial)
+    assert serial["Описание"].tolist() == [f"Файл {i}, строка {j}" for i in range(3) for j in range(2)]
+    assert isinstance(serial.index, pd.RangeIndex)
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_dashboard_sections_batch_matches_single_date(compact):
+    df = make_statement(3_000, cards=7)
+    # Округленные суммы дают много равных значений в топе
+    df["Сумма операции"] = df["Сумма операции"].round(-2)
+    if compact:
+        df = compact_transactions(df)
+
+    days = pd.date_range("2021-01-01", "2021-03-05", freq="D")
+    targets = [day.to_pydatetime() for day in days + pd.Timedelta(hours=23, minutes=59, seconds=59)]
+    # Даты с другим временем суток (другое начало периода), повторы и дата до начала данных
+    targets += [pd.Timestamp("2021-02-10 08:30:00").to_pydatetime(), targets[3], datetime.datetime(2017, 5, 1)]
+    original = df.copy()
+    for k in (5, 1, 0):
+        batch = dashboard_sections_batch(df, targets, k)
+        for target_date, sections in zip(targets, batch):
+            filtered = filter_data_by_date(df, target_date)
+            assert sections == {"cards": calculate_card_data(filtered),
+                                "top_transactions": top_five_transact(filtered, k)}, (target_date, k)
+    # Входные данные не изменяются
+    pd.testing.assert_frame_equal(df, original)
+
+
+def test_dashboard_sections_batch_keeps_sorted_input():
+    # Уже упорядоченные по дате данные раньше получали DatetimeIndex прямо во входном DataFrame
+    df = make_statement(500).sort_values("Дата операции", ignore_index=True)
+    original = df.copy()
+    order = DateOrder(df)
+    target = datetime.datetime(2021, 12, 31, 23, 59, 59)
+
+    assert dashboard_sections_batch(df, [target]) == dashboard_sections_batch(df, [target], order=order)
+    assert isinstance(df.index, pd.RangeIndex)
+    pd.testing.assert_frame_equal(df, original)
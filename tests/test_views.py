@@ -1,14 +1,32 @@
 import datetime
+import threading
+import time
+import weakref
 from io import StringIO
+import numpy as np
 import pandas as pd
 import pytest
 from unittest.mock import patch
+from src.store import TransactionStore
 from src.views import (
+    DashboardCache,
     get_currency_rates,
     get_stock_prices,
-    get_dashboard_data
+    get_dashboard_batch,
+    get_dashboard_cache,
+    get_dashboard_data,
+    get_market_data_client
 )
 from src.utils import load_operations_data, filter_data_by_date, get_greeting, calculate_card_data, top_five_transact
+from src.utils import DateOrder, compact_transactions, slice_by_date
+
+
+# Каждый тест получает новый клиент API, чтобы ответы не брались из кэша предыдущих тестов
+@pytest.fixture(autouse=True)
+def fresh_market_data_client(monkeypatch):
+    monkeypatch.setattr("src.views._market_data_client", None)
+    # Разделы дашборда тоже не должны браться из кэша предыдущих тестов
+    monkeypatch.setattr("src.views._dashboard_caches", weakref.WeakKeyDictionary())
 
 
 # Тестирование функции load_operations_data с Mock
@@ -43,6 +61,22 @@ def test_filter_data_by_date():
     assert len(result) == 2
 
 
+# Тестирование выборки по диапазону дат на упорядоченных и неупорядоченных данных
+def test_slice_by_date_sorted_matches_mask():
+    df = pd.DataFrame({
+        "Дата операции": pd.to_datetime(["2024-01-20", "2024-01-05", "2024-01-15", "2024-01-15", "2023-12-31"]),
+        "Сумма операции": [-300, -100, -200, -250, -50]
+    })
+    order = DateOrder(df)
+    assert order.positions.tolist() == [4, 1, 2, 3, 0]
+
+    # Бинарный поиск возвращает те же строки в том же порядке, что и маска
+    sliced = slice_by_date(df, pd.Timestamp("2024-01-01"), pd.Timestamp("2024-01-15"), order)
+    masked = slice_by_date(df, pd.Timestamp("2024-01-01"), pd.Timestamp("2024-01-15"))
+    assert list(sliced["Сумма операции"]) == [-100, -200, -250]
+    pd.testing.assert_frame_equal(sliced, masked)
+
+
 # Тестирование функции calculate_card_data с параметризацией
 @pytest.mark.parametrize(
     "input_data, expected_result",
@@ -75,19 +109,22 @@ def test_calculate_card_data(input_data, expected_result):
 def mock_currency_data():
     return {
         "rates": {
-            "RUB": 75.0
+            "USD": 0.0125,
+            "EUR": 0.01
         }
     }
 
 
-@patch("requests.get")
+@patch("requests.Session.get")
 def test_get_currency_rates(mock_get, mock_currency_data):
     mock_get.return_value.json.return_value = mock_currency_data
 
     result = get_currency_rates()
     assert "currency_rates" in result
     assert result["currency_rates"][0]["currency"] == "USD"
-    assert result["currency_rates"][0]["rate"] == 75.0
+    assert result["currency_rates"][0]["rate"] == pytest.approx(80.0)
+    assert result["currency_rates"][1]["rate"] == pytest.approx(100.0)
+    assert mock_get.call_count == 1
 
 
 # Тестирование функции get_stock_prices с Mock для внешнего API-запроса
@@ -101,15 +138,18 @@ def mock_stock_data():
     }
 
 
-@patch("requests.get")
+@patch("requests.Session.get")
 def test_get_stock_prices(mock_get, mock_stock_data):
     mock_get.return_value.json.return_value = mock_stock_data
 
     result = get_stock_prices()
     assert "stock_prices" in result
-    assert len(result["stock_prices"]) == 5
+    assert len(result["stock_prices"]) == 2
     assert result["stock_prices"][0]["stock"] == "AAPL"
     assert result["stock_prices"][0]["price"] == 150.0
+    assert result["stock_prices"][1]["stock"] == "GOOGL"
+    assert result["stock_prices"][1]["price"] == 2700.0
+    assert mock_get.call_count == 1
 
 
 # Тестирование функции get_dashboard_data с Mock
@@ -144,7 +184,7 @@ def test_get_dashboard_data(mock_greeting, mock_top_transact, mock_card_data, mo
     assert result["stock_prices"][0]["price"] == 150.0
 
 # Тестирование функции get_currency_rates с пустым ответом от API
-@patch("requests.get")
+@patch("requests.Session.get")
 def test_get_currency_rates_empty(mock_get):
     mock_get.return_value.json.return_value = {"rates": {}}
 
@@ -154,7 +194,7 @@ def test_get_currency_rates_empty(mock_get):
 
 
 # Тестирование функции get_stock_prices с пустым ответом от API
-@patch("requests.get")
+@patch("requests.Session.get")
 def test_get_stock_prices_empty(mock_get):
     mock_get.return_value.json.return_value = {"data": []}
 
@@ -188,6 +228,165 @@ def test_top_five_transact_less_than_five():
     assert len(result) == 2  # Ожидаем 2 транзакции, так как их меньше 5
 
 
+def test_top_five_transact_k_and_ties():
+    df = pd.DataFrame({
+        "Дата операции": pd.to_datetime(["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-04", "2024-01-05"]),
+        "Сумма операции": [-100.0, 300.0, -300.0, None, -50.0],
+        "Категория": ["Продукты", "Пополнения", "Кафе", "Кафе", "Транспорт"],
+        "Описание": ["Магнит", "Пополнение", "Кафе", "Кафе", "Метро"]
+    })
+    # Одинаковые по модулю суммы идут в порядке следования, пропуски — в конце
+    assert [item["date"] for item in top_five_transact(df, k=3)] == ["02.01.2024", "03.01.2024", "01.01.2024"]
+    assert top_five_transact(df, k=5)[-1]["date"] == "04.01.2024"
+    assert top_five_transact(df, k=0) == []
 
 
+@pytest.mark.parametrize("k", [1, 3, 5, 8])
+def test_top_five_transact_ties_match_sort_values(k):
+    # Много равных по модулю сумм: порядок равных задает сортировка pandas, как в исходной реализации
+    amounts = [30000.0, -30000.0, -87068.0, 30000.0, None, -40068.0, -30000.0] * 6 + [-5.0] * 20
+    df = pd.DataFrame({
+        "Дата операции": pd.date_range("2024-01-01", periods=len(amounts), freq="h"),
+        "Сумма операции": amounts,
+        "Категория": "Переводы",
+        "Описание": [f"Перевод {i}" for i in range(len(amounts))],
+    })
+    expected = df.sort_values(by="Сумма операции", key=abs, ascending=False).head(k)["Описание"].tolist()
+    assert [item["description"] for item in top_five_transact(df, k)] == expected
+    assert [item["description"] for item in top_five_transact(compact_transactions(df), k)] == expected
+
 
+def test_calculate_card_data_many_cards():
+    df = pd.DataFrame({
+        "Номер карты": [f"*{i:04d}" for i in range(1000)] * 2,
+        "Статус": "OK",
+        "Сумма операции": [-0.5] * 1000 + [10.0] * 1000,
+    })
+    result = calculate_card_data(df)
+    assert len(result) == 1000
+    # Половина копейки кешбэка округляется, как в исходной реализации: round(numpy.float64(0.005), 2) == 0.0
+    assert result[0] == {"last_digits": "0000", "total_spent": 0.5, "cashback": 0.0}
+
+
+def test_calculate_card_data_cashback_rounding():
+    amounts = [-3734.5, -1.5, -0.5, -1234.5, -2.5, -99.99]
+    df = pd.DataFrame({"Номер карты": [f"*{i:04d}" for i in range(len(amounts))], "Статус": "OK",
+                       "Сумма операции": amounts})
+    # Кешбэк округляется как round от numpy.float64, в том числе на половине копейки
+    assert [card["cashback"] for card in calculate_card_data(df)] == [
+        round(np.float64(-amount) / 100, 2) for amount in amounts]
+    assert calculate_card_data(df)[0]["cashback"] == 37.34
+
+
+def test_calculate_card_data_cashback_exact_sum():
+    amounts = [-1603.76, -1847.06, -532.68]
+    df = pd.DataFrame({"Номер карты": "*0001", "Статус": "OK", "Сумма операции": amounts})
+    # Сумма float дает 3983.4999999999995 и кешбэк 39.83; по точной сумме 3983.50 кешбэк 39.84
+    assert round(abs(df["Сумма операции"].sum()) / 100, 2) == 39.83
+    assert calculate_card_data(df) == [{"last_digits": "0001", "total_spent": 3983.5, "cashback": 39.84}]
+
+
+@patch("src.views.get_stock_prices", return_value={"stock_prices": []})
+@patch("src.views.get_currency_rates", return_value={"currency_rates": []})
+def test_dashboard_sections_cached_per_data_version(mock_rates, mock_stocks, operations_file, tmp_path):
+    store = TransactionStore(operations_file, cache_dir=str(tmp_path / "cache"), check_interval=0)
+
+    with patch("src.views.calculate_card_data", wraps=calculate_card_data) as mock_card_data:
+        first = get_dashboard_data("2021-12-31 23:00:00", store=store)
+        first["cards"][0]["total_spent"] = 0
+        second = get_dashboard_data("2021-12-31 23:00:00", store=store)
+        assert mock_card_data.call_count == 1
+        # Курсы и цены запрашиваются при каждом формировании дашборда
+        assert mock_rates.call_count == 2
+        assert second["cards"] == [{"last_digits": "7197", "total_spent": 160.89, "cashback": 1.61}]
+
+        # Изменение исходного файла дает новую версию данных и сбрасывает кэш
+        df = pd.read_excel(operations_file)
+        pd.concat([df, df.iloc[[0]]]).to_excel(operations_file, index=False)
+        third = get_dashboard_data("2021-12-31 23:00:00", store=store)
+        assert mock_card_data.call_count == 2
+        assert third["cards"][0]["total_spent"] == 321.78
+
+    assert get_dashboard_cache(store).stats() == {"hits": 1, "misses": 2, "invalidations": 1, "size": 1,
+                                                  "hit_rate": 1 / 3}
+
+
+def test_dashboard_cache_lru():
+    cache = DashboardCache(maxsize=2)
+    for day in (1, 2, 1, 3):
+        cache.get(1, day, lambda: {"cards": [{"day": day}]})
+    assert cache.get(1, 1, lambda: {"cards": []}) == {"cards": [{"day": 1}]}
+    # Дата 2 вытеснена как давно не использовавшаяся
+    assert cache.get(1, 2, lambda: {"cards": []}) == {"cards": []}
+    # Запрос со старой версией данных не меняет кэш
+    cache.get(2, 1, lambda: {"cards": []})
+    assert cache.get(1, 1, lambda: {"cards": [{"day": 0}]}) == {"cards": [{"day": 0}]}
+    assert cache.stats()["size"] == 1
+
+
+def test_missing_api_keys_return_error(monkeypatch):
+    monkeypatch.delenv("API_KEY", raising=False)
+    monkeypatch.delenv("MARKETSTACK_API_KEY", raising=False)
+    with patch("requests.Session.get") as mock_get:
+        assert get_currency_rates() == {"error": "API key is missing"}
+        assert get_stock_prices() == {"error": "API key is missing"}
+    mock_get.assert_not_called()
+
+
+def test_market_data_refresh_does_not_block_client_pool():
+    client = get_market_data_client()
+    assert get_market_data_client() is client
+    # Все значения сразу устаревают, каждый тикер — отдельный пакет в пуле клиента
+    client.stock_batch_size = 1
+    client.cache.ttl["stock"] = 0
+    groups = [[f"T{i}A", f"T{i}B"] for i in range(16)]
+
+    def fetch(stocks, api_key):
+        time.sleep(0.01)
+        return {stock: {"stock": stock, "price": 1.0} for stock in stocks}
+
+    with patch.object(client, "fetch_stock_prices", side_effect=fetch):
+        for stocks in groups:
+            client.get_stock_prices(stocks, "key")
+        # Обновления в фоне сами ждут пакеты в пуле клиента и не должны занимать все его потоки
+        for stocks in groups:
+            assert len(client.get_stock_prices(stocks, "key")["stock_prices"]) == 2
+        deadline = time.monotonic() + 5
+        while client.cache._refreshing and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert not client.cache._refreshing
+
+
+def test_dashboard_fetches_rates_and_prices_concurrently(operations_file, tmp_path):
+    store = TransactionStore(operations_file, cache_dir=str(tmp_path / "cache"))
+    # Каждый запрос ждет другой: дашборд соберется, только если они выполняются одновременно
+    barrier = threading.Barrier(2, timeout=5)
+
+    def fetch(key):
+        barrier.wait()
+        return {key: [key]}
+
+    with patch("src.views.get_currency_rates", side_effect=lambda: fetch("currency_rates")), \
+            patch("src.views.get_stock_prices", side_effect=lambda: fetch("stock_prices")):
+        dashboard = get_dashboard_data("2021-12-31 23:00:00", store=store)
+    assert dashboard["currency_rates"] == ["currency_rates"]
+    assert dashboard["stock_prices"] == ["stock_prices"]
+
+
+@patch("src.views.get_stock_prices", return_value={"stock_prices": []})
+@patch("src.views.get_currency_rates", return_value={"currency_rates": []})
+def test_dashboard_batch_matches_single_date(mock_rates, mock_stocks, operations_file, tmp_path):
+    store = TransactionStore(operations_file, cache_dir=str(tmp_path / "cache"))
+    target_dates = ["2021-12-31 23:00:00", "2021-12-30 12:00:00", datetime.datetime(2021, 12, 31, 16, 44),
+                    "2022-01-15 00:00:00"]
+
+    batch = get_dashboard_batch(target_dates, store=store)
+    assert len(batch) == 4
+    for target_date, sections in zip(target_dates, batch):
+        dashboard = get_dashboard_data(target_date, store=store)
+        assert sections == {"cards": dashboard["cards"], "top_transactions": dashboard["top_transactions"]}
+    assert batch[0]["cards"] == [{"last_digits": "7197", "total_spent": 160.89, "cashback": 1.61}]
+    assert batch[3] == {"cards": [], "top_transactions": []}
+
+    with pytest.raises(ValueError):
+        get_dashboard_batch(["31.12.2021"], store=store)